@@ -0,0 +1,88 @@
+"""
+Middleware de control de admisión
+Mantiene el lugar de la clase hasta que termina de enviarse la respuesta
+(incluye exportaciones en streaming) y rechaza con 503 + Retry-After.
+Además asocia al request el statement_timeout de su clase, cancela sus
+consultas en PostgreSQL si el cliente se desconecta y mide la memoria de
+las respuestas grandes (exportaciones y consultas pesadas)
+"""
+
+import asyncio
+import json
+import logging
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from services.admission import AdmisionRechazada, admission_controller
+from services.memory_tracker import memory_tracker
+from services.query_control import finalizar_control, iniciar_control
+
+logger = logging.getLogger(__name__)
+
+# Clases cuyas respuestas se miden en memoria (visibles en /debug/memory)
+CLASES_MEDIDAS = ('export', 'pesada')
+
+class AdmissionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        clase = admission_controller.clasificar(scope['path'], scope.get('query_string', b''))
+        if clase is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await clase.adquirir()
+        except AdmisionRechazada as e:
+            logger.warning(f"Request rechazado {scope['path']}: {e}")
+            await _rechazar(send, e)
+            return
+
+        inicio = time.perf_counter()
+        control, token = iniciar_control(clase.nombre)
+        mensajes = asyncio.Queue()
+
+        async def vigilar_desconexion():
+            # Único lector de receive(): reenvía los mensajes a la app y detecta la desconexión
+            while True:
+                message = await receive()
+                await mensajes.put(message)
+                if message['type'] == 'http.disconnect':
+                    await run_in_threadpool(control.cancelar)
+                    return
+
+        vigilante = asyncio.ensure_future(vigilar_desconexion())
+        try:
+            if clase.nombre in CLASES_MEDIDAS:
+                # Abarca también el envío de las respuestas en streaming
+                with memory_tracker.medir_respuesta(scope['path']):
+                    await self.app(scope, mensajes.get, send)
+            else:
+                await self.app(scope, mensajes.get, send)
+        finally:
+            vigilante.cancel()
+            finalizar_control(token)
+            clase.liberar(time.perf_counter() - inicio)
+
+async def _rechazar(send, error):
+    body = json.dumps({
+        "detail": "Servidor ocupado, reintente más tarde",
+        "clase": error.clase.nombre,
+        "motivo": error.motivo
+    }).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': 503,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            (b'retry-after', str(error.clase.retry_after()).encode()),
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,176 @@
+"""
+Middleware de compresión de respuestas (gzip / brotli según Accept-Encoding)
+Comprime al vuelo las respuestas que superan un tamaño mínimo y sirve las
+rutas de estadísticas desde la caché de cuerpos precomprimidos
+"""
+
+import zlib
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from services.response_cache import brotli_module, response_cache, unidad_de_query
+
+# Tipos que no vale la pena comprimir o que no admiten buffering (SSE)
+TIPOS_SIN_COMPRESION = ('text/event-stream', 'image/', 'application/zip', 'application/gzip',
+                        'application/vnd.apache.parquet', 'application/vnd.apache.arrow')
+
+def elegir_codificacion(accept_encoding):
+    """Mejor codificación soportada según Accept-Encoding (br > gzip a igual q); None = sin comprimir"""
+    soportadas = ['br', 'gzip'] if brotli_module() is not None else ['gzip']
+    preferencias = {}
+    for parte in accept_encoding.split(','):
+        token, _, parametros = parte.strip().partition(';')
+        token = token.strip().lower()
+        q = 1.0
+        if parametros.strip().startswith('q='):
+            try:
+                q = float(parametros.strip()[2:])
+            except ValueError:
+                q = 0.0
+        preferencias[token] = q
+
+    mejor, mejor_q = None, 0.0
+    for codificacion in soportadas:
+        q = preferencias.get(codificacion, preferencias.get('*', 0.0))
+        if q > mejor_q:
+            mejor, mejor_q = codificacion, q
+    return mejor
+
+class _Compresor:
+    """Compresor incremental con la misma interfaz para gzip y brotli"""
+
+    def __init__(self, codificacion):
+        if codificacion == 'br':
+            self._br = brotli_module().Compressor(quality=4)
+            self._zlib = None
+        else:
+            self._br = None
+            self._zlib = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def process(self, data):
+        if self._br is not None:
+            return self._br.process(data) + self._br.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self._br is not None:
+            return self._br.finish()
+        return self._zlib.flush()
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size=1024, cache_prefixes=()):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache_prefixes = tuple(cache_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        codificacion = elegir_codificacion(Headers(scope=scope).get('accept-encoding', ''))
+
+        if scope['method'] == 'GET' and scope['path'].startswith(self.cache_prefixes):
+            await self._cached(scope, receive, send, codificacion)
+        elif codificacion is None:
+            await self.app(scope, receive, send)
+        else:
+            await _CompressionResponder(self.app, codificacion, self.minimum_size)(scope, receive, send)
+
+    async def _cached(self, scope, receive, send, codificacion):
+        """Sirve el cuerpo precomprimido de la versión de datos vigente o lo genera una vez"""
+        # La versión de la unidad pedida: un ETL de otra unidad no invalida esta respuesta
+        unidad_id = unidad_de_query(scope.get('query_string', b''))
+        version = await run_in_threadpool(response_cache.current_version, unidad_id)
+        key = (scope['path'], scope.get('query_string', b''))
+        entry = response_cache.get(key, version) if version is not None else None
+
+        if entry is None:
+            mensajes = []
+
+            async def capturar(message):
+                mensajes.append(message)
+
+            await self.app(scope, receive, capturar)
+            start = mensajes[0]
+            body = b''.join(m.get('body', b'') for m in mensajes[1:])
+
+            if start['status'] != 200 or version is None:
+                # Errores y respuestas sin versión conocida no se cachean
+                responder = _CompressionResponder(None, codificacion, self.minimum_size)
+                await responder.replay(mensajes, send)
+                return
+            headers = [(k, v) for k, v in start['headers'] if k.lower() != b'content-length']
+            entry = await run_in_threadpool(response_cache.store, key, version, body, headers)
+
+        if codificacion not in entry.bodies or len(entry.bodies['identity']) < self.minimum_size:
+            codificacion = 'identity'
+        body = entry.bodies[codificacion]
+
+        headers = MutableHeaders(raw=list(entry.headers))
+        headers['content-length'] = str(len(body))
+        headers.append('vary', 'Accept-Encoding')
+        if codificacion != 'identity':
+            headers['content-encoding'] = codificacion
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers.raw})
+        await send({'type': 'http.response.body', 'body': body})
+
+class _CompressionResponder:
+    """Comprime una respuesta en streaming si su primer bloque supera el tamaño mínimo"""
+
+    def __init__(self, app, codificacion, minimum_size):
+        self.app = app
+        self.codificacion = codificacion
+        self.minimum_size = minimum_size
+        self.send = None
+        self.start = None
+        self.compresor = None
+        self.decidido = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.on_send)
+
+    async def replay(self, mensajes, send):
+        self.send = send
+        for message in mensajes:
+            await self.on_send(message)
+
+    async def on_send(self, message):
+        if message['type'] == 'http.response.start':
+            self.start = message
+            return
+        if message['type'] != 'http.response.body':
+            await self.send(message)
+            return
+
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+
+        if not self.decidido:
+            self.decidido = True
+            headers = MutableHeaders(raw=self.start['headers'])
+            tipo = headers.get('content-type', '')
+            comprimir = (
+                self.codificacion is not None
+                and 'content-encoding' not in headers
+                and not tipo.startswith(TIPOS_SIN_COMPRESION)
+                and (more_body or len(body) >= self.minimum_size)
+            )
+            if comprimir:
+                self.compresor = _Compresor(self.codificacion)
+                headers['content-encoding'] = self.codificacion
+                headers.append('vary', 'Accept-Encoding')
+                if 'content-length' in headers:
+                    del headers['content-length']
+            await self.send(self.start)
+
+        if self.compresor is None:
+            await self.send(message)
+            return
+
+        data = self.compresor.process(body)
+        if not more_body:
+            data += self.compresor.finish()
+        await self.send({'type': 'http.response.body', 'body': data, 'more_body': more_body})
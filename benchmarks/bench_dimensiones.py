@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: columnas de texto repetido vs claves SMALLINT de dimensión
+Compara tamaño de tabla y latencia de GROUP BY en PostgreSQL
+Uso: python -m benchmarks.bench_dimensiones [num_registros]
+"""
+
+import logging
+import random
+import sys
+import time
+from sqlalchemy import create_engine, text
+from config.settings import settings
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+ASEGURADORAS = [
+    "SURA EPS", "Nueva EPS", "Sanitas EPS", "Salud Total", "EPS Famisanar",
+    "Comfenalco", "Coomeva EPS", "Medimás EPS", "Capital Salud EPS", "Particular/Prepagada"
+]
+CONDICIONES = ["Mejorado", "Alta médica", "Traslado", "Fallecido"]
+DIAGNOSTICOS = [f"Quemadura tipo {i} con compromiso de superficie corporal en región {i % 7}" for i in range(200)]
+
+CONSULTAS = {
+    'texto': [
+        "SELECT nombre_aseguradora, COUNT(*), AVG(dias_estancia) FROM bench_desenlaces_texto GROUP BY nombre_aseguradora",
+        "SELECT condicion_egreso_nombre, COUNT(*) FROM bench_desenlaces_texto GROUP BY condicion_egreso_nombre",
+        "SELECT diagnostico, COUNT(*), AVG(dias_estancia) FROM bench_desenlaces_texto GROUP BY diagnostico ORDER BY 2 DESC LIMIT 10",
+    ],
+    'claves': [
+        "SELECT aseguradora_key, COUNT(*), AVG(dias_estancia) FROM bench_desenlaces_claves GROUP BY aseguradora_key",
+        "SELECT condicion_egreso_key, COUNT(*) FROM bench_desenlaces_claves GROUP BY condicion_egreso_key",
+        "SELECT diagnostico_key, COUNT(*), AVG(dias_estancia) FROM bench_desenlaces_claves GROUP BY diagnostico_key ORDER BY 2 DESC LIMIT 10",
+    ],
+}
+
+def crear_tablas(connection, num_registros):
+    """Crea y llena las dos variantes de la tabla de desenlaces"""
+    connection.execute(text("DROP TABLE IF EXISTS bench_desenlaces_texto, bench_desenlaces_claves"))
+    connection.execute(text("""
+        CREATE TABLE bench_desenlaces_texto (
+            id SERIAL PRIMARY KEY,
+            dias_estancia INTEGER,
+            diagnostico TEXT,
+            nombre_aseguradora VARCHAR(200),
+            condicion_egreso_nombre VARCHAR(100)
+        )
+    """))
+    connection.execute(text("""
+        CREATE TABLE bench_desenlaces_claves (
+            id SERIAL PRIMARY KEY,
+            dias_estancia INTEGER,
+            diagnostico_key INTEGER,
+            aseguradora_key SMALLINT,
+            condicion_egreso_key SMALLINT
+        )
+    """))
+
+    lote = 10000
+    for inicio in range(0, num_registros, lote):
+        filas = [
+            (random.randint(1, 60), random.randrange(len(DIAGNOSTICOS)),
+             random.randrange(len(ASEGURADORAS)), random.randrange(len(CONDICIONES)))
+            for _ in range(min(lote, num_registros - inicio))
+        ]
+        connection.execute(
+            text("INSERT INTO bench_desenlaces_texto (dias_estancia, diagnostico, nombre_aseguradora, condicion_egreso_nombre) "
+                 "VALUES (:dias, :diag, :aseg, :cond)"),
+            [{'dias': d, 'diag': DIAGNOSTICOS[g], 'aseg': ASEGURADORAS[a], 'cond': CONDICIONES[c]} for d, g, a, c in filas]
+        )
+        connection.execute(
+            text("INSERT INTO bench_desenlaces_claves (dias_estancia, diagnostico_key, aseguradora_key, condicion_egreso_key) "
+                 "VALUES (:dias, :diag, :aseg, :cond)"),
+            [{'dias': d, 'diag': g, 'aseg': a, 'cond': c} for d, g, a, c in filas]
+        )
+
+    connection.execute(text("ANALYZE bench_desenlaces_texto"))
+    connection.execute(text("ANALYZE bench_desenlaces_claves"))
+    connection.commit()
+
+def medir(connection, consultas, repeticiones=20):
+    """Latencia mediana (ms) de cada consulta"""
+    resultados = []
+    for consulta in consultas:
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            connection.execute(text(consulta)).fetchall()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        tiempos.sort()
+        resultados.append(tiempos[len(tiempos) // 2])
+    return resultados
+
+def main():
+    num_registros = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    engine = create_engine(settings.postgres_url)
+
+    try:
+        with engine.connect() as connection:
+            logger.info(f"Generando {num_registros} registros de prueba...")
+            crear_tablas(connection, num_registros)
+
+            for variante in ('texto', 'claves'):
+                tabla = f"bench_desenlaces_{variante}"
+                tamaño = connection.execute(text(f"SELECT pg_total_relation_size('{tabla}')")).scalar()
+                latencias = medir(connection, CONSULTAS[variante])
+                logger.info(f"{variante:>7}: tamaño={tamaño / 1024 / 1024:.1f} MB  "
+                            f"group-by (ms, mediana)={', '.join(f'{l:.1f}' for l in latencias)}")
+
+            connection.execute(text("DROP TABLE IF EXISTS bench_desenlaces_texto, bench_desenlaces_claves"))
+            connection.commit()
+        return True
+
+    finally:
+        engine.dispose()
+
+if __name__ == "__main__":
+    success = main()
+    exit(0 if success else 1)
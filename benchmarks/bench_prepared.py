@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: consultas de desenlaces con SQL de texto vs sentencias preparadas
+Ejecuta combinaciones aleatorias de filtros con varios hilos concurrentes y
+reporta latencia, throughput y el tiempo de planificación que se ahorra
+Uso: python -m benchmarks.bench_prepared [requests] [hilos]
+"""
+
+import logging
+import random
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from sqlalchemy import text
+
+from services.database import db_service, filtros_activos
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+def filtros_aleatorios():
+    """Combinación aleatoria de los filtros estándar"""
+    hoy = date.today()
+    opciones = {
+        'fecha_inicio': hoy - timedelta(days=random.randint(30, 120)),
+        'fecha_fin': hoy - timedelta(days=random.randint(0, 29)),
+        'aseguradora': random.choice(['SURA', 'Nueva', 'Sanitas', 'Salud']),
+        'sexo': random.choice(['Masculino', 'Femenino']),
+        'edad_min': random.randint(1, 40),
+        'condicion_egreso': random.choice(['Mejorado', 'Alta', 'Fallecido']),
+    }
+    return {k: v for k, v in opciones.items() if random.random() < 0.5}
+
+def ejecutar(modo, filtros):
+    """Ejecuta get_desenlaces con o sin sentencia preparada y retorna la latencia en ms"""
+    inicio = time.perf_counter()
+    if modo == 'preparada':
+        db_service.get_desenlaces(filtros)
+    else:
+        db_service.get_desenlaces.__func__(_SinPreparar(db_service), filtros)
+    return (time.perf_counter() - inicio) * 1000
+
+class _SinPreparar:
+    """Envoltura que fuerza el camino de SQL de texto (pd.read_sql_query)"""
+
+    def __init__(self, service):
+        self._service = service
+
+    def __getattr__(self, nombre):
+        return getattr(self._service, nombre)
+
+    def execute_query(self, query, params=None, nombre=None):
+        return self._service.execute_query(query, params)
+
+def tiempo_planificacion(filtros):
+    """Planning Time (ms) reportado por EXPLAIN ANALYZE para una consulta de texto"""
+    capturada = {}
+
+    class _Captura(_SinPreparar):
+        def execute_query(self, query, params=None, nombre=None):
+            capturada['query'], capturada['params'] = query, params
+
+    db_service.get_desenlaces.__func__(_Captura(db_service), filtros)
+    query = re.sub(r"%\((\w+)\)s", r":\1", capturada['query'])
+    with db_service.engine.connect() as connection:
+        plan = connection.execute(text("EXPLAIN (ANALYZE, SUMMARY) " + query), capturada['params']).fetchall()
+    for (linea,) in plan:
+        if linea.startswith('Planning Time'):
+            return float(linea.split(':')[1].replace('ms', ''))
+    return 0.0
+
+def medir(modo, lista_filtros, hilos):
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        latencias = sorted(pool.map(lambda f: ejecutar(modo, f), lista_filtros))
+    total = time.perf_counter() - inicio
+    return {
+        'p50': latencias[len(latencias) // 2],
+        'p99': latencias[int(len(latencias) * 0.99) - 1],
+        'req_s': len(latencias) / total
+    }
+
+def main():
+    num_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    hilos = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    random.seed(42)
+    lista_filtros = [filtros_aleatorios() for _ in range(num_requests)]
+    formas = {filtros_activos(f) for f in lista_filtros}
+    logger.info(f"{num_requests} requests, {hilos} hilos, {len(formas)} formas de consulta distintas")
+
+    # Calentar el pool y preparar cada forma una vez
+    for filtros in lista_filtros[:50]:
+        ejecutar('preparada', filtros)
+
+    for modo in ('texto', 'preparada'):
+        r = medir(modo, lista_filtros, hilos)
+        logger.info(f"{modo:>9}: p50={r['p50']:.2f} ms  p99={r['p99']:.2f} ms  throughput={r['req_s']:.0f} req/s")
+
+    muestras = [tiempo_planificacion(f) for f in lista_filtros[:100]]
+    logger.info(f"Planning Time promedio evitado por request preparado: {sum(muestras) / len(muestras):.3f} ms")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    exit(0 if success else 1)
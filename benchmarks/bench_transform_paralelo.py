@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: limpieza de desenlaces en serie vs pool de procesos por rangos de fecha_ingreso
+Mide el speedup según la cantidad de workers (hasta los núcleos disponibles)
+y verifica que la salida sea idéntica a la ruta serial
+Uso: python -m benchmarks.bench_transform_paralelo [num_registros] [--workers 1,2,4]
+"""
+
+import argparse
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from etl.transformers import parallel
+from etl.transformers.data_transformer import DataTransformer
+
+logging.basicConfig(level=logging.WARNING, format='%(message)s')
+
+ASEGURADORAS = ["SURA EPS", "Nueva EPS", "Sanitas EPS", "Salud Total", "EPS Famisanar", "Particular/Prepagada"]
+CONDICIONES = ["Mejorado", "Alta médica", "Traslado", "Fallecido"]
+SALAS = ["UCI Quemados", "Hospitalización", "Cirugía Plástica", "Urgencias"]
+SEXOS = ["M", "F", "masculino", " FEMENINO ", None]
+
+def generar_desenlaces(num_registros, seed=42):
+    """Filas con la forma que entrega SQL Server, incluyendo nulos y valores fuera de rango"""
+    rng = random.Random(seed)
+    inicio = datetime(2015, 1, 1)
+    filas = []
+    for i in range(num_registros):
+        ingreso = inicio + timedelta(days=rng.randrange(3650))
+        dias = rng.randint(-2, 400)
+        filas.append({
+            'desenlaceq_id': i + 1,
+            'numero_episodio': 100000 + i,
+            'fecha_ingreso': ingreso.strftime('%Y-%m-%d') if rng.random() > 0.01 else None,
+            'fecha_egreso': (ingreso + timedelta(days=max(dias, 0))).strftime('%Y-%m-%d'),
+            'dias_estancia': dias,
+            'diagnostico': f"  Quemadura grado {rng.randint(1, 3)} en región {rng.randint(1, 40)}  " if rng.random() > 0.05 else None,
+            'sala_egreso': rng.choice(SALAS),
+            'causa': rng.choice(["Líquido caliente", "Fuego directo", "Eléctrica", "Química", None]),
+            'nombre_aseguradora': rng.choice(ASEGURADORAS),
+            'condicion_egreso_nombre': rng.choice(CONDICIONES),
+            'nombre_paciente': f" Paciente {rng.randint(1, num_registros)} ",
+            'sexo': rng.choice(SEXOS),
+            'edad': rng.randint(-1, 160),
+            'medico_tratante': f"Dr. Médico {rng.randint(1, 60)}",
+            'numero_historia_clinica': f"HC{rng.randint(1, 10**7):08d}",
+        })
+    return pd.DataFrame(filas)
+
+def medir(funcion, repeticiones):
+    mejor = None
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        transcurrido = time.perf_counter() - inicio
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+    return mejor, resultado
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('num_registros', nargs='?', type=int, default=500_000)
+    parser.add_argument('--workers', default=None, help="Lista separada por coma (por defecto 1, 2, 4... hasta los núcleos)")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    if not parallel.disponible():
+        print("❌ El modo paralelo requiere pyarrow")
+        return 1
+
+    nucleos = os.cpu_count() or 1
+    if args.workers:
+        workers = [int(w) for w in args.workers.split(',')]
+    else:
+        workers = sorted({1, nucleos} | {2 ** k for k in range(1, 7) if 2 ** k < nucleos})
+
+    print(f"Generando {args.num_registros} registros ({nucleos} núcleos disponibles)...")
+    df = generar_desenlaces(args.num_registros)
+    transformer = DataTransformer()
+
+    serie_s, esperado = medir(lambda: transformer._normalizar_desenlaces(df), args.repeticiones)
+    print(f"\n{'workers':>8} {'segundos':>10} {'speedup':>8} {'eficiencia':>10}  salida")
+    print(f"{'serie':>8} {serie_s:>10.2f} {1.0:>8.2f} {'':>10}  referencia")
+
+    ok = True
+    for n in workers:
+        segundos, obtenido = medir(lambda: parallel.normalizar_en_paralelo(transformer, df, n), args.repeticiones)
+        try:
+            pd.testing.assert_frame_equal(obtenido, esperado, check_exact=True)
+            salida = "idéntica"
+        except AssertionError as e:
+            salida = f"DISTINTA: {str(e).splitlines()[0]}"
+            ok = False
+        speedup = serie_s / segundos
+        print(f"{n:>8} {segundos:>10.2f} {speedup:>8.2f} {speedup / n:>10.0%}  {salida}")
+
+    print("\n✅ Salida idéntica a la ruta serial" if ok else "\n❌ La salida paralela difiere de la serial")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
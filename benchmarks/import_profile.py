@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Perfil de tiempo de importación del arranque de la API (python -X importtime)
+Reporta los módulos más costosos y falla si se supera el presupuesto de
+arranque en frío o si app.main carga módulos pesados (pandas, numpy,
+sqlalchemy, drivers de DB) antes del primer request
+Uso: python -m benchmarks.import_profile [--budget-ms 800] [--top 20]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que no deben cargarse al importar app.main
+MODULOS_PESADOS = ['pandas', 'numpy', 'sqlalchemy', 'psycopg2', 'pyodbc', 'pyarrow']
+
+def ejecutar(codigo, *flags):
+    env = {**os.environ, 'PYTHONPATH': RAIZ, 'PYTHONDONTWRITEBYTECODE': '1'}
+    return subprocess.run(
+        [sys.executable, *flags, '-c', codigo],
+        cwd=RAIZ, env=env, capture_output=True, text=True, check=True
+    )
+
+def perfil_importacion():
+    """Lista (acumulado_us, propio_us, módulo) de cada import de app.main"""
+    resultado = ejecutar("import app.main", '-X', 'importtime')
+    filas = []
+    for linea in resultado.stderr.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        propio, acumulado, modulo = linea[len('import time:'):].split('|')
+        filas.append((int(acumulado), int(propio), modulo.rstrip()))
+    return filas
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--budget-ms', type=float, default=800.0, help="Presupuesto de import de app.main (ms)")
+    parser.add_argument('--top', type=int, default=20, help="Módulos a listar")
+    args = parser.parse_args()
+
+    filas = perfil_importacion()
+    total_ms = next(a for a, _, m in filas if m.strip() == 'app.main') / 1000
+
+    print(f"{'acumulado ms':>12} {'propio ms':>10}  módulo")
+    for acumulado, propio, modulo in sorted(filas, reverse=True)[:args.top]:
+        print(f"{acumulado / 1000:>12.1f} {propio / 1000:>10.1f}  {modulo}")
+
+    cargados = json.loads(ejecutar(
+        "import sys, json, app.main; "
+        f"print(json.dumps([m for m in {MODULOS_PESADOS!r} if m in sys.modules]))"
+    ).stdout)
+
+    print(f"\nimport app.main: {total_ms:.1f} ms (presupuesto {args.budget_ms:.0f} ms)")
+    ok = True
+    if total_ms > args.budget_ms:
+        print("❌ Se superó el presupuesto de arranque en frío")
+        ok = False
+    if cargados:
+        print(f"❌ Módulos pesados importados al arrancar: {cargados}")
+        ok = False
+    if ok:
+        print("✅ Arranque en frío dentro del presupuesto")
+    return ok
+
+if __name__ == "__main__":
+    success = main()
+    exit(0 if success else 1)
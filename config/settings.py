@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,10 +12,78 @@ class Settings:
     #POSTGRES_USER = os.getenv("POSTGRES_USER", "postgres")
     POSTGRES_USER = os.getenv("POSTGRES_USER", "postgres")
     POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "")
-    
+
+    # Réplicas de lectura (URLs separadas por coma; vacío = todo al primario)
+    POSTGRES_REPLICA_URLS = os.getenv("POSTGRES_REPLICA_URLS", "")
+    REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "30"))
+    REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "10"))
+
+    # Fuentes SQL Server por unidad de quemados: "1=mssql+pyodbc://...,2=mssql+pyodbc://..."
+    # Sin SQLSERVER_FUENTES se usa SQLSERVER_URL como única fuente de UNIDAD_DEFECTO
+    SQLSERVER_URL = os.getenv("SQLSERVER_URL", "")
+    SQLSERVER_FUENTES = os.getenv("SQLSERVER_FUENTES", "")
+    UNIDAD_DEFECTO = int(os.getenv("UNIDAD_DEFECTO", "1"))
+    ETL_FUENTES_CONCURRENTES = int(os.getenv("ETL_FUENTES_CONCURRENTES", "4"))  # extracciones simultáneas
+
     # Logging
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     
+    # Arranque
+    DEMO_MODE = os.getenv("DEMO_MODE", "false").lower() == "true"  # Endpoints con datos fijos, sin DB
+    DB_WARMUP = os.getenv("DB_WARMUP", "true").lower() == "true"  # Calentar pool y cachés al arrancar
+    
+    # Compresión de respuestas (bytes mínimos para comprimir)
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    
+    # Versión de datos: NOTIFY al completar un ETL y escucha en cada worker
+    DATA_NOTIFY = os.getenv("DATA_NOTIFY", "true").lower() == "true"
+    DATA_NOTIFY_CANAL = os.getenv("DATA_NOTIFY_CANAL", "dashboard_datos")
+    CACHE_VERSION_TTL = float(os.getenv("CACHE_VERSION_TTL", "5"))  # segundos entre relecturas de etl_runs
+    CACHE_VERSION_TTL_NOTIFY = float(os.getenv("CACHE_VERSION_TTL_NOTIFY", "300"))  # ídem con NOTIFY activo
+    
+    # Control de admisión: requests concurrentes por clase de endpoint
+    ADMISION_EXPORT = int(os.getenv("ADMISION_EXPORT", "2"))     # exportaciones CSV/Parquet/Arrow
+    ADMISION_PESADA = int(os.getenv("ADMISION_PESADA", "4"))     # estancia, cubo, páginas grandes
+    ADMISION_GENERAL = int(os.getenv("ADMISION_GENERAL", "8"))   # KPIs y el resto
+    ADMISION_COLA = int(os.getenv("ADMISION_COLA", "8"))         # requests en espera por clase
+    ADMISION_TIMEOUT = float(os.getenv("ADMISION_TIMEOUT", "2"))  # segundos máximos en cola
+    
+    # statement_timeout por clase de endpoint (ms; 0 = sin límite)
+    STATEMENT_TIMEOUT_EXPORT = int(os.getenv("STATEMENT_TIMEOUT_EXPORT", "120000"))
+    STATEMENT_TIMEOUT_PESADA = int(os.getenv("STATEMENT_TIMEOUT_PESADA", "15000"))
+    STATEMENT_TIMEOUT_GENERAL = int(os.getenv("STATEMENT_TIMEOUT_GENERAL", "5000"))
+    
+    # Deduplicación de desenlaces en el ETL
+    ETL_DEDUP_CLAVES = os.getenv("ETL_DEDUP_CLAVES", "desenlaceq_id")  # claves de negocio separadas por coma
+    ETL_DEDUP_VERSION = os.getenv("ETL_DEDUP_VERSION", "fecha_procesamiento")  # columna de versión
+    ETL_DEDUP_REGLA = os.getenv("ETL_DEDUP_REGLA", "ultimo")  # ultimo | primero
+    ETL_CHUNK_SIZE = int(os.getenv("ETL_CHUNK_SIZE", "0"))  # filas por chunk al extraer (0 = todo junto)
+    ETL_TRANSFORM_WORKERS = int(os.getenv("ETL_TRANSFORM_WORKERS", "0"))  # procesos para la limpieza (0/1 = en serie)
+    ETL_PARALELO_MIN_FILAS = int(os.getenv("ETL_PARALELO_MIN_FILAS", "100000"))  # lotes más chicos se limpian en serie
+    ETL_DIAGNOSTICOS_K = int(os.getenv("ETL_DIAGNOSTICOS_K", "32"))  # contadores Space-Saving por día y segmento
+    
+    # Grafo de tareas del ETL
+    ETL_DAG_WORKERS = int(os.getenv("ETL_DAG_WORKERS", "4"))  # tareas independientes simultáneas
+    ETL_TAREA_REINTENTOS = int(os.getenv("ETL_TAREA_REINTENTOS", "2"))  # reintentos por tarea fallida
+    ETL_TAREA_ESPERA = float(os.getenv("ETL_TAREA_ESPERA", "1"))  # segundos antes del primer reintento (se duplica)
+    
+    # Checkpoints en Parquet de lo extraído (para retomar una ejecución fallida)
+    ETL_CHECKPOINTS = os.getenv("ETL_CHECKPOINTS", "true").lower() == "true"
+    ETL_CHECKPOINT_DIR = os.getenv("ETL_CHECKPOINT_DIR", os.path.join(tempfile.gettempdir(), "fibidesen1-etl"))
+    ETL_CHECKPOINT_REANUDAR_HORAS = float(os.getenv("ETL_CHECKPOINT_REANUDAR_HORAS", "24"))  # 0 = nunca retomar
+    ETL_CHECKPOINT_MAX_HORAS = float(os.getenv("ETL_CHECKPOINT_MAX_HORAS", "72"))  # antigüedad máxima
+    ETL_CHECKPOINT_MAX_MB = float(os.getenv("ETL_CHECKPOINT_MAX_MB", "2048"))  # tamaño total máximo en disco
+    
+    # Endpoints de diagnóstico /debug (vacío = deshabilitados)
+    DEBUG_TOKEN = os.getenv("DEBUG_TOKEN", "")  # se envía en el header X-Debug-Token
+    DEBUG_PROFILE_HZ = int(os.getenv("DEBUG_PROFILE_HZ", "100"))  # muestras por segundo del profiler
+    DEBUG_PROFILE_MAX_SECONDS = int(os.getenv("DEBUG_PROFILE_MAX_SECONDS", "60"))
+    
+    # Medición de memoria (RSS siempre; tracemalloc opcional porque encarece cada asignación)
+    MEMORY_TRACE = os.getenv("MEMORY_TRACE", "false").lower() == "true"  # activar tracemalloc al arrancar
+    MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", "1"))  # profundidad de pila por asignación
+    MEMORY_TOP_SITIOS = int(os.getenv("MEMORY_TOP_SITIOS", "10"))  # sitios de asignación reportados
+    
     # API Configuration
     API_V1_STR = "/api/v1"
     PROJECT_NAME = "Dashboard Médico API - fibidesen1"
@@ -31,4 +100,33 @@ class Settings:
     def postgres_url(self):
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def replica_urls(self):
+        return [url.strip() for url in self.POSTGRES_REPLICA_URLS.split(",") if url.strip()]
+
+    @property
+    def sqlserver_url(self):
+        return self.SQLSERVER_URL
+
+    @property
+    def fuentes_sqlserver(self):
+        """unidad_id -> URL de su SQL Server"""
+        fuentes = {}
+        for entrada in self.SQLSERVER_FUENTES.split(","):
+            if "=" in entrada:
+                unidad, url = entrada.split("=", 1)
+                fuentes[int(unidad.strip())] = url.strip()
+        if not fuentes and self.SQLSERVER_URL:
+            fuentes[self.UNIDAD_DEFECTO] = self.SQLSERVER_URL
+        return fuentes
+
+    @property
+    def unidades(self):
+        """Unidades configuradas (la unidad por defecto si no hay fuentes)"""
+        return sorted(self.fuentes_sqlserver) or [self.UNIDAD_DEFECTO]
+
+    @property
+    def etl_dedup_claves(self):
+        return [clave.strip() for clave in self.ETL_DEDUP_CLAVES.split(",") if clave.strip()]
+
 settings = Settings()
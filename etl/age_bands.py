@@ -0,0 +1,80 @@
+"""
+Bandas de edad configurables
+El ETL guarda casos y suma de estancia por sexo y año de edad
+(dashboard_stats_edad_sexo); cualquier banda se arma sumando esas filas.
+Una banda se define por sus límites inferiores: (18, 31, 51, 71) da
+'Menor de 18', '18-30', '31-50', '51-70' y 'Mayor de 70'
+"""
+
+from bisect import bisect_right
+
+LIMITES_DEFECTO = (18, 31, 51, 71)
+EDAD_MAXIMA = 120
+MAX_BANDAS = 30
+SIN_EDAD = 'No especificado'
+
+def etiquetas(limites):
+    """Nombre de cada banda, en orden"""
+    nombres = [f"Menor de {limites[0]}"]
+    for inferior, siguiente in zip(limites, limites[1:]):
+        nombres.append(str(inferior) if siguiente - inferior == 1 else f"{inferior}-{siguiente - 1}")
+    nombres.append(f"Mayor de {limites[-1] - 1}")
+    return nombres
+
+def categorizar(edad, limites=LIMITES_DEFECTO):
+    """Banda de una edad (SIN_EDAD si falta)"""
+    if edad is None or edad != edad:
+        return SIN_EDAD
+    return etiquetas(limites)[bisect_right(limites, edad)]
+
+def limites_pedidos(texto):
+    """
+    Límites de bandas pedidos como texto ("1,5,12,18"); None = los de siempre.
+    ValueError si no son enteros crecientes entre 1 y EDAD_MAXIMA
+    """
+    if not texto:
+        return LIMITES_DEFECTO
+    try:
+        limites = tuple(int(parte) for parte in texto.split(',') if parte.strip())
+    except ValueError:
+        raise ValueError(f"Límites de edad inválidos: {texto!r} (enteros separados por coma)")
+    if not limites or len(limites) > MAX_BANDAS:
+        raise ValueError(f"Se admiten entre 1 y {MAX_BANDAS} límites de edad")
+    if any(limite < 1 or limite > EDAD_MAXIMA for limite in limites):
+        raise ValueError(f"Los límites de edad deben estar entre 1 y {EDAD_MAXIMA}")
+    if any(b <= a for a, b in zip(limites, limites[1:])):
+        raise ValueError("Los límites de edad deben ser estrictamente crecientes")
+    return limites
+
+def sql_case(columna, limites=LIMITES_DEFECTO):
+    """Expresión CASE de SQL equivalente a categorizar()"""
+    nombres = etiquetas(limites)
+    ramas = [f"WHEN {columna} IS NULL THEN '{SIN_EDAD}'"]
+    ramas += [f"WHEN {columna} < {limite} THEN '{nombre}'" for limite, nombre in zip(limites, nombres)]
+    return "CASE " + " ".join(ramas) + f" ELSE '{nombres[-1]}' END"
+
+def agregar(filas, limites=LIMITES_DEFECTO):
+    """
+    Suma filas (sexo, edad, total_casos, casos_estancia, suma_estancia) por
+    sexo y banda; promedio_estancia = suma / casos con estancia conocida
+    """
+    nombres = etiquetas(limites)
+    orden = {nombre: posicion for posicion, nombre in enumerate(nombres + [SIN_EDAD])}
+    grupos = {}
+    for sexo, edad, total_casos, casos_estancia, suma_estancia in filas:
+        banda = SIN_EDAD if edad is None or edad != edad else nombres[bisect_right(limites, edad)]
+        acumulado = grupos.setdefault((sexo, banda), [0, 0, 0.0])
+        acumulado[0] += int(total_casos or 0)
+        acumulado[1] += int(casos_estancia or 0)
+        acumulado[2] += float(suma_estancia or 0)
+    return [
+        {
+            "sexo": sexo,
+            "rango_edad": banda,
+            "total_casos": total,
+            "promedio_estancia": round(suma / casos, 2) if casos else None
+        }
+        for (sexo, banda), (total, casos, suma) in sorted(
+            grupos.items(), key=lambda item: (item[0][0] or '', orden[item[0][1]])
+        )
+    ]
@@ -0,0 +1,216 @@
+"""
+Checkpoints en Parquet de los datos extraídos por el ETL
+Cada ejecución guarda en disco local (run_{id}/) el resultado de sus tareas
+de extracción y limpieza. Si una ejecución falla, la siguiente retoma esos
+archivos en vez de volver a consultar las fuentes. Los checkpoints viejos se
+borran por antigüedad y por tamaño total; la lectura usa memory-map
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+MANIFIESTO = "manifest.json"
+
+# Ejecución anterior cuyos checkpoints se retoman
+Ejecucion = namedtuple('Ejecucion', ['directorio', 'run_id'])
+
+def disponible():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _archivo(nombre_tarea):
+    # "extract_desenlaces/u1" -> "extract_desenlaces__u1.parquet"
+    return re.sub(r'[^A-Za-z0-9_.-]', '__', nombre_tarea) + ".parquet"
+
+def _tamano(directorio):
+    total = 0
+    for raiz, _, archivos in os.walk(directorio):
+        for archivo in archivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, archivo))
+            except OSError:
+                pass
+    return total
+
+class RunCheckpoints:
+    """Checkpoints de una ejecución; con origen, reusa los de una ejecución fallida"""
+
+    def __init__(self, directorio, run_id, data_source, origen=None):
+        self.directorio = directorio
+        self.run_id = run_id
+        self.data_source = data_source
+        self.origen = origen
+        self.leidos = []
+        self.guardados = []
+        os.makedirs(directorio, exist_ok=True)
+        self.finalizar("running")
+
+    def _ruta(self, nombre_tarea, directorio=None):
+        return os.path.join(directorio or self.directorio, _archivo(nombre_tarea))
+
+    def existe(self, nombre_tarea):
+        """Hay checkpoint de la tarea en esta ejecución o en la retomada"""
+        return os.path.exists(self._ruta(nombre_tarea)) or (
+            self.origen is not None and os.path.exists(self._ruta(nombre_tarea, self.origen.directorio))
+        )
+
+    def leer(self, nombre_tarea):
+        """DataFrame del checkpoint de una tarea (propio o de la ejecución retomada) o None"""
+        import pyarrow.parquet as pq
+
+        ruta = self._ruta(nombre_tarea)
+        if not os.path.exists(ruta) and self.origen is not None:
+            anterior = self._ruta(nombre_tarea, self.origen.directorio)
+            if not os.path.exists(anterior):
+                return None
+            # El checkpoint pasa a ser también de esta ejecución (sin copiar datos si se puede)
+            try:
+                os.link(anterior, ruta)
+            except OSError:
+                shutil.copyfile(anterior, ruta)
+        if not os.path.exists(ruta):
+            return None
+
+        try:
+            df = pq.read_table(ruta, memory_map=True).to_pandas()
+        except Exception as e:
+            logger.warning(f"Checkpoint ilegible {ruta}, se recalcula: {e}")
+            return None
+        self.leidos.append(nombre_tarea)
+        logger.info(f"Checkpoint retomado: {nombre_tarea} ({len(df)} filas)")
+        return df
+
+    def guardar(self, nombre_tarea, df):
+        """Persiste el resultado de una tarea; un fallo solo se registra (el checkpoint es opcional)"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Una extracción vacía puede ser un error de la fuente: no se fija como completada
+        if df is None or df.empty:
+            return False
+        ruta = self._ruta(nombre_tarea)
+        temporal = ruta + ".tmp"
+        try:
+            tabla = pa.Table.from_pandas(df, preserve_index=False)
+            pq.write_table(tabla, temporal, compression='zstd')
+            # Rename atómico: un checkpoint a medio escribir nunca se toma como completo
+            os.replace(temporal, ruta)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el checkpoint {nombre_tarea}: {e}")
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            return False
+        self.guardados.append(nombre_tarea)
+        return True
+
+    def finalizar(self, estado):
+        manifiesto = {
+            "run_id": self.run_id,
+            "data_source": self.data_source,
+            "estado": estado,
+            "reanuda": self.origen.run_id if self.origen is not None else None,
+            "actualizado": time.time()
+        }
+        temporal = os.path.join(self.directorio, MANIFIESTO + ".tmp")
+        with open(temporal, "w") as archivo:
+            json.dump(manifiesto, archivo)
+        os.replace(temporal, os.path.join(self.directorio, MANIFIESTO))
+
+    def get_status(self):
+        return {
+            "directorio": self.directorio,
+            "reanuda_run": self.origen.run_id if self.origen is not None else None,
+            "leidos": self.leidos,
+            "guardados": len(self.guardados)
+        }
+
+class CheckpointStore:
+    def __init__(self, directorio, max_horas=72.0, max_mb=2048.0):
+        self.directorio = directorio
+        self.max_horas = max_horas
+        self.max_mb = max_mb
+
+    def _ejecuciones(self):
+        """Manifiestos de las ejecuciones con checkpoints, de la más reciente a la más antigua"""
+        if not os.path.isdir(self.directorio):
+            return []
+        ejecuciones = []
+        for entrada in os.listdir(self.directorio):
+            ruta = os.path.join(self.directorio, entrada)
+            try:
+                with open(os.path.join(ruta, MANIFIESTO)) as archivo:
+                    manifiesto = json.load(archivo)
+            except (OSError, ValueError):
+                # Directorio sin manifiesto válido: se trata como el más viejo
+                manifiesto = {"run_id": -1, "estado": "desconocido", "actualizado": 0}
+            ejecuciones.append((ruta, manifiesto))
+        return sorted(ejecuciones, key=lambda e: e[1].get("run_id") or -1, reverse=True)
+
+    def iniciar(self, run_id, data_source, reanudar_horas=24.0):
+        """
+        Checkpoints de una ejecución nueva. Si la última ejecución con el mismo
+        origen de datos no terminó bien y es reciente, se retoman sus checkpoints
+        """
+        origen = None
+        if reanudar_horas:
+            for ruta, manifiesto in self._ejecuciones():
+                if manifiesto.get("data_source") != data_source or manifiesto.get("run_id") == run_id:
+                    continue
+                reciente = time.time() - manifiesto.get("actualizado", 0) <= reanudar_horas * 3600
+                if manifiesto.get("estado") != "completed" and reciente:
+                    origen = Ejecucion(ruta, manifiesto["run_id"])
+                    logger.info(f"Se retoman los checkpoints de la ejecución {origen.run_id}")
+                # Solo cuenta la última ejecución de este origen
+                break
+        return RunCheckpoints(os.path.join(self.directorio, f"run_{run_id}"), run_id, data_source, origen)
+
+    def gc(self, conservar=None):
+        """Borra checkpoints más viejos que max_horas y, si el total supera max_mb, los más antiguos"""
+        ejecuciones = [(ruta, m) for ruta, m in self._ejecuciones() if m.get("run_id") != conservar]
+        ahora = time.time()
+        borradas = []
+        vigentes = []
+        for ruta, manifiesto in ejecuciones:
+            if ahora - manifiesto.get("actualizado", 0) > self.max_horas * 3600:
+                shutil.rmtree(ruta, ignore_errors=True)
+                borradas.append(manifiesto.get("run_id"))
+            else:
+                vigentes.append((ruta, manifiesto.get("run_id"), _tamano(ruta)))
+
+        limite = self.max_mb * 1024 * 1024
+        total = sum(tamano for _, _, tamano in vigentes)
+        if conservar is not None:
+            total += _tamano(os.path.join(self.directorio, f"run_{conservar}"))
+        # vigentes va de la más reciente a la más antigua
+        while vigentes and total > limite:
+            ruta, run_id, tamano = vigentes.pop()
+            shutil.rmtree(ruta, ignore_errors=True)
+            borradas.append(run_id)
+            total -= tamano
+
+        if borradas:
+            logger.info(f"Checkpoints del ETL borrados: {borradas} (quedan {total / (1024 * 1024):.1f} MB)")
+        return {"borradas": borradas, "mb": round(total / (1024 * 1024), 1)}
+
+    def get_status(self):
+        ejecuciones = self._ejecuciones()
+        return {
+            "directorio": self.directorio,
+            "ejecuciones": [
+                {"run_id": m.get("run_id"), "estado": m.get("estado"), "mb": round(_tamano(ruta) / (1024 * 1024), 1)}
+                for ruta, m in ejecuciones
+            ],
+            "max_horas": self.max_horas,
+            "max_mb": self.max_mb
+        }
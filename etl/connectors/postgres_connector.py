@@ -2,9 +2,25 @@ import pandas as pd
 from sqlalchemy import create_engine, text
 import logging
 from config.settings import settings
+from etl.dimensions import DIMENSIONES, desenlaces_select_sql, tipo_clave
 
 logger = logging.getLogger(__name__)
 
+# Tablas con columna unidad_id (dashboard_desenlaces además está particionada por unidad)
+TABLAS_POR_UNIDAD = [
+    'dashboard_desenlaces',
+    'dashboard_stats_aseguradora',
+    'dashboard_stats_mensual',
+    'dashboard_stats_edad_sexo',
+    'dashboard_sketch_estancia',
+    'dashboard_sketch_pacientes',
+    'dashboard_sketch_diagnosticos',
+]
+
+def particion_desenlaces(unidad_id):
+    """Nombre de la partición de dashboard_desenlaces de una unidad"""
+    return f"dashboard_desenlaces_u{int(unidad_id)}"
+
 class PostgresConnector:
     def __init__(self):
         self.engine = None
@@ -26,29 +42,56 @@ class PostgresConnector:
             if not self.engine:
                 self.connect()
             
-            # Tabla para datos de desenlaces procesados
+            # Tablas de dimensión (textos repetidos con clave SMALLINT, INTEGER en texto libre)
+            create_dimension_tables = [
+                text(f"""
+                    CREATE TABLE IF NOT EXISTS {tabla} (
+                        id {'SERIAL' if tipo_clave(columna) == 'INTEGER' else 'SMALLSERIAL'} PRIMARY KEY,
+                        nombre TEXT NOT NULL UNIQUE
+                    )
+                """)
+                for columna, (tabla, _) in DIMENSIONES.items()
+            ]
+            
+            # Tabla para datos de desenlaces procesados, particionada por unidad
             create_desenlaces_table = text("""
                 CREATE TABLE IF NOT EXISTS dashboard_desenlaces (
-                    id SERIAL PRIMARY KEY,
+                    id SERIAL,
+                    unidad_id SMALLINT NOT NULL,
                     desenlaceq_id INTEGER,
                     numero_episodio INTEGER,
                     fecha_ingreso DATE,
                     fecha_egreso DATE,
                     dias_estancia INTEGER,
-                    diagnostico TEXT,
-                    sala_egreso VARCHAR(100),
+                    diagnostico_key INTEGER REFERENCES dim_diagnostico(id),
+                    sala_egreso_key SMALLINT REFERENCES dim_sala_egreso(id),
                     causa TEXT,
                     nombre_paciente VARCHAR(200),
                     sexo VARCHAR(10),
                     edad INTEGER,
-                    medico_tratante VARCHAR(200),
+                    medico_tratante_key INTEGER REFERENCES dim_medico_tratante(id),
                     numero_historia_clinica VARCHAR(50),
-                    nombre_aseguradora VARCHAR(200),
-                    condicion_egreso_nombre VARCHAR(100),
-                    fecha_procesamiento TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
+                    aseguradora_key SMALLINT REFERENCES dim_aseguradora(id),
+                    condicion_egreso_key SMALLINT REFERENCES dim_condicion_egreso(id),
+                    fecha_procesamiento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (unidad_id, id)
+                ) PARTITION BY LIST (unidad_id)
             """)
             
+            # Índices del padre particionado (se crean en cada partición)
+            create_desenlaces_indexes = [
+                text(f"CREATE INDEX IF NOT EXISTS idx_desenlaces_{clave} ON dashboard_desenlaces ({clave})")
+                for _, clave in DIMENSIONES.values()
+            ]
+            create_desenlaces_indexes.append(text(
+                "CREATE INDEX IF NOT EXISTS idx_desenlaces_fecha_ingreso ON dashboard_desenlaces (fecha_ingreso)"
+            ))
+            
+            # Vista con la forma original de la tabla para consultas SELECT *
+            create_desenlaces_view = text(
+                "CREATE OR REPLACE VIEW dashboard_desenlaces_vista AS " + desenlaces_select_sql()
+            )
+            
             # Tabla para estadísticas por aseguradora
             create_stats_aseguradora_table = text("""
                 CREATE TABLE IF NOT EXISTS dashboard_stats_aseguradora (
@@ -76,23 +119,116 @@ class PostgresConnector:
                 )
             """)
             
-            # Tabla para estadísticas por edad y sexo
-            create_stats_demografia_table = text("""
-                CREATE TABLE IF NOT EXISTS dashboard_stats_demografia (
+            # Casos y suma de estancia por sexo y año de edad: cualquier banda de
+            # edad se calcula sumando estas filas (reemplaza a dashboard_stats_demografia)
+            create_stats_edad_sexo_table = text("""
+                CREATE TABLE IF NOT EXISTS dashboard_stats_edad_sexo (
                     id SERIAL PRIMARY KEY,
                     sexo VARCHAR(10),
-                    rango_edad VARCHAR(20),
+                    edad SMALLINT,
                     total_casos INTEGER,
-                    promedio_estancia DECIMAL(10,2),
+                    casos_estancia INTEGER,
+                    suma_estancia DOUBLE PRECISION,
+                    fecha_procesamiento TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Histogramas de días de estancia por día de ingreso y segmento
+            create_sketch_estancia_table = text("""
+                CREATE TABLE IF NOT EXISTS dashboard_sketch_estancia (
+                    id SERIAL PRIMARY KEY,
+                    fecha DATE NOT NULL,
+                    aseguradora_key SMALLINT,
+                    condicion_egreso_key SMALLINT,
+                    sexo VARCHAR(10),
+                    total_casos INTEGER,
+                    suma_estancia BIGINT,
+                    histograma JSONB,
+                    fecha_procesamiento TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            create_sketch_estancia_index = text(
+                "CREATE INDEX IF NOT EXISTS idx_sketch_estancia_fecha ON dashboard_sketch_estancia (fecha)"
+            )
+            create_sketch_estancia_unidad_index = text(
+                "CREATE INDEX IF NOT EXISTS idx_sketch_estancia_unidad_fecha ON dashboard_sketch_estancia (unidad_id, fecha)"
+            )
+            
+            # Sketches HyperLogLog de pacientes únicos por día de ingreso y segmento
+            create_sketch_pacientes_table = text("""
+                CREATE TABLE IF NOT EXISTS dashboard_sketch_pacientes (
+                    id SERIAL PRIMARY KEY,
+                    fecha DATE NOT NULL,
+                    aseguradora_key SMALLINT,
+                    condicion_egreso_key SMALLINT,
+                    sexo VARCHAR(10),
+                    total_casos INTEGER,
+                    hll JSONB,
                     fecha_procesamiento TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
+            create_sketch_pacientes_index = text(
+                "CREATE INDEX IF NOT EXISTS idx_sketch_pacientes_fecha ON dashboard_sketch_pacientes (fecha)"
+            )
+            create_sketch_pacientes_unidad_index = text(
+                "CREATE INDEX IF NOT EXISTS idx_sketch_pacientes_unidad_fecha ON dashboard_sketch_pacientes (unidad_id, fecha)"
+            )
+            
+            # Resúmenes Space-Saving de diagnósticos por día de ingreso y segmento
+            create_sketch_diagnosticos_table = text("""
+                CREATE TABLE IF NOT EXISTS dashboard_sketch_diagnosticos (
+                    id SERIAL PRIMARY KEY,
+                    fecha DATE NOT NULL,
+                    aseguradora_key SMALLINT,
+                    condicion_egreso_key SMALLINT,
+                    sexo VARCHAR(10),
+                    total_casos INTEGER,
+                    resumen JSONB,
+                    fecha_procesamiento TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            create_sketch_diagnosticos_index = text(
+                "CREATE INDEX IF NOT EXISTS idx_sketch_diagnosticos_unidad_fecha ON dashboard_sketch_diagnosticos (unidad_id, fecha)"
+            )
+            
+            # unidad_id en las tablas de estadísticas (filas previas = unidad por defecto)
+            migrate_stats_tables = []
+            for tabla in TABLAS_POR_UNIDAD[1:]:
+                migrate_stats_tables.append(text(
+                    f"ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS unidad_id SMALLINT NOT NULL "
+                    f"DEFAULT {int(settings.UNIDAD_DEFECTO)}"
+                ))
+            for tabla in TABLAS_POR_UNIDAD[1:4]:
+                migrate_stats_tables.append(text(
+                    f"CREATE INDEX IF NOT EXISTS idx_{tabla.replace('dashboard_', '')}_unidad ON {tabla} (unidad_id)"
+                ))
             
             with self.engine.connect() as connection:
+                for statement in create_dimension_tables:
+                    connection.execute(statement)
                 connection.execute(create_desenlaces_table)
+                self._migrar_columnas_texto(connection)
+                # Antes de particionar: ATTACH exige los mismos tipos que el padre nuevo
+                self._ampliar_claves(connection)
+                self._migrar_a_particiones(connection, create_desenlaces_table)
+                for statement in create_desenlaces_indexes:
+                    connection.execute(statement)
+                for unidad_id in settings.unidades:
+                    self._crear_particion(connection, unidad_id)
+                connection.execute(create_desenlaces_view)
                 connection.execute(create_stats_aseguradora_table)
                 connection.execute(create_stats_mensual_table)
-                connection.execute(create_stats_demografia_table)
+                connection.execute(create_stats_edad_sexo_table)
+                connection.execute(create_sketch_estancia_table)
+                connection.execute(create_sketch_estancia_index)
+                connection.execute(create_sketch_pacientes_table)
+                connection.execute(create_sketch_pacientes_index)
+                connection.execute(create_sketch_diagnosticos_table)
+                for statement in migrate_stats_tables:
+                    connection.execute(statement)
+                connection.execute(create_sketch_estancia_unidad_index)
+                connection.execute(create_sketch_pacientes_unidad_index)
+                connection.execute(create_sketch_diagnosticos_index)
                 connection.commit()
             
             logger.info("Tablas creadas exitosamente en PostgreSQL")
@@ -102,26 +238,187 @@ class PostgresConnector:
             logger.error(f"Error creando tablas: {e}")
             return False
     
-    def load_data(self, df, table_name, if_exists='replace'):
-        """Carga datos a PostgreSQL"""
+    def _columnas(self, connection, tabla):
+        """Columnas y tipos actuales de una tabla del esquema"""
+        rows = connection.execute(text("""
+            SELECT column_name, data_type FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = :tabla
+        """), {'tabla': tabla}).fetchall()
+        return dict(rows)
+    
+    def _migrar_columnas_texto(self, connection):
+        """
+        Pasa un dashboard_desenlaces con columnas de texto a claves de dimensión.
+        Las claves se completan desde el texto antes de quitar cada columna, en
+        la misma transacción que create_tables: si algo falla no se pierde nada
+        """
+        columnas = self._columnas(connection, 'dashboard_desenlaces')
+        for columna, (tabla, clave) in DIMENSIONES.items():
+            connection.execute(text(
+                f"ALTER TABLE dashboard_desenlaces ADD COLUMN IF NOT EXISTS {clave} {tipo_clave(columna)} REFERENCES {tabla}(id)"
+            ))
+            if columna not in columnas:
+                continue
+            
+            logger.info(f"Migrando dashboard_desenlaces.{columna} a {tabla}")
+            connection.execute(text(f"""
+                INSERT INTO {tabla} (nombre)
+                SELECT DISTINCT TRIM(d.{columna}) FROM dashboard_desenlaces d
+                WHERE TRIM(d.{columna}) <> ''
+                  AND NOT EXISTS (SELECT 1 FROM {tabla} t WHERE t.nombre = TRIM(d.{columna}))
+            """))
+            connection.execute(text(f"""
+                UPDATE dashboard_desenlaces d SET {clave} = t.id
+                FROM {tabla} t
+                WHERE t.nombre = TRIM(d.{columna}) AND d.{clave} IS NULL
+            """))
+            connection.execute(text(f"ALTER TABLE dashboard_desenlaces DROP COLUMN {columna}"))
+    
+    def _ampliar_claves(self, connection):
+        """Pasa a INTEGER las claves de texto libre creadas como SMALLINT"""
+        columnas = self._columnas(connection, 'dashboard_desenlaces')
+        for columna, (tabla, clave) in DIMENSIONES.items():
+            if tipo_clave(columna) != 'INTEGER':
+                continue
+            if 'smallint' in (columnas.get(clave), self._columnas(connection, tabla).get('id')):
+                # La vista depende de ambas columnas; create_tables la vuelve a crear después
+                connection.execute(text("DROP VIEW IF EXISTS dashboard_desenlaces_vista"))
+            if columnas.get(clave) == 'smallint':
+                logger.info(f"Ampliando dashboard_desenlaces.{clave} a INTEGER")
+                connection.execute(text(f"ALTER TABLE dashboard_desenlaces ALTER COLUMN {clave} TYPE INTEGER"))
+            if self._columnas(connection, tabla).get('id') == 'smallint':
+                logger.info(f"Ampliando {tabla}.id a INTEGER")
+                connection.execute(text(f"ALTER TABLE {tabla} ALTER COLUMN id TYPE INTEGER"))
+                secuencia = connection.execute(
+                    text("SELECT pg_get_serial_sequence(:tabla, 'id')"), {'tabla': tabla}
+                ).scalar()
+                if secuencia:
+                    connection.execute(text(f"ALTER SEQUENCE {secuencia} AS INTEGER"))
+    
+    def _migrar_a_particiones(self, connection, create_desenlaces_table):
+        """
+        Convierte un dashboard_desenlaces previo (sin particiones) en la
+        partición de la unidad por defecto del nuevo padre particionado
+        """
+        relkind = connection.execute(text(
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass('dashboard_desenlaces')"
+        )).scalar()
+        if relkind != 'r':
+            return
+        
+        unidad = int(settings.UNIDAD_DEFECTO)
+        particion = particion_desenlaces(unidad)
+        logger.info(f"Migrando dashboard_desenlaces a tabla particionada (datos previos -> {particion})")
+        connection.execute(text(
+            f"ALTER TABLE dashboard_desenlaces ADD COLUMN IF NOT EXISTS unidad_id SMALLINT NOT NULL DEFAULT {unidad}"
+        ))
+        connection.execute(text("ALTER TABLE dashboard_desenlaces ALTER COLUMN unidad_id DROP DEFAULT"))
+        # Los índices y la PK (id) se reemplazan por los del padre, que ATTACH crea en la partición
+        for _, clave in DIMENSIONES.values():
+            connection.execute(text(f"DROP INDEX IF EXISTS idx_desenlaces_{clave}"))
+        connection.execute(text("ALTER TABLE dashboard_desenlaces DROP CONSTRAINT IF EXISTS dashboard_desenlaces_pkey"))
+        connection.execute(text(f"ALTER TABLE dashboard_desenlaces RENAME TO {particion}"))
+        connection.execute(create_desenlaces_table)
+        connection.execute(text(f"ALTER TABLE dashboard_desenlaces ATTACH PARTITION {particion} FOR VALUES IN ({unidad})"))
+        # Los ids nuevos continúan después de los existentes
+        connection.execute(text(
+            "SELECT setval(pg_get_serial_sequence('dashboard_desenlaces', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 0) + 1 FROM {particion}), false)"
+        ))
+    
+    def _crear_particion(self, connection, unidad_id):
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {particion_desenlaces(unidad_id)} "
+            f"PARTITION OF dashboard_desenlaces FOR VALUES IN ({int(unidad_id)})"
+        ))
+    
+    def ensure_unidad(self, unidad_id):
+        """Crea la partición de una unidad nueva (sin tocar las existentes)"""
+        if not self.engine:
+            self.connect()
+        with self.engine.connect() as connection:
+            self._crear_particion(connection, unidad_id)
+            connection.commit()
+    
+    def load_data(self, df, table_name, if_exists='replace', unidad_id=None):
+        """Carga datos a PostgreSQL; con unidad_id solo reemplaza las filas de esa unidad"""
         try:
             if not self.engine:
                 self.connect()
             
+            if unidad_id is not None:
+                df = df.assign(unidad_id=int(unidad_id))
+            
             # Limpiar tabla antes de insertar nuevos datos
             if if_exists == 'replace':
                 with self.engine.connect() as connection:
-                    connection.execute(text(f"DELETE FROM {table_name}"))
+                    if unidad_id is not None:
+                        # En dashboard_desenlaces solo toca la partición de la unidad
+                        connection.execute(text(f"DELETE FROM {table_name} WHERE unidad_id = :unidad_id"),
+                                           {'unidad_id': int(unidad_id)})
+                    else:
+                        connection.execute(text(f"DELETE FROM {table_name}"))
                     connection.commit()
             
             df.to_sql(table_name, self.engine, if_exists='append', index=False)
-            logger.info(f"Cargados {len(df)} registros en tabla {table_name}")
+            logger.info(f"Cargados {len(df)} registros en tabla {table_name}"
+                        + (f" (unidad {unidad_id})" if unidad_id is not None else ""))
             return True
             
         except Exception as e:
             logger.error(f"Error cargando datos en tabla {table_name}: {e}")
             return False
     
+    def sync_dimension(self, table_name, valores):
+        """Registra los valores que faltan en una tabla de dimensión y retorna el mapa nombre -> clave"""
+        if not self.engine:
+            self.connect()
+        
+        nombres = sorted({v for v in valores if isinstance(v, str) and v})
+        if not nombres:
+            return {}
+        
+        consulta = text(f"SELECT id, nombre FROM {table_name} WHERE nombre = ANY(:nombres)")
+        with self.engine.connect() as connection:
+            mapa = {nombre: key for key, nombre in connection.execute(consulta, {'nombres': nombres})}
+            faltantes = [nombre for nombre in nombres if nombre not in mapa]
+            if faltantes:
+                # Solo los que faltan: cada INSERT consume un valor de la secuencia aunque choque
+                # con ON CONFLICT (que queda para cargas concurrentes de otras unidades)
+                connection.execute(
+                    text(f"INSERT INTO {table_name} (nombre) VALUES (:nombre) ON CONFLICT (nombre) DO NOTHING"),
+                    [{'nombre': v} for v in faltantes]
+                )
+                mapa.update({nombre: key for key, nombre in connection.execute(consulta, {'nombres': faltantes})})
+            connection.commit()
+        
+        return mapa
+    
+    def encode_dimensions(self, df):
+        """Reemplaza las columnas de texto repetido por sus claves de dimensión"""
+        encoded_df = df.copy()
+        for columna, (tabla, clave) in DIMENSIONES.items():
+            if columna not in encoded_df.columns:
+                continue
+            valores = encoded_df[columna].where(encoded_df[columna].notna(), None)
+            valores = valores.map(lambda v: v.strip() if isinstance(v, str) else v)
+            mapa = self.sync_dimension(tabla, valores.dropna().unique())
+            encoded_df[clave] = valores.map(mapa).astype('Int32' if tipo_clave(columna) == 'INTEGER' else 'Int16')
+            encoded_df = encoded_df.drop(columns=[columna])
+        return encoded_df
+    
+    def load_desenlaces(self, df, if_exists='replace', unidad_id=None):
+        """Carga desenlaces en dashboard_desenlaces usando claves de dimensión"""
+        try:
+            encoded_df = self.encode_dimensions(df)
+        except Exception as e:
+            logger.error(f"Error codificando dimensiones de desenlaces: {e}")
+            return False
+        
+        unidad_id = unidad_id if unidad_id is not None else settings.UNIDAD_DEFECTO
+        self.ensure_unidad(unidad_id)
+        return self.load_data(encoded_df, 'dashboard_desenlaces', if_exists, unidad_id=unidad_id)
+    
     def get_data(self, query):
         """Extrae datos de PostgreSQL"""
         try:
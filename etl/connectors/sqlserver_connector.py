@@ -7,34 +7,38 @@ from config.settings import settings
 logger = logging.getLogger(__name__)
 
 class SQLServerConnector:
-    def __init__(self):
+    def __init__(self, connection_string=None, unidad_id=None):
         self.engine = None
-        self.connection_string = settings.sqlserver_url
+        self.unidad_id = unidad_id if unidad_id is not None else settings.UNIDAD_DEFECTO
+        self.connection_string = connection_string or settings.sqlserver_url
     
     def connect(self):
         """Establece conexión con SQL Server - Base de datos fibidesen1"""
         try:
             self.engine = create_engine(self.connection_string)
-            logger.info("Conexión establecida con SQL Server - fibidesen1")
+            logger.info(f"Conexión establecida con SQL Server - fibidesen1 (unidad {self.unidad_id})")
             return True
         except Exception as e:
-            logger.error(f"Error conectando a SQL Server fibidesen1: {e}")
+            logger.error(f"Error conectando a SQL Server fibidesen1 (unidad {self.unidad_id}): {e}")
             return False
     
-    def extract_data(self, query):
-        """Extrae datos usando una consulta SQL"""
+    def extract_data(self, query, chunksize=None):
+        """Extrae datos usando una consulta SQL (con chunksize retorna un iterador de DataFrames)"""
         try:
             if not self.engine:
                 self.connect()
             
+            if chunksize:
+                return pd.read_sql_query(query, self.engine, chunksize=chunksize)
+            
             df = pd.read_sql_query(query, self.engine)
-            logger.info(f"Extraídos {len(df)} registros de fibidesen1")
+            logger.info(f"Extraídos {len(df)} registros de fibidesen1 (unidad {self.unidad_id})")
             return df
         except Exception as e:
-            logger.error(f"Error extrayendo datos de fibidesen1: {e}")
+            logger.error(f"Error extrayendo datos de fibidesen1 (unidad {self.unidad_id}): {e}")
             return pd.DataFrame()
     
-    def get_desenlaces_data(self):
+    def get_desenlaces_data(self, chunksize=None):
         """Extrae datos de desenlaces quemados con información completa"""
         query = """
         SELECT 
@@ -62,7 +66,7 @@ class SQLServerConnector:
         WHERE dq.fecha_ingreso >= DATEADD(day, -90, GETDATE())
         ORDER BY dq.fecha_ingreso DESC
         """
-        return self.extract_data(query)
+        return self.extract_data(query, chunksize=chunksize)
     
     def get_episodios_data(self):
         """Extrae datos de episodios médicos"""
@@ -138,31 +142,19 @@ class SQLServerConnector:
         return self.extract_data(query)
     
     def get_estadisticas_por_edad_sexo(self):
-        """Genera estadísticas por edad y sexo"""
+        """Casos y suma de estancia por sexo y año de edad (las bandas se arman en la API)"""
         query = """
         SELECT 
             e.sexo,
-            CASE 
-                WHEN e.edad < 18 THEN 'Menor de 18'
-                WHEN e.edad BETWEEN 18 AND 30 THEN '18-30'
-                WHEN e.edad BETWEEN 31 AND 50 THEN '31-50'
-                WHEN e.edad BETWEEN 51 AND 70 THEN '51-70'
-                ELSE 'Mayor de 70'
-            END as rango_edad,
+            e.edad,
             COUNT(dq.desenlaceq_id) as total_casos,
-            AVG(CAST(dq.dias_estancia AS FLOAT)) as promedio_estancia
+            COUNT(dq.dias_estancia) as casos_estancia,
+            SUM(CAST(dq.dias_estancia AS FLOAT)) as suma_estancia
         FROM desenlaces_quemados dq
         LEFT JOIN episodio e ON dq.numero_episodio = e.numero_episodio_id
         WHERE dq.fecha_ingreso >= DATEADD(day, -90, GETDATE())
-        GROUP BY e.sexo, 
-                CASE 
-                    WHEN e.edad < 18 THEN 'Menor de 18'
-                    WHEN e.edad BETWEEN 18 AND 30 THEN '18-30'
-                    WHEN e.edad BETWEEN 31 AND 50 THEN '31-50'
-                    WHEN e.edad BETWEEN 51 AND 70 THEN '51-70'
-                    ELSE 'Mayor de 70'
-                END
-        ORDER BY e.sexo, rango_edad
+        GROUP BY e.sexo, e.edad
+        ORDER BY e.sexo, e.edad
         """
         return self.extract_data(query)
     
@@ -170,4 +162,4 @@ class SQLServerConnector:
         """Cierra la conexión"""
         if self.engine:
             self.engine.dispose()
-            logger.info("Conexión cerrada con SQL Server fibidesen1")
+            logger.info(f"Conexión cerrada con SQL Server fibidesen1 (unidad {self.unidad_id})")
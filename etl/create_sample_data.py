@@ -9,7 +9,7 @@ import pandas as pd
 from datetime import datetime, timedelta
 import random
 import uuid
-from connectors.postgres_connector import PostgresConnector
+from etl.connectors.postgres_connector import PostgresConnector
 from config.settings import settings
 
 # Configurar logging
@@ -156,32 +156,15 @@ class SampleDataGenerator:
         
         return stats
     
-    def generate_stats_demografia(self, desenlaces_df):
-        """Genera estadísticas demográficas"""
-        logger.info("Generando estadísticas demográficas...")
-        
-        # Categorizar edades
-        def categorizar_edad(edad):
-            if edad < 18:
-                return 'Menor de 18'
-            elif 18 <= edad <= 30:
-                return '18-30'
-            elif 31 <= edad <= 50:
-                return '31-50'
-            elif 51 <= edad <= 70:
-                return '51-70'
-            else:
-                return 'Mayor de 70'
-        
-        desenlaces_df['rango_edad'] = desenlaces_df['edad'].apply(categorizar_edad)
-        
-        stats = desenlaces_df.groupby(['sexo', 'rango_edad']).agg({
-            'desenlaceq_id': 'count',
-            'dias_estancia': 'mean'
-        }).reset_index()
-        
-        stats.columns = ['sexo', 'rango_edad', 'total_casos', 'promedio_estancia']
-        stats['promedio_estancia'] = stats['promedio_estancia'].round(1)
+    def generate_stats_edad_sexo(self, desenlaces_df):
+        """Genera casos y suma de estancia por sexo y año de edad"""
+        logger.info("Generando estadísticas por edad y sexo...")
+        
+        stats = desenlaces_df.groupby(['sexo', 'edad'], dropna=False).agg(
+            total_casos=('desenlaceq_id', 'count'),
+            casos_estancia=('dias_estancia', 'count'),
+            suma_estancia=('dias_estancia', 'sum')
+        ).reset_index()
         stats['fecha_procesamiento'] = datetime.now()
         
         return stats
@@ -197,15 +180,15 @@ class SampleDataGenerator:
             # 2. Generar estadísticas
             stats_aseg = self.generate_stats_aseguradora(desenlaces_df)
             stats_mensual = self.generate_stats_mensual(desenlaces_df)
-            stats_demo = self.generate_stats_demografia(desenlaces_df)
+            stats_edad_sexo = self.generate_stats_edad_sexo(desenlaces_df)
             
             # 3. Cargar en base de datos
             logger.info("Cargando datos en PostgreSQL...")
             
-            success1 = self.postgres.load_data(desenlaces_df, 'dashboard_desenlaces')
+            success1 = self.postgres.load_desenlaces(desenlaces_df)
             success2 = self.postgres.load_data(stats_aseg, 'dashboard_stats_aseguradora')  
             success3 = self.postgres.load_data(stats_mensual, 'dashboard_stats_mensual')
-            success4 = self.postgres.load_data(stats_demo, 'dashboard_stats_demografia')
+            success4 = self.postgres.load_data(stats_edad_sexo, 'dashboard_stats_edad_sexo')
             
             if all([success1, success2, success3, success4]):
                 logger.info("✅ Datos de ejemplo cargados exitosamente!")
@@ -213,7 +196,7 @@ class SampleDataGenerator:
                 logger.info(f"   - {len(desenlaces_df)} desenlaces")
                 logger.info(f"   - {len(stats_aseg)} aseguradoras")
                 logger.info(f"   - {len(stats_mensual)} meses")
-                logger.info(f"   - {len(stats_demo)} grupos demográficos")
+                logger.info(f"   - {len(stats_edad_sexo)} grupos por edad y sexo")
                 return True
             else:
                 logger.error("❌ Error cargando algunos datos")
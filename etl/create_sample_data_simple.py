@@ -7,7 +7,8 @@ Para despliegue inicial en Render
 import logging
 import random
 from datetime import datetime, timedelta
-from connectors.postgres_connector import PostgresConnector
+from config.settings import settings
+from etl.connectors.postgres_connector import PostgresConnector
 
 logger = logging.getLogger(__name__)
 
@@ -55,9 +56,18 @@ class SimpleSampleDataGenerator:
                 conn.execute("DELETE FROM dashboard_desenlaces")
                 conn.execute("DELETE FROM dashboard_stats_aseguradora")
                 conn.execute("DELETE FROM dashboard_stats_mensual")
-                conn.execute("DELETE FROM dashboard_stats_demografia")
+                conn.execute("DELETE FROM dashboard_stats_edad_sexo")
                 conn.commit()
             
+            # dashboard_desenlaces está particionada por unidad: las filas van a la unidad por defecto
+            unidad_id = int(settings.UNIDAD_DEFECTO)
+            self.postgres.ensure_unidad(unidad_id)
+            
+            # Registrar valores de dimensión y obtener sus claves
+            diagnostico_keys = self.postgres.sync_dimension('dim_diagnostico', self.diagnosticos)
+            aseguradora_keys = self.postgres.sync_dimension('dim_aseguradora', self.aseguradoras)
+            condicion_keys = self.postgres.sync_dimension('dim_condicion_egreso', self.condiciones)
+            
             # Generar 50 registros de ejemplo
             base_date = datetime.now() - timedelta(days=90)
             
@@ -69,24 +79,25 @@ class SimpleSampleDataGenerator:
                 # Insertar desenlace
                 query = """
                 INSERT INTO dashboard_desenlaces 
-                (desenlaceq_id, numero_episodio, fecha_ingreso, fecha_egreso, 
-                 dias_estancia, diagnostico, nombre_paciente, sexo, edad, 
-                 nombre_aseguradora, condicion_egreso_nombre, fecha_procesamiento)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                (unidad_id, desenlaceq_id, numero_episodio, fecha_ingreso, fecha_egreso, 
+                 dias_estancia, diagnostico_key, nombre_paciente, sexo, edad, 
+                 aseguradora_key, condicion_egreso_key, fecha_procesamiento)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """
                 
                 values = (
+                    unidad_id,
                     i + 1,
                     i + 1000,
                     fecha_ingreso.date(),
                     fecha_egreso.date(),
                     dias_estancia,
-                    random.choice(self.diagnosticos),
+                    diagnostico_keys[random.choice(self.diagnosticos)],
                     random.choice(self.nombres),
                     random.choice(['Masculino', 'Femenino']),
                     random.randint(18, 80),
-                    random.choice(self.aseguradoras),
-                    random.choice(self.condiciones),
+                    aseguradora_keys[random.choice(self.aseguradoras)],
+                    condicion_keys[random.choice(self.condiciones)],
                     datetime.now()
                 )
                 
@@ -0,0 +1,180 @@
+"""
+Ejecución del ETL como grafo de tareas con dependencias declaradas
+Las tareas que no dependen entre sí corren en paralelo en un pool de hilos
+(cada una toma su propia conexión), con reintentos y tiempos por tarea.
+Se puede ejecutar solo un subconjunto: las tareas elegidas más las que necesitan
+"""
+
+import fnmatch
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+class DAGError(Exception):
+    """Grafo inválido (dependencia inexistente o ciclo) o selección sin tareas"""
+
+class Tarea:
+    def __init__(self, nombre, funcion, depende_de=(), reintentos=0):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.depende_de = list(depende_de)
+        self.reintentos = reintentos
+        self.estado = "pendiente"
+        self.intentos = 0
+        self.inicio = None
+        self.segundos = None
+        self.error = None
+        self.resultado = None
+
+    def to_dict(self):
+        return {
+            "tarea": self.nombre,
+            "depende_de": self.depende_de,
+            "estado": self.estado,
+            "intentos": self.intentos,
+            "inicio_segundos": round(self.inicio, 3) if self.inicio is not None else None,
+            "segundos": round(self.segundos, 3) if self.segundos is not None else None,
+            "error": self.error
+        }
+
+class DAG:
+    def __init__(self, workers=4, reintentos=0, espera_reintento=1.0):
+        self.workers = max(1, workers)
+        self.reintentos = reintentos
+        self.espera_reintento = espera_reintento
+        self.tareas = {}
+        self._t0 = None
+
+    def tarea(self, nombre, funcion, depende_de=(), reintentos=None):
+        """
+        Registra una tarea; funcion recibe un dict {dependencia: resultado}
+        y su valor de retorno queda disponible para las tareas que dependen de ella
+        """
+        if nombre in self.tareas:
+            raise DAGError(f"Tarea duplicada: {nombre}")
+        self.tareas[nombre] = Tarea(
+            nombre, funcion, depende_de,
+            self.reintentos if reintentos is None else reintentos
+        )
+        return nombre
+
+    def validar(self):
+        """Verifica que las dependencias existan y que no haya ciclos"""
+        for tarea in self.tareas.values():
+            faltantes = [d for d in tarea.depende_de if d not in self.tareas]
+            if faltantes:
+                raise DAGError(f"La tarea {tarea.nombre} depende de tareas inexistentes: {faltantes}")
+
+        grados = {nombre: len(tarea.depende_de) for nombre, tarea in self.tareas.items()}
+        listas = [nombre for nombre, grado in grados.items() if grado == 0]
+        vistas = 0
+        while listas:
+            actual = listas.pop()
+            vistas += 1
+            for tarea in self.tareas.values():
+                if actual in tarea.depende_de:
+                    grados[tarea.nombre] -= 1
+                    if grados[tarea.nombre] == 0:
+                        listas.append(tarea.nombre)
+        if vistas != len(self.tareas):
+            ciclo = sorted(nombre for nombre, grado in grados.items() if grado > 0)
+            raise DAGError(f"Ciclo entre las tareas: {ciclo}")
+
+    def seleccionar(self, patrones=None):
+        """Tareas que coinciden con algún patrón (fnmatch) más todas las que necesitan"""
+        if not patrones:
+            return set(self.tareas)
+        elegidas = {
+            nombre for nombre in self.tareas
+            if any(fnmatch.fnmatchcase(nombre, patron) for patron in patrones)
+        }
+        if not elegidas:
+            raise DAGError(f"Ninguna tarea coincide con {list(patrones)}")
+        pendientes = list(elegidas)
+        while pendientes:
+            for dependencia in self.tareas[pendientes.pop()].depende_de:
+                if dependencia not in elegidas:
+                    elegidas.add(dependencia)
+                    pendientes.append(dependencia)
+        return elegidas
+
+    def ejecutar(self, patrones=None):
+        """
+        Ejecuta las tareas seleccionadas respetando dependencias. Una tarea que
+        falla (agotados sus reintentos) no detiene a las independientes; las que
+        dependen de ella quedan omitidas. Retorna los nombres de las fallidas
+        """
+        self.validar()
+        seleccion = self.seleccionar(patrones)
+        for tarea in self.tareas.values():
+            tarea.estado = "pendiente" if tarea.nombre in seleccion else "no_seleccionada"
+
+        self._t0 = time.perf_counter()
+        pendientes = [nombre for nombre in self.tareas if nombre in seleccion]
+        en_curso = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="etl-tarea") as pool:
+            while pendientes or en_curso:
+                cambios = True
+                while cambios:
+                    cambios = False
+                    for nombre in list(pendientes):
+                        tarea = self.tareas[nombre]
+                        estados = [self.tareas[d].estado for d in tarea.depende_de]
+                        if any(estado in ("error", "omitida") for estado in estados):
+                            tarea.estado = "omitida"
+                        elif all(estado == "ok" for estado in estados):
+                            tarea.estado = "en_curso"
+                            en_curso[pool.submit(self._correr, tarea)] = tarea
+                        else:
+                            continue
+                        pendientes.remove(nombre)
+                        cambios = True
+                if not en_curso:
+                    break
+                terminadas, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in terminadas:
+                    del en_curso[futuro]
+
+        fallidas = [t.nombre for t in self.tareas.values() if t.estado == "error"]
+        omitidas = [t.nombre for t in self.tareas.values() if t.estado == "omitida"]
+        logger.info(
+            f"DAG del ETL: {len(seleccion)} tareas en {time.perf_counter() - self._t0:.2f}s "
+            f"({len(fallidas)} fallidas, {len(omitidas)} omitidas)"
+        )
+        return fallidas
+
+    def _correr(self, tarea):
+        entradas = {dependencia: self.tareas[dependencia].resultado for dependencia in tarea.depende_de}
+        inicio = time.perf_counter()
+        tarea.inicio = inicio - self._t0
+        for intento in range(tarea.reintentos + 1):
+            tarea.intentos = intento + 1
+            try:
+                tarea.resultado = tarea.funcion(entradas)
+                tarea.estado = "ok"
+                tarea.error = None
+                break
+            except Exception as e:
+                tarea.error = str(e)
+                if intento < tarea.reintentos:
+                    espera = self.espera_reintento * 2 ** intento
+                    logger.warning(
+                        f"Tarea {tarea.nombre} falló (intento {intento + 1}/{tarea.reintentos + 1}): {e}; "
+                        f"reintento en {espera:.1f}s"
+                    )
+                    time.sleep(espera)
+                else:
+                    tarea.estado = "error"
+                    logger.error(f"Tarea {tarea.nombre} falló tras {tarea.intentos} intentos: {e}")
+        tarea.segundos = time.perf_counter() - inicio
+        return tarea
+
+    def resultado(self, nombre):
+        """Valor retornado por una tarea (None si no se ejecutó o falló)"""
+        tarea = self.tareas.get(nombre)
+        return tarea.resultado if tarea is not None and tarea.estado == "ok" else None
+
+    def to_list(self):
+        return [tarea.to_dict() for tarea in self.tareas.values()]
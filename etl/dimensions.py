@@ -0,0 +1,95 @@
+"""
+Dimensiones normalizadas de dashboard_desenlaces
+Los textos repetidos se guardan una sola vez en tablas dim_* y la tabla
+de hechos solo conserva claves SMALLINT (INTEGER en las de texto libre)
+"""
+
+# columna original -> (tabla de dimensión, columna clave en dashboard_desenlaces)
+DIMENSIONES = {
+    'nombre_aseguradora': ('dim_aseguradora', 'aseguradora_key'),
+    'condicion_egreso_nombre': ('dim_condicion_egreso', 'condicion_egreso_key'),
+    'sala_egreso': ('dim_sala_egreso', 'sala_egreso_key'),
+    'medico_tratante': ('dim_medico_tratante', 'medico_tratante_key'),
+    'diagnostico': ('dim_diagnostico', 'diagnostico_key'),
+}
+
+# Dimensiones de texto libre: su cantidad de valores no está acotada y
+# puede superar el rango de SMALLINT
+DIMENSIONES_TEXTO_LIBRE = ('medico_tratante', 'diagnostico')
+
+def tipo_clave(columna):
+    """Tipo SQL de la clave de una dimensión"""
+    return 'INTEGER' if columna in DIMENSIONES_TEXTO_LIBRE else 'SMALLINT'
+
+# Columnas expuestas por la API, en el orden histórico de la tabla
+COLUMNAS_DESENLACE = [
+    'id',
+    'desenlaceq_id',
+    'numero_episodio',
+    'fecha_ingreso',
+    'fecha_egreso',
+    'dias_estancia',
+    'diagnostico',
+    'sala_egreso',
+    'causa',
+    'nombre_paciente',
+    'sexo',
+    'edad',
+    'medico_tratante',
+    'numero_historia_clinica',
+    'nombre_aseguradora',
+    'condicion_egreso_nombre',
+    'fecha_procesamiento',
+    # Al final: CREATE OR REPLACE VIEW solo admite columnas nuevas al final
+    'unidad_id',
+]
+
+
+def _alias(columna):
+    """Alias SQL de la tabla de dimensión asociada a una columna"""
+    return DIMENSIONES[columna][0].replace('dim_', '')
+
+
+def columna_sql(columna):
+    """Expresión SQL que devuelve una columna de desenlace con su nombre original"""
+    if columna in DIMENSIONES:
+        return f"{_alias(columna)}.nombre AS {columna}"
+    return f"d.{columna}"
+
+
+def desenlaces_from_sql(columnas=None):
+    """Cláusula FROM de dashboard_desenlaces (alias d) con las dimensiones que usan las columnas"""
+    columnas = columnas or COLUMNAS_DESENLACE
+    joins = [
+        f"LEFT JOIN {tabla} {_alias(columna)} ON {_alias(columna)}.id = d.{clave}"
+        for columna, (tabla, clave) in DIMENSIONES.items()
+        if columna in columnas
+    ]
+    return "\n".join(["FROM dashboard_desenlaces d"] + joins)
+
+
+def desenlaces_select_sql(columnas=None):
+    """SELECT de desenlaces que conserva la forma original de la respuesta"""
+    columnas = columnas or COLUMNAS_DESENLACE
+    return "SELECT " + ", ".join(columna_sql(c) for c in columnas) + "\n" + desenlaces_from_sql(columnas)
+
+
+def columnas_pedidas(fields):
+    """
+    Columnas de un parámetro fields= ("fecha_ingreso,sexo"), validadas contra
+    COLUMNAS_DESENLACE y en su orden; None si no se pidió ninguna (todas)
+    """
+    pedidas = {campo.strip() for campo in (fields or '').split(',') if campo.strip()}
+    if not pedidas:
+        return None
+    desconocidas = pedidas - set(COLUMNAS_DESENLACE)
+    if desconocidas:
+        raise ValueError(
+            f"Campos no permitidos: {', '.join(sorted(desconocidas))}. "
+            f"Permitidos: {', '.join(COLUMNAS_DESENLACE)}"
+        )
+    return [columna for columna in COLUMNAS_DESENLACE if columna in pedidas]
+
+
+# Columnas de segmento de los resúmenes precalculados por día (dashboard_sketch_*)
+COLUMNAS_SEGMENTO = ['aseguradora_key', 'condicion_egreso_key', 'sexo']
@@ -5,7 +5,7 @@ Ejecutar una vez antes del primer ETL
 """
 
 import logging
-from connectors.postgres_connector import PostgresConnector
+from etl.connectors.postgres_connector import PostgresConnector
 from config.settings import settings
 
 logging.basicConfig(
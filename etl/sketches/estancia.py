@@ -0,0 +1,103 @@
+"""
+Histograma combinable de días de estancia
+Los días de estancia son enteros acotados (0-365), así que un conteo por
+valor es a la vez histograma y sketch de cuantiles exacto: se puede
+guardar por día y segmento y combinar para cualquier rango de fechas
+"""
+
+import json
+from collections import Counter
+
+# Rangos históricos de /estadisticas/estancia-promedio (límites inclusivos)
+RANGOS_ESTANCIA = [
+    ('1-7 días', 1, 7),
+    ('8-14 días', 8, 14),
+    ('15-21 días', 15, 21),
+    ('22-30 días', 22, 30),
+    ('Más de 30 días', 31, None),
+]
+
+class HistogramaEstancia:
+    """Conteo de casos por número de días de estancia"""
+
+    def __init__(self, conteos=None):
+        self.conteos = Counter()
+        for dias, casos in (conteos or {}).items():
+            self.conteos[int(dias)] += int(casos)
+
+    @classmethod
+    def from_values(cls, valores):
+        histograma = cls()
+        histograma.conteos.update(int(v) for v in valores)
+        return histograma
+
+    @classmethod
+    def from_json(cls, data):
+        """Acepta el JSON guardado en PostgreSQL (texto o dict ya decodificado)"""
+        if isinstance(data, str):
+            data = json.loads(data)
+        return cls(data)
+
+    def to_json(self):
+        return json.dumps({str(dias): casos for dias, casos in sorted(self.conteos.items())})
+
+    def merge(self, other):
+        """Combina otro histograma en este (suma de conteos)"""
+        self.conteos.update(other.conteos)
+        return self
+
+    @property
+    def total(self):
+        return sum(self.conteos.values())
+
+    @property
+    def suma(self):
+        return sum(dias * casos for dias, casos in self.conteos.items())
+
+    def promedio(self):
+        total = self.total
+        return self.suma / total if total else None
+
+    def minimo(self):
+        return min(self.conteos) if self.conteos else None
+
+    def maximo(self):
+        return max(self.conteos) if self.conteos else None
+
+    def _valor_en(self, posicion):
+        """Valor en la posición dada (base 0) de la secuencia ordenada de estancias"""
+        acumulado = 0
+        for dias in sorted(self.conteos):
+            acumulado += self.conteos[dias]
+            if posicion < acumulado:
+                return dias
+        return self.maximo()
+
+    def quantile(self, q):
+        """Cuantil con interpolación lineal (igual que PERCENTILE_CONT)"""
+        total = self.total
+        if not total:
+            return None
+        posicion = q * (total - 1)
+        inferior = int(posicion)
+        valor_inferior = self._valor_en(inferior)
+        if posicion == inferior:
+            return float(valor_inferior)
+        valor_superior = self._valor_en(inferior + 1)
+        return valor_inferior + (valor_superior - valor_inferior) * (posicion - inferior)
+
+    def rango(self, minimo, maximo=None):
+        """Sub-histograma con los valores dentro de [minimo, maximo]"""
+        return HistogramaEstancia({
+            dias: casos for dias, casos in self.conteos.items()
+            if dias >= minimo and (maximo is None or dias <= maximo)
+        })
+
+    def resumen(self):
+        promedio = self.promedio()
+        return {
+            'total_casos': self.total,
+            'promedio_estancia': round(promedio, 1) if promedio is not None else None,
+            'minimo': self.minimo(),
+            'maximo': self.maximo()
+        }
@@ -0,0 +1,113 @@
+"""
+Resumen Space-Saving combinable para los diagnósticos más frecuentes
+Cada día y segmento guarda hasta k contadores (diagnóstico -> casos, error,
+días de estancia sumados) y el "mínimo": cota de los casos de cualquier
+diagnóstico que quedó fuera. Combinar resúmenes suma contadores y, para un
+diagnóstico ausente en un resumen, suma su mínimo como casos y como error:
+los casos reales de cada diagnóstico quedan en [casos - error, casos]
+"""
+
+import json
+from collections import Counter
+
+K_DEFECTO = 32
+
+class SpaceSaving:
+    def __init__(self, k=K_DEFECTO, minimo=0):
+        self.k = k
+        self.minimo = minimo
+        # item -> [casos, error, casos con estancia, suma de estancia]
+        self.contadores = {}
+
+    @classmethod
+    def from_values(cls, items, estancias=None, k=K_DEFECTO):
+        """
+        Resumen de una secuencia completa de items (con su estancia opcional).
+        Con todos los valores a mano los k primeros se cuentan exactos y el
+        mínimo es el mayor conteo descartado
+        """
+        conteos = Counter()
+        estancia = {}
+        for posicion, item in enumerate(items):
+            if item is None or item != item:
+                continue
+            conteos[item] += 1
+            dias = estancias[posicion] if estancias is not None else None
+            if dias is not None and dias == dias:
+                acumulado = estancia.setdefault(item, [0, 0.0])
+                acumulado[0] += 1
+                acumulado[1] += float(dias)
+
+        ordenados = conteos.most_common()
+        resumen = cls(k, minimo=ordenados[k][1] if len(ordenados) > k else 0)
+        for item, casos in ordenados[:k]:
+            casos_estancia, suma = estancia.get(item, (0, 0.0))
+            resumen.contadores[item] = [casos, 0, casos_estancia, suma]
+        return resumen
+
+    @classmethod
+    def from_json(cls, data):
+        """Acepta el JSON guardado en PostgreSQL (texto o dict ya decodificado)"""
+        if isinstance(data, str):
+            data = json.loads(data)
+        resumen = cls(data.get('k', K_DEFECTO), data.get('minimo', 0))
+        resumen.contadores = {int(item): list(valores) for item, valores in data.get('items', {}).items()}
+        return resumen
+
+    def to_json(self):
+        return json.dumps({
+            'k': self.k,
+            'minimo': self.minimo,
+            'items': {str(item): valores for item, valores in self.contadores.items()}
+        })
+
+    @classmethod
+    def merge_all(cls, resumenes, k=None):
+        """
+        Combina muchos resúmenes en una pasada: a cada diagnóstico se le suma el
+        mínimo de los resúmenes en que no aparece. Sin k se conservan todos los contadores
+        """
+        resumenes = list(resumenes)
+        minimo_total = sum(resumen.minimo for resumen in resumenes)
+        acumulados = {}
+        for resumen in resumenes:
+            for item, (casos, error, casos_estancia, suma) in resumen.contadores.items():
+                acumulado = acumulados.setdefault(item, [0, 0, 0, 0.0, 0])
+                acumulado[0] += casos
+                acumulado[1] += error
+                acumulado[2] += casos_estancia
+                acumulado[3] += suma
+                acumulado[4] += resumen.minimo   # mínimo ya cubierto por un contador propio
+
+        combinado = cls(k or max((resumen.k for resumen in resumenes), default=K_DEFECTO), minimo_total)
+        for item, (casos, error, casos_estancia, suma, cubierto) in acumulados.items():
+            faltante = minimo_total - cubierto
+            combinado.contadores[item] = [casos + faltante, error + faltante, casos_estancia, suma]
+        if k is not None and len(combinado.contadores) > k:
+            ordenados = sorted(combinado.contadores.items(), key=lambda par: -par[1][0])
+            combinado.minimo = max(minimo_total, ordenados[k][1][0])
+            combinado.contadores = dict(ordenados[:k])
+        return combinado
+
+    @classmethod
+    def merge_json(cls, datos, k=None):
+        return cls.merge_all((cls.from_json(data) for data in datos), k)
+
+    def top(self, n):
+        """
+        Los n diagnósticos con más casos. garantizado indica que el diagnóstico
+        está con certeza entre los n primeros: sus casos mínimos superan la
+        cota de cualquier diagnóstico que quedó fuera de la lista
+        """
+        ordenados = sorted(self.contadores.items(), key=lambda par: (-par[1][0], par[0]))
+        cota_fuera = max(ordenados[n][1][0] if len(ordenados) > n else 0, self.minimo)
+        resultado = []
+        for item, (casos, error, casos_estancia, suma) in ordenados[:n]:
+            resultado.append({
+                'item': item,
+                'total_casos': casos,
+                'error_maximo': error,
+                'promedio_estancia': round(suma / casos_estancia, 1) if casos_estancia else None,
+                'garantizado': casos - error > cota_fuera
+            })
+        return resultado
@@ -2,65 +2,42 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import logging
+from etl.age_bands import LIMITES_DEFECTO, SIN_EDAD, categorizar
+from etl.dimensions import COLUMNAS_SEGMENTO
+from etl.sketches.estancia import HistogramaEstancia
+from etl.sketches.hll import HyperLogLog
+from etl.sketches.space_saving import K_DEFECTO, SpaceSaving
+from etl.transformers.deduplicator import KeyDeduplicator
 
 logger = logging.getLogger(__name__)
 
 class DataTransformer:
     """Clase para transformar y limpiar datos médicos"""
     
-    def clean_desenlaces_data(self, df):
+    def __init__(self, dedup_claves=None, dedup_version='fecha_procesamiento', dedup_regla='ultimo',
+                 workers=0, min_filas_paralelo=100_000, diagnosticos_k=K_DEFECTO):
+        self.dedup_claves = dedup_claves
+        self.dedup_version = dedup_version
+        self.dedup_regla = dedup_regla
+        self.workers = workers
+        self.min_filas_paralelo = min_filas_paralelo
+        self.diagnosticos_k = diagnosticos_k
+    
+    def nuevo_deduplicador(self):
+        """Deduplicador por claves de negocio con la regla configurada"""
+        return KeyDeduplicator(self.dedup_claves, self.dedup_version, self.dedup_regla)
+    
+    def clean_desenlaces_data(self, df, dedup=None):
         """Limpia y transforma datos de desenlaces"""
         try:
             logger.info(f"Iniciando limpieza de {len(df)} registros de desenlaces")
             
-            # Hacer una copia para no modificar el original
-            cleaned_df = df.copy()
-            
-            # Limpiar fechas
-            date_columns = ['fecha_ingreso', 'fecha_egreso']
-            for col in date_columns:
-                if col in cleaned_df.columns:
-                    cleaned_df[col] = pd.to_datetime(cleaned_df[col], errors='coerce')
-            
-            # Limpiar datos numéricos
-            numeric_columns = ['edad', 'dias_estancia', 'desenlaceq_id', 'numero_episodio']
-            for col in numeric_columns:
-                if col in cleaned_df.columns:
-                    cleaned_df[col] = pd.to_numeric(cleaned_df[col], errors='coerce')
-            
-            # Limpiar strings
-            string_columns = ['nombre_paciente', 'diagnostico', 'sala_egreso', 'causa', 
-                            'medico_tratante', 'nombre_aseguradora', 'condicion_egreso_nombre']
-            for col in string_columns:
-                if col in cleaned_df.columns:
-                    cleaned_df[col] = cleaned_df[col].astype(str).str.strip()
-                    cleaned_df[col] = cleaned_df[col].replace('nan', np.nan)
-            
-            # Normalizar sexo
-            if 'sexo' in cleaned_df.columns:
-                cleaned_df['sexo'] = cleaned_df['sexo'].str.upper().str.strip()
-                cleaned_df['sexo'] = cleaned_df['sexo'].map({
-                    'M': 'Masculino',
-                    'F': 'Femenino',
-                    'MASCULINO': 'Masculino',
-                    'FEMENINO': 'Femenino',
-                    'MALE': 'Masculino',
-                    'FEMALE': 'Femenino'
-                }).fillna(cleaned_df['sexo'])
-            
-            # Validar rangos de edad
-            if 'edad' in cleaned_df.columns:
-                cleaned_df.loc[cleaned_df['edad'] < 0, 'edad'] = np.nan
-                cleaned_df.loc[cleaned_df['edad'] > 150, 'edad'] = np.nan
-            
-            # Validar días de estancia
-            if 'dias_estancia' in cleaned_df.columns:
-                cleaned_df.loc[cleaned_df['dias_estancia'] < 0, 'dias_estancia'] = np.nan
-                cleaned_df.loc[cleaned_df['dias_estancia'] > 365, 'dias_estancia'] = np.nan
-            
-            # Eliminar registros completamente duplicados
+            cleaned_df = self._normalizar(df)
+            
+            # Eliminar duplicados por clave de negocio (gana la versión más reciente)
+            dedup = dedup or self.nuevo_deduplicador()
             initial_count = len(cleaned_df)
-            cleaned_df = cleaned_df.drop_duplicates()
+            cleaned_df = dedup.finales(dedup.procesar(cleaned_df))
             duplicates_removed = initial_count - len(cleaned_df)
             
             if duplicates_removed > 0:
@@ -76,6 +53,166 @@ class DataTransformer:
             logger.error(f"Error limpiando datos de desenlaces: {e}")
             return df
     
+    def clean_desenlaces_stream(self, chunks, dedup=None):
+        """
+        Limpia y deduplica desenlaces chunk a chunk. Cada chunk sale con las
+        filas que ganan hasta ese momento; al final se aplica dedup.finales()
+        sobre lo acumulado para descartar las que un chunk posterior reemplazó.
+        """
+        dedup = dedup or self.nuevo_deduplicador()
+        for chunk in chunks:
+            cleaned_chunk = dedup.procesar(self._normalizar(chunk))
+            cleaned_chunk['fecha_procesamiento'] = datetime.now()
+            yield cleaned_chunk
+        logger.info(f"Deduplicación en streaming: {dedup.get_status()}")
+    
+    def _normalizar(self, df):
+        """Normaliza en un pool de procesos si el lote es grande y hay workers configurados"""
+        if self.workers > 1 and len(df) >= self.min_filas_paralelo:
+            from etl.transformers import parallel
+            if parallel.disponible():
+                try:
+                    return parallel.normalizar_en_paralelo(self, df, self.workers)
+                except Exception as e:
+                    logger.error(f"Error en limpieza paralela, se continúa en serie: {e}")
+            else:
+                logger.warning("Limpieza paralela no disponible (requiere pyarrow), se continúa en serie")
+        return self._normalizar_desenlaces(df)
+    
+    def _normalizar_desenlaces(self, df):
+        """Normaliza tipos, textos y rangos de un lote de desenlaces"""
+        # Hacer una copia para no modificar el original
+        cleaned_df = df.copy()
+        
+        # Limpiar fechas
+        date_columns = ['fecha_ingreso', 'fecha_egreso']
+        for col in date_columns:
+            if col in cleaned_df.columns:
+                cleaned_df[col] = pd.to_datetime(cleaned_df[col], errors='coerce')
+        
+        # Limpiar datos numéricos
+        numeric_columns = ['edad', 'dias_estancia', 'desenlaceq_id', 'numero_episodio']
+        for col in numeric_columns:
+            if col in cleaned_df.columns:
+                cleaned_df[col] = pd.to_numeric(cleaned_df[col], errors='coerce')
+        
+        # Limpiar strings
+        string_columns = ['nombre_paciente', 'diagnostico', 'sala_egreso', 'causa', 
+                        'medico_tratante', 'nombre_aseguradora', 'condicion_egreso_nombre']
+        for col in string_columns:
+            if col in cleaned_df.columns:
+                cleaned_df[col] = cleaned_df[col].astype(str).str.strip()
+                cleaned_df[col] = cleaned_df[col].replace('nan', np.nan)
+        
+        # Normalizar sexo
+        if 'sexo' in cleaned_df.columns:
+            cleaned_df['sexo'] = cleaned_df['sexo'].str.upper().str.strip()
+            cleaned_df['sexo'] = cleaned_df['sexo'].map({
+                'M': 'Masculino',
+                'F': 'Femenino',
+                'MASCULINO': 'Masculino',
+                'FEMENINO': 'Femenino',
+                'MALE': 'Masculino',
+                'FEMALE': 'Femenino'
+            }).fillna(cleaned_df['sexo'])
+        
+        # Validar rangos de edad
+        if 'edad' in cleaned_df.columns:
+            cleaned_df.loc[cleaned_df['edad'] < 0, 'edad'] = np.nan
+            cleaned_df.loc[cleaned_df['edad'] > 150, 'edad'] = np.nan
+        
+        # Validar días de estancia
+        if 'dias_estancia' in cleaned_df.columns:
+            cleaned_df.loc[cleaned_df['dias_estancia'] < 0, 'dias_estancia'] = np.nan
+            cleaned_df.loc[cleaned_df['dias_estancia'] > 365, 'dias_estancia'] = np.nan
+        
+        return cleaned_df
+    
+    def _por_dia_y_segmento(self, df):
+        """Agrupa desenlaces codificados por día de ingreso y segmento"""
+        df = df[df['fecha_ingreso'].notna()].copy()
+        df['fecha'] = pd.to_datetime(df['fecha_ingreso']).dt.date
+        for col in COLUMNAS_SEGMENTO:
+            if col not in df.columns:
+                df[col] = None
+        return df.groupby(['fecha'] + COLUMNAS_SEGMENTO, dropna=False)
+    
+    def _fila_segmento(self, claves):
+        """Fila base de un resumen por día y segmento (NaN -> None)"""
+        fila = dict(zip(['fecha'] + COLUMNAS_SEGMENTO, claves))
+        return {key: (None if pd.isna(value) else value) for key, value in fila.items()}
+    
+    def build_estancia_sketches(self, df):
+        """Genera histogramas de días de estancia por día de ingreso y segmento"""
+        columnas = ['fecha'] + COLUMNAS_SEGMENTO + ['total_casos', 'suma_estancia', 'histograma']
+        try:
+            validos = df[df['dias_estancia'].notna() & (df['dias_estancia'] > 0)]
+            
+            rows = []
+            for claves, grupo in self._por_dia_y_segmento(validos):
+                histograma = HistogramaEstancia.from_values(grupo['dias_estancia'])
+                rows.append({
+                    **self._fila_segmento(claves),
+                    'total_casos': histograma.total,
+                    'suma_estancia': histograma.suma,
+                    'histograma': histograma.to_json()
+                })
+            
+            logger.info(f"Generados {len(rows)} histogramas de estancia por día y segmento")
+            return pd.DataFrame(rows, columns=columnas)
+            
+        except Exception as e:
+            logger.error(f"Error generando histogramas de estancia: {e}")
+            return pd.DataFrame(columns=columnas)
+    
+    def build_pacientes_sketches(self, df):
+        """Genera sketches HyperLogLog de historias clínicas por día de ingreso y segmento"""
+        columnas = ['fecha'] + COLUMNAS_SEGMENTO + ['total_casos', 'hll']
+        try:
+            validos = df[df['numero_historia_clinica'].notna()]
+            
+            rows = []
+            for claves, grupo in self._por_dia_y_segmento(validos):
+                sketch = HyperLogLog().add_all(grupo['numero_historia_clinica'])
+                rows.append({
+                    **self._fila_segmento(claves),
+                    'total_casos': len(grupo),
+                    'hll': sketch.to_json()
+                })
+            
+            logger.info(f"Generados {len(rows)} sketches de pacientes únicos por día y segmento")
+            return pd.DataFrame(rows, columns=columnas)
+            
+        except Exception as e:
+            logger.error(f"Error generando sketches de pacientes: {e}")
+            return pd.DataFrame(columns=columnas)
+    
+    def build_diagnosticos_sketches(self, df):
+        """Genera resúmenes Space-Saving de diagnósticos por día de ingreso y segmento"""
+        columnas = ['fecha'] + COLUMNAS_SEGMENTO + ['total_casos', 'resumen']
+        try:
+            validos = df[df['diagnostico_key'].notna()]
+            
+            rows = []
+            for claves, grupo in self._por_dia_y_segmento(validos):
+                resumen = SpaceSaving.from_values(
+                    [int(v) for v in grupo['diagnostico_key']],
+                    [None if pd.isna(v) else float(v) for v in grupo['dias_estancia']],
+                    k=self.diagnosticos_k
+                )
+                rows.append({
+                    **self._fila_segmento(claves),
+                    'total_casos': len(grupo),
+                    'resumen': resumen.to_json()
+                })
+            
+            logger.info(f"Generados {len(rows)} resúmenes de diagnósticos por día y segmento")
+            return pd.DataFrame(rows, columns=columnas)
+            
+        except Exception as e:
+            logger.error(f"Error generando resúmenes de diagnósticos: {e}")
+            return pd.DataFrame(columns=columnas)
+    
     def calculate_mortality_rate(self, df):
         """Calcula tasa de mortalidad"""
         try:
@@ -108,25 +245,12 @@ class DataTransformer:
             logger.error(f"Error calculando estancia promedio: {e}")
             return 0
     
-    def categorize_age(self, age):
-        """Categoriza edades en rangos"""
+    def categorize_age(self, age, limites=None):
+        """Categoriza edades en rangos (por defecto las bandas de siempre)"""
         try:
-            if pd.isna(age):
-                return 'No especificado'
-            
-            if age < 18:
-                return 'Menor de 18'
-            elif 18 <= age <= 30:
-                return '18-30'
-            elif 31 <= age <= 50:
-                return '31-50'
-            elif 51 <= age <= 70:
-                return '51-70'
-            else:
-                return 'Mayor de 70'
-                
+            return categorizar(age, limites or LIMITES_DEFECTO)
         except Exception:
-            return 'No especificado'
+            return SIN_EDAD
     
     def validate_data_quality(self, df, table_name):
         """Valida la calidad de los datos"""
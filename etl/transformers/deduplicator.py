@@ -0,0 +1,193 @@
+"""
+Deduplicación por claves de negocio en streaming
+Guarda por clave solo un hash de 64 bits, la versión y el orden de llegada
+del registro ganador (24 bytes por clave en arreglos numpy), así funciona
+entre chunks sin retener los DataFrames completos
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CLAVES_DESENLACE = ['desenlaceq_id']
+
+REGLAS = ('ultimo', 'primero')
+
+VERSION_MINIMA = np.iinfo(np.int64).min
+
+def canonica(valores):
+    """Forma canónica de una columna de claves, como texto"""
+    if pd.api.types.is_integer_dtype(valores.dtype):
+        # Sin pasar por float: enteros grandes quedan exactos
+        return valores.astype(str).astype(object)
+    texto = valores.astype('string').str.strip().str.upper()
+    numeros = pd.to_numeric(texto.astype(object), errors='coerce').astype('float64')
+    enteros = np.isfinite(numeros) & (numeros == np.floor(numeros))
+    canonicas = texto.astype(object)
+    canonicas[enteros] = numeros[enteros].astype(np.int64).astype(str)
+    decimales = np.isfinite(numeros) & ~enteros
+    canonicas[decimales] = numeros[decimales].map(repr)
+    return canonicas
+
+class KeyDeduplicator:
+    """
+    regla='ultimo': gana la versión más reciente (columna_version); a igual
+    versión o sin columna, gana el registro que llegó después.
+    regla='primero': gana el primer registro visto de cada clave.
+    """
+
+    def __init__(self, claves=None, columna_version='fecha_procesamiento', regla='ultimo'):
+        if regla not in REGLAS:
+            raise ValueError(f"Regla de deduplicación no soportada: {regla}")
+        self.claves = list(claves or CLAVES_DESENLACE)
+        self.columna_version = columna_version
+        self.regla = regla
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._versiones = np.empty(0, dtype=np.int64)
+        self._secuencias = np.empty(0, dtype=np.int64)
+        self._siguiente = 0
+        self.filas_leidas = 0
+        self.filas_sin_clave = 0
+        self.descartadas = 0
+        self.reemplazadas = 0
+
+    @property
+    def claves_vistas(self):
+        return len(self._hashes)
+
+    def hash_claves(self, df):
+        """
+        Hash de 64 bits de las claves en forma canónica, que no depende del
+        chunk: texto sin espacios y en mayúsculas, y los valores numéricos
+        enteros como su entero (1, 1.0 y ' 1 ' son la misma clave)
+        """
+        normalizadas = pd.DataFrame(index=df.index)
+        for columna in self.claves:
+            normalizadas[columna] = canonica(df[columna])
+        return pd.util.hash_pandas_object(normalizadas, index=False).to_numpy(dtype=np.uint64)
+    
+    def _versiones_de(self, df):
+        if self.columna_version and self.columna_version in df.columns:
+            fechas = pd.to_datetime(df[self.columna_version], errors='coerce')
+            versiones = fechas.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+            # NaT ya es el mínimo de int64: una versión nula nunca le gana a una con fecha
+            return versiones
+        return np.full(len(df), VERSION_MINIMA, dtype=np.int64)
+
+    def procesar(self, chunk):
+        """
+        Retorna las filas del chunk que ganan hasta ahora (a lo sumo una por
+        clave) con las columnas auxiliares _dedup_hash y _dedup_secuencia.
+        Filas sin clave se conservan y se deduplican solo por fila completa.
+        """
+        self.filas_leidas += len(chunk)
+        secuencias = np.arange(self._siguiente, self._siguiente + len(chunk), dtype=np.int64)
+        self._siguiente += len(chunk)
+
+        con_clave = chunk[self.claves].notna().all(axis=1).to_numpy()
+        posiciones_clave = np.flatnonzero(con_clave)
+        mantener = np.zeros(len(chunk), dtype=bool)
+        columna_hash = np.zeros(len(chunk), dtype=np.uint64)
+        columna_secuencia = np.full(len(chunk), -1, dtype=np.int64)
+
+        # Filas sin clave: se conservan, deduplicadas por fila completa dentro del chunk
+        if not con_clave.all():
+            sin_clave = ~con_clave
+            mantener[sin_clave] = ~chunk[sin_clave].duplicated().to_numpy()
+            self.filas_sin_clave += int(mantener[sin_clave].sum())
+
+        con_clave_df = chunk.iloc[posiciones_clave]
+        hashes = self.hash_claves(con_clave_df)
+        versiones = self._versiones_de(con_clave_df)
+        secuencias_clave = secuencias[posiciones_clave]
+
+        # Ganador dentro del chunk: último (o primero) por clave según versión y llegada
+        if len(hashes) == 0:
+            indices = np.empty(0, dtype=np.int64)
+        elif self.regla == 'ultimo':
+            orden = np.lexsort((secuencias_clave, versiones, hashes))
+            ultimo_de_grupo = np.append(hashes[orden][1:] != hashes[orden][:-1], True)
+            indices = orden[ultimo_de_grupo]
+        else:
+            orden = np.lexsort((secuencias_clave, hashes))
+            primero_de_grupo = np.insert(hashes[orden][1:] != hashes[orden][:-1], 0, True)
+            indices = orden[primero_de_grupo]
+
+        h, v, s = hashes[indices], versiones[indices], secuencias_clave[indices]
+
+        # Comparar contra los ganadores de chunks anteriores
+        posiciones = np.searchsorted(self._hashes, h)
+        existentes = posiciones < len(self._hashes)
+        existentes[existentes] = self._hashes[posiciones[existentes]] == h[existentes]
+
+        if self.regla == 'ultimo':
+            pos = posiciones[existentes]
+            mejora = (v[existentes] > self._versiones[pos]) | (
+                (v[existentes] == self._versiones[pos]) & (s[existentes] > self._secuencias[pos])
+            )
+            ganan = ~existentes
+            ganan[existentes] = mejora
+        else:
+            ganan = ~existentes
+
+        reemplazos = existentes & ganan
+        self.reemplazadas += int(reemplazos.sum())
+        self._versiones[posiciones[reemplazos]] = v[reemplazos]
+        self._secuencias[posiciones[reemplazos]] = s[reemplazos]
+
+        nuevas = ~existentes
+        if nuevas.any():
+            self._insertar(h[nuevas], v[nuevas], s[nuevas])
+
+        seleccion = indices[ganan]
+        self.descartadas += len(posiciones_clave) - len(seleccion)
+
+        elegidas = posiciones_clave[seleccion]
+        mantener[elegidas] = True
+        columna_hash[elegidas] = hashes[seleccion]
+        columna_secuencia[elegidas] = secuencias_clave[seleccion]
+
+        # Se conserva el orden de llegada de las filas
+        resultado = chunk.iloc[np.flatnonzero(mantener)].copy()
+        resultado['_dedup_hash'] = columna_hash[mantener]
+        resultado['_dedup_secuencia'] = columna_secuencia[mantener]
+        return resultado
+
+    def _insertar(self, hashes, versiones, secuencias):
+        orden = np.argsort(hashes, kind='stable')
+        hashes, versiones, secuencias = hashes[orden], versiones[orden], secuencias[orden]
+        posiciones = np.searchsorted(self._hashes, hashes)
+        self._hashes = np.insert(self._hashes, posiciones, hashes)
+        self._versiones = np.insert(self._versiones, posiciones, versiones)
+        self._secuencias = np.insert(self._secuencias, posiciones, secuencias)
+
+    def finales(self, df):
+        """
+        Quita de lo emitido por procesar() las filas que un chunk posterior
+        reemplazó y las columnas auxiliares
+        """
+        if '_dedup_hash' not in df.columns:
+            return df
+        # Secuencia -1 = fila sin clave (se conserva)
+        secuencias = df['_dedup_secuencia'].to_numpy(dtype=np.int64)
+        con_clave = secuencias >= 0
+        mascara = np.ones(len(df), dtype=bool)
+        if con_clave.any():
+            hashes = df['_dedup_hash'].to_numpy(dtype=np.uint64)[con_clave]
+            posiciones = np.searchsorted(self._hashes, hashes)
+            mascara[con_clave] = self._secuencias[posiciones] == secuencias[con_clave]
+        return df[mascara].drop(columns=['_dedup_hash', '_dedup_secuencia'])
+
+    def get_status(self):
+        return {
+            "claves": self.claves,
+            "regla": self.regla,
+            "filas_leidas": self.filas_leidas,
+            "claves_unicas": self.claves_vistas,
+            "filas_sin_clave": self.filas_sin_clave,
+            "descartadas": self.descartadas,
+            "reemplazadas": self.reemplazadas,
+            "memoria_bytes": self._hashes.nbytes + self._versiones.nbytes + self._secuencias.nbytes
+        }
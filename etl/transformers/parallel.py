@@ -0,0 +1,198 @@
+"""
+Limpieza de desenlaces en paralelo para backfills grandes
+Ordena la entrada por fecha_ingreso, la parte en rangos de fechas y
+normaliza cada rango en un pool de procesos. Cada rango viaja serializado
+en su propio segmento de memoria compartida y vuelve como Arrow IPC en otro,
+así ningún DataFrame pasa por pipe. Los workers arrancan con forkserver (o
+spawn): el ETL corre tareas en hilos y hacer fork de un proceso con hilos
+puede dejar locks tomados en el hijo. Cada llamada tiene sus propios
+segmentos, así que varias unidades pueden limpiar en paralelo a la vez
+"""
+
+import logging
+import multiprocessing
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS_FECHA = ['fecha_ingreso', 'fecha_egreso']
+
+# Particiones por worker: rangos más chicos reparten mejor la carga
+PARTICIONES_POR_WORKER = 4
+
+def disponible():
+    """El modo paralelo requiere pyarrow"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def rangos_por_fecha(fechas_ordenadas, particiones):
+    """
+    Cortes [inicio, fin) sobre las fechas ya ordenadas (NaT al final), de
+    tamaño parecido y alineados a cambios de fecha: un mismo día no queda en
+    dos rangos y las filas sin fecha forman su propio rango
+    """
+    validas = int((~np.isnat(fechas_ordenadas)).sum())
+    valores = fechas_ordenadas[:validas].astype(np.int64)
+    cortes = [0]
+    for k in range(1, particiones):
+        posicion = k * validas // particiones
+        if posicion >= validas:
+            break
+        corte = int(np.searchsorted(valores, valores[posicion], side='left'))
+        if corte > cortes[-1]:
+            cortes.append(corte)
+    if validas > cortes[-1]:
+        cortes.append(validas)
+    if len(fechas_ordenadas) > cortes[-1]:
+        cortes.append(len(fechas_ordenadas))
+    return list(zip(cortes[:-1], cortes[1:]))
+
+def contexto():
+    """Procesos nuevos sin heredar los hilos del ETL: forkserver si existe, si no spawn"""
+    metodos = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in metodos else 'spawn')
+
+def _publicar(objeto):
+    """Serializa un objeto en un segmento nuevo de memoria compartida; retorna su nombre"""
+    datos = pickle.dumps(objeto, protocol=pickle.HIGHEST_PROTOCOL)
+    segmento = shared_memory.SharedMemory(create=True, size=max(len(datos), 1))
+    segmento.buf[:len(datos)] = datos
+    segmento.close()
+    return segmento.name
+
+def _cargar(nombre):
+    segmento = shared_memory.SharedMemory(name=nombre)
+    try:
+        # pickle ignora el relleno del final del segmento
+        return pickle.loads(bytes(segmento.buf))
+    finally:
+        segmento.close()
+
+def _limpiar_particion(transformer, nombre_entrada):
+    """Worker: normaliza un rango y lo deja como Arrow IPC en memoria compartida"""
+    import pyarrow as pa
+
+    limpio = transformer._normalizar_desenlaces(_cargar(nombre_entrada))
+
+    # Arrow devuelve None en los nulos de columnas object; se recuerda dónde la limpieza dejó NaN
+    columnas_nan = []
+    for columna in limpio.columns:
+        if limpio[columna].dtype == object:
+            faltantes = limpio[columna][limpio[columna].isna()]
+            if any(isinstance(valor, float) for valor in faltantes):
+                columnas_nan.append(columna)
+
+    tabla = pa.Table.from_pandas(limpio, preserve_index=False)
+    medidor = pa.MockOutputStream()
+    with pa.ipc.new_stream(medidor, tabla.schema) as writer:
+        writer.write_table(tabla)
+    tamano = medidor.size()
+
+    segmento = shared_memory.SharedMemory(create=True, size=max(tamano, 1))
+    try:
+        _escribir(segmento, tabla)
+    except Exception:
+        segmento.close()
+        segmento.unlink()
+        raise
+    segmento.close()
+    return segmento.name, columnas_nan
+
+def _escribir(segmento, tabla):
+    # Las referencias de Arrow a segmento.buf deben soltarse antes de close()
+    import pyarrow as pa
+
+    destino = pa.FixedSizeBufferWriter(pa.py_buffer(segmento.buf))
+    with pa.ipc.new_stream(destino, tabla.schema) as writer:
+        writer.write_table(tabla)
+    destino.close()
+
+def _leer(segmento):
+    import pyarrow as pa
+
+    # Un memcpy del stream: las columnas (incluso las de texto respaldadas por Arrow)
+    # no deben seguir apuntando a la memoria compartida después de liberarla
+    datos = pa.py_buffer(bytes(segmento.buf))
+    return pa.ipc.open_stream(datos).read_all().to_pandas()
+
+def _leer_particion(nombre, columnas_nan):
+    """Lee (copiando) el resultado de un worker y libera su memoria compartida"""
+    segmento = shared_memory.SharedMemory(name=nombre)
+    try:
+        parte = _leer(segmento)
+    finally:
+        segmento.close()
+        segmento.unlink()
+
+    for columna in columnas_nan:
+        parte[columna] = parte[columna].where(parte[columna].notna(), np.nan)
+    return parte
+
+def _liberar(nombre):
+    segmento = shared_memory.SharedMemory(name=nombre)
+    segmento.close()
+    segmento.unlink()
+
+def normalizar_en_paralelo(transformer, df, workers):
+    """
+    Equivale a transformer._normalizar_desenlaces(df): mismas filas, orden,
+    índice, valores y tipos, pero repartido entre `workers` procesos
+    """
+    # Las fechas se interpretan una sola vez sobre todo el lote, igual que en la ruta serial
+    entrada = df.copy()
+    for columna in COLUMNAS_FECHA:
+        if columna in entrada.columns:
+            entrada[columna] = pd.to_datetime(entrada[columna], errors='coerce')
+
+    if 'fecha_ingreso' in entrada.columns:
+        fechas = entrada['fecha_ingreso'].to_numpy(dtype='datetime64[ns]')
+    else:
+        fechas = np.arange(len(entrada)).astype('datetime64[ns]')
+    # numpy ordena NaT al final
+    orden = np.argsort(fechas, kind='stable')
+    rangos = rangos_por_fecha(fechas[orden], workers * PARTICIONES_POR_WORKER)
+    if not rangos:
+        return transformer._normalizar_desenlaces(df)
+
+    # El resource tracker debe existir antes de crear el pool para que los workers lo compartan;
+    # si cada worker levantara el suyo, los segmentos se borrarían al terminar el pool
+    resource_tracker.ensure_running()
+
+    entradas, resultados, errores = [], [], []
+    try:
+        for inicio, fin in rangos:
+            entradas.append(_publicar(entrada.iloc[orden[inicio:fin]]))
+        del entrada
+        with ProcessPoolExecutor(max_workers=workers, mp_context=contexto()) as pool:
+            futuros = [pool.submit(_limpiar_particion, transformer, nombre) for nombre in entradas]
+            for futuro in futuros:
+                try:
+                    resultados.append(futuro.result())
+                except Exception as e:
+                    errores.append(e)
+    finally:
+        for nombre in entradas:
+            _liberar(nombre)
+
+    if errores:
+        # No dejar segmentos huérfanos de los rangos que sí terminaron
+        for nombre, _ in resultados:
+            _liberar(nombre)
+        raise errores[0]
+
+    partes = [_leer_particion(nombre, columnas_nan) for nombre, columnas_nan in resultados]
+
+    # Volver al orden e índice originales
+    limpio = pd.concat(partes, ignore_index=True)
+    limpio = limpio.iloc[np.argsort(orden, kind='stable')]
+    limpio.index = df.index
+    logger.info(f"Limpieza en paralelo: {len(df)} registros, {len(rangos)} rangos de fecha, {workers} workers")
+    return limpio
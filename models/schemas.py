@@ -22,6 +22,7 @@ class DesenlaceBase(BaseModel):
 
 class DesenlaceResponse(DesenlaceBase):
     id: int
+    unidad_id: int
     fecha_procesamiento: datetime
     
     class Config:
@@ -56,6 +57,7 @@ class DashboardSummary(BaseModel):
     casos_activos: int
 
 class FiltroDesenlaces(BaseModel):
+    unidad_id: Optional[int] = None
     fecha_inicio: Optional[date] = None
     fecha_fin: Optional[date] = None
     aseguradora: Optional[str] = None
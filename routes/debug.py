@@ -0,0 +1,104 @@
+from fastapi import APIRouter, HTTPException, Query, Header, Depends
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from config.settings import settings
+from services.memory_tracker import memory_tracker
+from services.profiler import ProfilerOcupado, sampling_profiler
+import asyncio
+import hmac
+import logging
+
+logger = logging.getLogger(__name__)
+
+def verificar_token(x_debug_token: Optional[str] = Header(None)):
+    """Los endpoints de diagnóstico exigen DEBUG_TOKEN; sin él configurado no existen"""
+    if not settings.DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_debug_token or not hmac.compare_digest(x_debug_token, settings.DEBUG_TOKEN):
+        raise HTTPException(status_code=403, detail="Token de diagnóstico inválido")
+
+router = APIRouter(prefix="/debug", tags=["debug"], dependencies=[Depends(verificar_token)])
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(10, gt=0, le=settings.DEBUG_PROFILE_MAX_SECONDS, description="Duración del muestreo"),
+    hz: int = Query(settings.DEBUG_PROFILE_HZ, ge=1, le=1000, description="Muestras por segundo")
+):
+    """
+    Muestrea las pilas de todos los hilos de este worker durante N segundos y
+    las devuelve en formato collapsed (flamegraph.pl / speedscope)
+    """
+    try:
+        captura = sampling_profiler.iniciar(hz)
+    except ProfilerOcupado as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    try:
+        # El event loop sigue atendiendo requests: también aparecen en el perfil
+        await asyncio.sleep(seconds)
+    finally:
+        sampling_profiler.detener(captura)
+    resumen = captura.resumen()
+    return PlainTextResponse(captura.colapsado(), headers={
+        "X-Profile-Muestras": str(resumen["muestras"]),
+        "X-Profile-Segundos": str(resumen["segundos"])
+    })
+
+@router.post("/profile/etl")
+async def profile_next_etl(
+    hz: int = Query(settings.DEBUG_PROFILE_HZ, ge=1, le=1000, description="Muestras por segundo")
+):
+    """
+    Perfila completa la próxima ejecución del ETL en este worker (solo los
+    hilos de sus tareas); el resultado queda en GET /debug/profile/etl
+    """
+    sampling_profiler.armar_etl(hz)
+    return {"etl_armado": True, "hz": hz}
+
+@router.get("/profile/etl", response_class=PlainTextResponse)
+async def get_etl_profile():
+    """
+    Pilas collapsed de la última ejecución del ETL perfilada en este worker
+    """
+    captura = sampling_profiler.ultimo_etl
+    if captura is None:
+        raise HTTPException(status_code=404, detail="No hay perfil del ETL en este worker")
+    info = sampling_profiler.ultimo_etl_info
+    return PlainTextResponse(captura.colapsado(), headers={
+        "X-Profile-Run-Id": str(info["run_id"]),
+        "X-Profile-Muestras": str(info["muestras"]),
+        "X-Profile-Segundos": str(info["segundos"])
+    })
+
+@router.get("/memory")
+def get_memory():
+    """
+    Memoria de este worker: RSS actual y pico, memoria por etapa de la última
+    ejecución del ETL y de las últimas respuestas grandes; con tracemalloc
+    activo, además los sitios que más memoria retienen ahora
+    """
+    try:
+        return memory_tracker.get_status()
+    except Exception as e:
+        logger.error(f"Error obteniendo estado de memoria: {e}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+@router.post("/memory/trace")
+def set_memory_trace(
+    activar: bool = Query(True, description="Activar o desactivar tracemalloc"),
+    frames: int = Query(settings.MEMORY_TRACE_FRAMES, ge=1, le=50, description="Profundidad de pila por asignación")
+):
+    """
+    Activa o desactiva tracemalloc en este worker (encarece cada asignación mientras está activo)
+    """
+    if activar:
+        memory_tracker.iniciar_traza(frames)
+    else:
+        memory_tracker.detener_traza()
+    return {"tracemalloc": memory_tracker.trazando}
+
+@router.get("/status")
+async def get_debug_status():
+    """
+    Estado del profiler y de tracemalloc en este worker
+    """
+    return {"profiler": sampling_profiler.get_status(), "tracemalloc": memory_tracker.trazando}
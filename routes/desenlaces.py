@@ -1,17 +1,25 @@
 from fastapi import APIRouter, HTTPException, Query, Depends
 from typing import List, Optional
 from datetime import date
-import pandas as pd
 from models.schemas import DesenlaceResponse, FiltroDesenlaces
 from services.database import db_service
+from etl.dimensions import columnas_pedidas, desenlaces_select_sql
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/desenlaces", tags=["desenlaces"])
 
+def _columnas(fields):
+    """Columnas pedidas con fields= (None = todas); 422 si alguna no está permitida"""
+    try:
+        return columnas_pedidas(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
 @router.get("/", response_model=List[dict])
-async def get_desenlaces(
+def get_desenlaces(
+    unidad_id: Optional[int] = Query(None, ge=1, description="Unidad (hospital); por defecto todas"),
     fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
     fecha_fin: Optional[date] = Query(None, description="Fecha de fin (YYYY-MM-DD)"),
     aseguradora: Optional[str] = Query(None, description="Nombre de la aseguradora"),
@@ -19,14 +27,21 @@ async def get_desenlaces(
     edad_min: Optional[int] = Query(None, description="Edad mínima"),
     edad_max: Optional[int] = Query(None, description="Edad máxima"),
     condicion_egreso: Optional[str] = Query(None, description="Condición de egreso"),
-    limit: int = Query(100, le=1000, description="Límite de registros")
+    fields: Optional[str] = Query(None, description="Columnas a devolver separadas por coma (ej: fecha_ingreso,condicion_egreso_nombre)"),
+    limit: int = Query(100, ge=1, le=1000, description="Límite de registros")
 ):
     """
-    Obtiene lista de desenlaces de pacientes quemados con filtros opcionales
+    Obtiene lista de desenlaces de pacientes quemados con filtros opcionales;
+    con fields solo se leen y devuelven esas columnas
     """
+    columnas = _columnas(fields)
     try:
+        import pandas as pd
+        
         # Construir filtros
         filtros = {}
+        if unidad_id:
+            filtros['unidad_id'] = unidad_id
         if fecha_inicio:
             filtros['fecha_inicio'] = fecha_inicio
         if fecha_fin:
@@ -42,15 +57,12 @@ async def get_desenlaces(
         if condicion_egreso:
             filtros['condicion_egreso'] = condicion_egreso
         
-        # Obtener datos
-        df = db_service.get_desenlaces(filtros)
+        # Obtener datos (columnas y límite se aplican en la consulta)
+        df = db_service.get_desenlaces(filtros, columnas, limit)
         
         if df.empty:
             return []
         
-        # Limitar resultados
-        df = df.head(limit)
-        
         # Convertir a diccionario y manejar valores NaN
         records = df.to_dict('records')
         
@@ -68,18 +80,25 @@ async def get_desenlaces(
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 @router.get("/{desenlace_id}")
-async def get_desenlace_by_id(desenlace_id: int):
+def get_desenlace_by_id(
+    desenlace_id: int,
+    unidad_id: Optional[int] = Query(None, ge=1, description="Unidad (hospital); el mismo id puede existir en varias"),
+    fields: Optional[str] = Query(None, description="Columnas a devolver separadas por coma (ej: fecha_ingreso,condicion_egreso_nombre)")
+):
     """
     Obtiene un desenlace específico por ID
     """
+    columnas = _columnas(fields)
     try:
-        query = """
-        SELECT *
-        FROM dashboard_desenlaces
-        WHERE desenlaceq_id = %(desenlace_id)s
-        """
+        import pandas as pd
+        
+        query = desenlaces_select_sql(columnas) + "\nWHERE d.desenlaceq_id = %(desenlace_id)s"
+        params = {'desenlace_id': desenlace_id}
+        if unidad_id:
+            query += " AND d.unidad_id = %(unidad_id)s"
+            params['unidad_id'] = unidad_id
         
-        df = db_service.execute_query(query, {'desenlace_id': desenlace_id})
+        df = db_service.execute_query(query, params, nombre="desenlace_por_id")
         
         if df.empty:
             raise HTTPException(status_code=404, detail="Desenlace no encontrado")
@@ -100,19 +119,26 @@ async def get_desenlace_by_id(desenlace_id: int):
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 @router.get("/paciente/{historia_clinica}")
-async def get_desenlaces_by_historia(historia_clinica: str):
+def get_desenlaces_by_historia(
+    historia_clinica: str,
+    unidad_id: Optional[int] = Query(None, ge=1, description="Unidad (hospital); por defecto todas"),
+    fields: Optional[str] = Query(None, description="Columnas a devolver separadas por coma (ej: fecha_ingreso,condicion_egreso_nombre)")
+):
     """
     Obtiene todos los desenlaces de un paciente por número de historia clínica
     """
+    columnas = _columnas(fields)
     try:
-        query = """
-        SELECT *
-        FROM dashboard_desenlaces
-        WHERE numero_historia_clinica = %(historia_clinica)s
-        ORDER BY fecha_ingreso DESC
+        import pandas as pd
+        
+        query = desenlaces_select_sql(columnas) + f"""
+        WHERE d.numero_historia_clinica = %(historia_clinica)s
+        {'AND d.unidad_id = %(unidad_id)s' if unidad_id else ''}
+        ORDER BY d.fecha_ingreso DESC
         """
+        params = {'historia_clinica': historia_clinica, 'unidad_id': unidad_id}
         
-        df = db_service.execute_query(query, {'historia_clinica': historia_clinica})
+        df = db_service.execute_query(query, params, nombre="desenlaces_por_historia")
         
         if df.empty:
             raise HTTPException(status_code=404, detail="No se encontraron registros para esta historia clínica")
@@ -138,20 +164,25 @@ async def get_desenlaces_by_historia(historia_clinica: str):
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 @router.get("/export/csv")
-async def export_desenlaces_csv(
+def export_desenlaces_csv(
+    unidad_id: Optional[int] = Query(None, ge=1),
     fecha_inicio: Optional[date] = Query(None),
     fecha_fin: Optional[date] = Query(None),
-    aseguradora: Optional[str] = Query(None)
+    aseguradora: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Columnas a exportar separadas por coma")
 ):
     """
     Exporta desenlaces en formato CSV
     """
+    columnas = _columnas(fields)
     try:
         from fastapi.responses import StreamingResponse
         import io
         
         # Construir filtros
         filtros = {}
+        if unidad_id:
+            filtros['unidad_id'] = unidad_id
         if fecha_inicio:
             filtros['fecha_inicio'] = fecha_inicio
         if fecha_fin:
@@ -160,7 +191,7 @@ async def export_desenlaces_csv(
             filtros['aseguradora'] = aseguradora
         
         # Obtener datos
-        df = db_service.get_desenlaces(filtros)
+        df = db_service.get_desenlaces(filtros, columnas)
         
         if df.empty:
             raise HTTPException(status_code=404, detail="No hay datos para exportar")
@@ -185,3 +216,70 @@ async def export_desenlaces_csv(
     except Exception as e:
         logger.error(f"Error exportando CSV: {e}")
         raise HTTPException(status_code=500, detail="Error generando archivo CSV")
+
+def _export_response(formato, unidad_id, fecha_inicio, fecha_fin, aseguradora, fields):
+    """StreamingResponse de un archivo columnar generado lote a lote"""
+    from fastapi.responses import StreamingResponse
+    from services.export_service import export_service, FORMATOS
+    
+    columnas = _columnas(fields)
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Exportación no disponible: pyarrow no está instalado")
+    
+    # Construir filtros
+    filtros = {}
+    if unidad_id:
+        filtros['unidad_id'] = unidad_id
+    if fecha_inicio:
+        filtros['fecha_inicio'] = fecha_inicio
+    if fecha_fin:
+        filtros['fecha_fin'] = fecha_fin
+    if aseguradora:
+        filtros['aseguradora'] = aseguradora
+    
+    media_type, extension = FORMATOS[formato]
+    return StreamingResponse(
+        export_service.stream(formato, filtros, columnas),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=desenlaces_quemados.{extension}"}
+    )
+
+@router.get("/export/parquet")
+def export_desenlaces_parquet(
+    unidad_id: Optional[int] = Query(None, ge=1),
+    fecha_inicio: Optional[date] = Query(None),
+    fecha_fin: Optional[date] = Query(None),
+    aseguradora: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Columnas a exportar separadas por coma")
+):
+    """
+    Exporta desenlaces en formato Parquet (columnas tipadas, compresión zstd)
+    """
+    try:
+        return _export_response('parquet', unidad_id, fecha_inicio, fecha_fin, aseguradora, fields)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error exportando Parquet: {e}")
+        raise HTTPException(status_code=500, detail="Error generando archivo Parquet")
+
+@router.get("/export/arrow")
+def export_desenlaces_arrow(
+    unidad_id: Optional[int] = Query(None, ge=1),
+    fecha_inicio: Optional[date] = Query(None),
+    fecha_fin: Optional[date] = Query(None),
+    aseguradora: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Columnas a exportar separadas por coma")
+):
+    """
+    Exporta desenlaces como stream Arrow IPC (record batches comprimidos con zstd)
+    """
+    try:
+        return _export_response('arrow', unidad_id, fecha_inicio, fecha_fin, aseguradora, fields)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error exportando Arrow: {e}")
+        raise HTTPException(status_code=500, detail="Error generando archivo Arrow")
@@ -1,13 +1,19 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-import pandas as pd
+from fastapi import APIRouter, HTTPException, Query, Depends
+from typing import List, Optional
+from datetime import date
 from models.schemas import (
     EstadisticaAseguradora, 
     EstadisticaMensual, 
     EstadisticaDemografia,
-    DashboardSummary
+    DashboardSummary,
+    FiltroDesenlaces
 )
 from services.database import db_service
+from services.dimension_cache import dimension_cache
+from services.cube_service import cube_service, CubeQueryError
+from services.demographics import demografia_service
+from etl.age_bands import limites_pedidos
+from etl.sketches.estancia import RANGOS_ESTANCIA
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,25 +21,140 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/estadisticas", tags=["estadisticas"])
 
 @router.get("/resumen", response_model=DashboardSummary)
-async def get_dashboard_summary():
+def get_dashboard_summary(unidad_id: Optional[int] = Query(None, ge=1, description="Unidad (hospital); por defecto todas")):
     """
     Obtiene resumen general del dashboard con KPIs principales
     """
     try:
-        summary = db_service.get_dashboard_summary()
+        summary = db_service.get_dashboard_summary(unidad_id)
         return summary
         
     except Exception as e:
         logger.error(f"Error obteniendo resumen del dashboard: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
+@router.get("/pacientes-unicos")
+def get_pacientes_unicos(
+    unidad_id: Optional[int] = Query(None, ge=1, description="Unidad (hospital); por defecto todas"),
+    fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
+    fecha_fin: Optional[date] = Query(None, description="Fecha de fin (YYYY-MM-DD)"),
+    aseguradora: Optional[str] = Query(None, description="Nombre de la aseguradora"),
+    sexo: Optional[str] = Query(None, description="Sexo del paciente"),
+    condicion_egreso: Optional[str] = Query(None, description="Condición de egreso"),
+    agrupar_por: Optional[str] = Query(None, regex="^(mes|aseguradora)$", description="Agrupar por 'mes' o 'aseguradora'"),
+    exacto: bool = Query(False, description="Contar con COUNT(DISTINCT) sobre los registros en vez de HyperLogLog")
+):
+    """
+    Obtiene pacientes únicos (por historia clínica) para cualquier rango y segmento.
+    Por defecto combina sketches HyperLogLog precalculados y retorna el error relativo.
+    """
+    try:
+        import pandas as pd
+        from etl.sketches.hll import HyperLogLog
+        
+        filtros = {
+            'unidad_id': unidad_id,
+            'fecha_inicio': fecha_inicio,
+            'fecha_fin': fecha_fin,
+            'aseguradora': aseguradora,
+            'sexo': sexo,
+            'condicion_egreso': condicion_egreso
+        }
+        
+        if not agrupar_por:
+            return db_service.get_total_pacientes(filtros, exacto=exacto)
+        
+        columna = 'mes' if agrupar_por == 'mes' else 'nombre_aseguradora'
+        grupos = []
+        
+        if not exacto:
+            df = db_service.get_sketches_pacientes(filtros)
+            if not df.empty:
+                if agrupar_por == 'mes':
+                    df['grupo'] = pd.to_datetime(df['fecha']).dt.strftime('%Y-%m')
+                else:
+                    df['grupo'] = df['aseguradora_key']
+                for grupo, sketches in df.groupby('grupo', sort=True):
+                    grupos.append({'grupo': grupo, **HyperLogLog.union_json(sketches['hll']).resultado()})
+        
+        if exacto or not grupos:
+            df = db_service.count_pacientes_exacto(filtros, agrupar_por)
+            for record in df.to_dict('records'):
+                total = int(record['total_pacientes'])
+                grupos.append({
+                    'grupo': record['grupo'],
+                    'total_pacientes': total,
+                    'error_relativo': 0.0,
+                    'intervalo_95': [total, total],
+                    'modo': 'exacto'
+                })
+        
+        if agrupar_por == 'aseguradora':
+            dimension_cache.ensure_loaded(db_service.engine)
+            for record in grupos:
+                record['grupo'] = dimension_cache.name('nombre_aseguradora', record['grupo'])
+        
+        return [{columna: record.pop('grupo'), **record} for record in grupos]
+        
+    except Exception as e:
+        logger.error(f"Error obteniendo pacientes únicos: {e}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+@router.get("/cubo")
+def get_cubo(
+    dimensiones: str = Query("", description="Dimensiones separadas por coma (ej: aseguradora,mes)"),
+    medidas: str = Query("total_casos", description="Medidas separadas por coma (ej: total_casos,promedio_estancia)"),
+    max_grupos: int = Query(1000, ge=1, description="Máximo de grupos permitidos en el resultado"),
+    filtros: FiltroDesenlaces = Depends()
+):
+    """
+    Agregación genérica: agrupa desenlaces por las dimensiones pedidas y
+    calcula las medidas pedidas, respetando los filtros estándar
+    """
+    try:
+        import pandas as pd
+        
+        lista_dimensiones = [d.strip() for d in dimensiones.split(',') if d.strip()]
+        lista_medidas = [m.strip() for m in medidas.split(',') if m.strip()]
+        
+        records = cube_service.consultar(lista_dimensiones, lista_medidas, filtros.dict(), max_grupos)
+        
+        for record in records:
+            for key, value in record.items():
+                if pd.isna(value):
+                    record[key] = None
+                elif key in ('promedio_estancia', 'promedio_edad', 'tasa_mortalidad'):
+                    record[key] = float(value)
+        
+        return {
+            "dimensiones": lista_dimensiones,
+            "medidas": lista_medidas,
+            "total_grupos": len(records),
+            "resultados": records
+        }
+        
+    except CubeQueryError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error en consulta de cubo: {e}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+@router.get("/cubo/opciones")
+def get_cubo_opciones():
+    """
+    Lista las dimensiones y medidas permitidas por /cubo
+    """
+    return cube_service.get_opciones()
+
 @router.get("/aseguradoras", response_model=List[dict])
-async def get_estadisticas_aseguradoras():
+def get_estadisticas_aseguradoras(unidad_id: Optional[int] = Query(None, ge=1, description="Unidad (hospital); por defecto todas")):
     """
     Obtiene estadísticas agrupadas por aseguradora
     """
     try:
-        df = db_service.get_estadisticas_aseguradoras()
+        import pandas as pd
+        
+        df = db_service.get_estadisticas_aseguradoras(unidad_id)
         
         if df.empty:
             return []
@@ -56,12 +177,14 @@ async def get_estadisticas_aseguradoras():
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 @router.get("/mensuales", response_model=List[dict])
-async def get_estadisticas_mensuales():
+def get_estadisticas_mensuales(unidad_id: Optional[int] = Query(None, ge=1, description="Unidad (hospital); por defecto todas")):
     """
     Obtiene estadísticas mensuales de los últimos 12 meses
     """
     try:
-        df = db_service.get_estadisticas_mensuales()
+        import pandas as pd
+        
+        df = db_service.get_estadisticas_mensuales(unidad_id)
         
         if df.empty:
             return []
@@ -92,25 +215,20 @@ async def get_estadisticas_mensuales():
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 @router.get("/demografia", response_model=List[dict])
-async def get_estadisticas_demografia():
+def get_estadisticas_demografia(
+    unidad_id: Optional[int] = Query(None, ge=1, description="Unidad (hospital); por defecto todas"),
+    bandas: Optional[str] = Query(None, description="Límite inferior de cada banda de edad separados por coma (ej: 1,5,12,18); por defecto 18,31,51,71")
+):
     """
-    Obtiene estadísticas demográficas por edad y sexo
+    Obtiene estadísticas demográficas por banda de edad y sexo; las bandas
+    se arman sumando los casos por año de edad precalculados por el ETL
     """
     try:
-        df = db_service.get_estadisticas_demografia()
-        
-        if df.empty:
-            return []
-        
-        records = df.to_dict('records')
-        
-        # Limpiar valores NaN
-        for record in records:
-            for key, value in record.items():
-                if pd.isna(value):
-                    record[key] = None
-                elif key == 'promedio_estancia' and value is not None:
-                    record[key] = float(value)
+        limites = limites_pedidos(bandas)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        records = demografia_service.por_bandas(limites, unidad_id)
         
         logger.info(f"Retornando estadísticas demográficas de {len(records)} grupos")
         return records
@@ -120,28 +238,30 @@ async def get_estadisticas_demografia():
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 @router.get("/mortalidad")
-async def get_estadisticas_mortalidad():
+def get_estadisticas_mortalidad(unidad_id: Optional[int] = Query(None, ge=1, description="Unidad (hospital); por defecto todas")):
     """
     Obtiene estadísticas detalladas de mortalidad
     """
     try:
-        query = """
+        query = f"""
         SELECT 
-            condicion_egreso_nombre,
+            condicion_egreso_key,
             COUNT(*) as total_casos,
             ROUND((COUNT(*) * 100.0 / SUM(COUNT(*)) OVER()), 2) as porcentaje
         FROM dashboard_desenlaces
-        WHERE condicion_egreso_nombre IS NOT NULL
-        GROUP BY condicion_egreso_nombre
+        WHERE condicion_egreso_key IS NOT NULL
+        {'AND unidad_id = %(unidad_id)s' if unidad_id else ''}
+        GROUP BY condicion_egreso_key
         ORDER BY total_casos DESC
         """
         
-        df = db_service.execute_query(query)
+        df = db_service.execute_query(query, {'unidad_id': unidad_id}, nombre="mortalidad_por_condicion")
         
         if df.empty:
             return {"total_casos": 0, "distribución": []}
         
-        records = df.to_dict('records')
+        dimension_cache.ensure_loaded(db_service.engine)
+        records = dimension_cache.decode(df.to_dict('records'), 'condicion_egreso_nombre')
         total_casos = sum(record['total_casos'] for record in records)
         
         return {
@@ -154,94 +274,87 @@ async def get_estadisticas_mortalidad():
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 @router.get("/top-diagnosticos")
-async def get_top_diagnosticos():
+def get_top_diagnosticos(
+    unidad_id: Optional[int] = Query(None, ge=1, description="Unidad (hospital); por defecto todas"),
+    fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
+    fecha_fin: Optional[date] = Query(None, description="Fecha de fin (YYYY-MM-DD)"),
+    aseguradora: Optional[str] = Query(None, description="Nombre de la aseguradora"),
+    sexo: Optional[str] = Query(None, description="Sexo del paciente"),
+    condicion_egreso: Optional[str] = Query(None, description="Condición de egreso"),
+    limit: int = Query(10, ge=1, le=50, description="Cantidad de diagnósticos"),
+    exacto: bool = Query(False, description="Agrupar los registros en vez de combinar resúmenes Space-Saving")
+):
     """
-    Obtiene los diagnósticos más frecuentes
+    Obtiene los diagnósticos más frecuentes para cualquier rango y segmento.
+    Por defecto combina resúmenes Space-Saving precalculados: total_casos puede
+    exceder el real en hasta error_maximo y garantizado indica si el diagnóstico
+    está con certeza entre los primeros
     """
     try:
-        query = """
-        SELECT 
-            diagnostico,
-            COUNT(*) as total_casos,
-            ROUND(AVG(dias_estancia), 1) as promedio_estancia
-        FROM dashboard_desenlaces
-        WHERE diagnostico IS NOT NULL AND diagnostico != ''
-        GROUP BY diagnostico
-        ORDER BY total_casos DESC
-        LIMIT 10
-        """
-        
-        df = db_service.execute_query(query)
-        
-        if df.empty:
-            return []
-        
-        records = df.to_dict('records')
+        filtros = {
+            'unidad_id': unidad_id,
+            'fecha_inicio': fecha_inicio,
+            'fecha_fin': fecha_fin,
+            'aseguradora': aseguradora,
+            'sexo': sexo,
+            'condicion_egreso': condicion_egreso
+        }
         
-        # Limpiar valores NaN
-        for record in records:
-            for key, value in record.items():
-                if pd.isna(value):
-                    record[key] = None
+        diagnosticos = db_service.get_top_diagnosticos(filtros, limit, exacto=exacto)
         
-        return records
+        dimension_cache.ensure_loaded(db_service.engine)
+        return dimension_cache.decode(diagnosticos, 'diagnostico')
         
     except Exception as e:
         logger.error(f"Error obteniendo top diagnósticos: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 @router.get("/estancia-promedio")
-async def get_analisis_estancia():
+def get_analisis_estancia(
+    unidad_id: Optional[int] = Query(None, ge=1, description="Unidad (hospital); por defecto todas"),
+    fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio (YYYY-MM-DD)"),
+    fecha_fin: Optional[date] = Query(None, description="Fecha de fin (YYYY-MM-DD)"),
+    aseguradora: Optional[str] = Query(None, description="Nombre de la aseguradora"),
+    sexo: Optional[str] = Query(None, description="Sexo del paciente"),
+    condicion_egreso: Optional[str] = Query(None, description="Condición de egreso"),
+    exacto: bool = Query(False, description="Agrupar los registros en vez de combinar histogramas precalculados")
+):
     """
-    Obtiene análisis detallado de días de estancia
+    Obtiene análisis detallado de días de estancia a partir de los
+    histogramas precalculados por día y segmento (sin leer registros crudos);
+    si aún no hay histogramas, o se pide exacto, agrupa los registros
     """
     try:
-        query = """
-        SELECT 
-            CASE 
-                WHEN dias_estancia <= 7 THEN '1-7 días'
-                WHEN dias_estancia <= 14 THEN '8-14 días'
-                WHEN dias_estancia <= 21 THEN '15-21 días'
-                WHEN dias_estancia <= 30 THEN '22-30 días'
-                ELSE 'Más de 30 días'
-            END as rango_estancia,
-            COUNT(*) as total_casos,
-            ROUND(AVG(dias_estancia), 1) as promedio_estancia,
-            MIN(dias_estancia) as minimo,
-            MAX(dias_estancia) as maximo
-        FROM dashboard_desenlaces
-        WHERE dias_estancia IS NOT NULL AND dias_estancia > 0
-        GROUP BY 
-            CASE 
-                WHEN dias_estancia <= 7 THEN '1-7 días'
-                WHEN dias_estancia <= 14 THEN '8-14 días'
-                WHEN dias_estancia <= 21 THEN '15-21 días'
-                WHEN dias_estancia <= 30 THEN '22-30 días'
-                ELSE 'Más de 30 días'
-            END
-        ORDER BY MIN(dias_estancia)
-        """
+        filtros = {
+            'unidad_id': unidad_id,
+            'fecha_inicio': fecha_inicio,
+            'fecha_fin': fecha_fin,
+            'aseguradora': aseguradora,
+            'sexo': sexo,
+            'condicion_egreso': condicion_egreso
+        }
         
-        df = db_service.execute_query(query)
+        histograma = db_service.get_histograma_estancia(filtros, exacto=exacto)
         
-        if df.empty:
+        if not histograma.total:
             return []
         
-        records = df.to_dict('records')
-        
-        # Calcular estadísticas generales
-        query_general = """
-        SELECT 
-            COUNT(*) as total_casos,
-            ROUND(AVG(dias_estancia), 1) as promedio_general,
-            MIN(dias_estancia) as minimo_general,
-            MAX(dias_estancia) as maximo_general
-        FROM dashboard_desenlaces
-        WHERE dias_estancia IS NOT NULL AND dias_estancia > 0
-        """
-        
-        df_general = db_service.execute_query(query_general)
-        general = df_general.iloc[0].to_dict() if not df_general.empty else {}
+        records = []
+        for rango_estancia, minimo, maximo in RANGOS_ESTANCIA:
+            parcial = histograma.rango(minimo, maximo)
+            if parcial.total:
+                records.append({'rango_estancia': rango_estancia, **parcial.resumen()})
+        
+        resumen = histograma.resumen()
+        general = {
+            'total_casos': resumen['total_casos'],
+            'promedio_general': resumen['promedio_estancia'],
+            'minimo_general': resumen['minimo'],
+            'maximo_general': resumen['maximo'],
+            'mediana': round(histograma.quantile(0.5), 1),
+            'p90': round(histograma.quantile(0.9), 1),
+            'p99': round(histograma.quantile(0.99), 1)
+        }
         
         return {
             "resumen_general": general,
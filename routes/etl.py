@@ -1,5 +1,7 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
 from services.etl_service import etl_service
+from etl.dag import DAGError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -7,24 +9,30 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/etl", tags=["etl"])
 
 @router.post("/run")
-async def run_etl():
+async def run_etl(
+    unidad_id: Optional[int] = Query(None, ge=1, description="Cargar solo esta unidad (las demás no se tocan)"),
+    tareas: Optional[str] = Query(None, description="Tareas a re-ejecutar separadas por coma, admite comodines (ej: load_stats_*)"),
+    reanudar: bool = Query(True, description="Si la última ejecución falló, retomar sus checkpoints en vez de re-extraer")
+):
     """
     Ejecuta el proceso ETL con datos de ejemplo médicos realistas
     Perfecto para MVP y demostraciones
     """
     try:
-        # Verificar si ETL ya está corriendo
-        status = etl_service.get_status()
-        if status["is_running"]:
-            raise HTTPException(
-                status_code=409, 
-                detail="ETL process is already running. Please wait for it to complete."
-            )
-        
-        logger.info("Iniciando ETL con datos de ejemplo médicos via API")
+        logger.info("Iniciando ETL con datos de ejemplo médicos via API"
+                    + (f" (unidad {unidad_id})" if unidad_id else ""))
         
         # Siempre usar datos de ejemplo
-        result = await etl_service.run_etl_process(use_sample_data=True)
+        result = await etl_service.run_etl_process(
+            use_sample_data=True,
+            unidades=[unidad_id] if unidad_id else None,
+            tareas=[t.strip() for t in tareas.split(',') if t.strip()] if tareas else None,
+            reanudar=reanudar
+        )
+        
+        # Otro worker tiene el lock del ETL
+        if result["status"] == "busy":
+            raise HTTPException(status_code=409, detail=result["message"])
         
         if result["status"] == "error":
             raise HTTPException(status_code=500, detail=result["message"])
@@ -33,12 +41,14 @@ async def run_etl():
         
     except HTTPException:
         raise
+    except DAGError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         logger.error(f"Error en endpoint ETL: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.get("/status")
-async def get_etl_status():
+def get_etl_status():
     """
     Obtiene el estado actual del proceso ETL
     """
@@ -48,6 +58,36 @@ async def get_etl_status():
         logger.error(f"Error obteniendo estado ETL: {e}")
         raise HTTPException(status_code=500, detail="Error obtaining ETL status")
 
+@router.get("/dag")
+async def get_etl_dag(
+    unidad_id: Optional[int] = Query(None, ge=1, description="Grafo de una sola unidad")
+):
+    """
+    Tareas del ETL con sus dependencias (nombres válidos para tareas= en /run)
+    """
+    try:
+        # /run usa datos de ejemplo: se muestra ese grafo
+        return {"tareas": etl_service.get_dag(use_sample_data=True, unidades=[unidad_id] if unidad_id else None)}
+    except DAGError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error obteniendo grafo del ETL: {e}")
+        raise HTTPException(status_code=500, detail="Error obtaining ETL graph")
+
+@router.get("/runs")
+def get_etl_runs(
+    limit: int = Query(20, ge=1, le=200, description="Ejecuciones a incluir"),
+    umbral: float = Query(1.5, gt=1, description="Factor sobre la mediana previa que se considera regresión")
+):
+    """
+    Historial de ejecuciones ETL con métricas por etapa, tendencias y regresiones
+    """
+    try:
+        return etl_service.get_runs(limit, umbral)
+    except Exception as e:
+        logger.error(f"Error obteniendo historial ETL: {e}")
+        raise HTTPException(status_code=500, detail="Error obtaining ETL history")
+
 @router.post("/initialize")
 async def initialize_dashboard():
     """
@@ -69,9 +109,15 @@ async def initialize_dashboard():
                     "Datos incluyen: desenlaces, estadísticas, demografía"
                 ]
             }
+        elif result["status"] == "busy":
+            raise HTTPException(status_code=409, detail=result["message"])
         else:
             raise HTTPException(status_code=500, detail=result["message"])
             
+    except HTTPException:
+        raise
+    except DAGError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         logger.error(f"Error inicializando dashboard: {e}")
         raise HTTPException(status_code=500, detail=f"Error initializing dashboard: {str(e)}")
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, HTTPException, Request, Header, Query
+from typing import Optional
+from services.kpi_events import kpi_broadcaster
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/eventos", tags=["eventos"])
+
+HEARTBEAT_SEGUNDOS = 15
+
+@router.get("/kpis")
+async def stream_kpis(
+    request: Request,
+    unidad_id: Optional[int] = Query(None, ge=1, description="Unidad de quemados (por defecto todas)"),
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Stream SSE con los KPIs del dashboard: envía el estado actual al conectar
+    y un evento nuevo cada vez que un ETL publica datos (reemplaza el polling)
+    """
+    try:
+        from fastapi.responses import StreamingResponse
+
+        canal, cola = await kpi_broadcaster.suscribir(unidad_id)
+    except Exception as e:
+        logger.error(f"Error suscribiendo a KPIs: {e}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+    async def eventos():
+        try:
+            yield "retry: 5000\n\n"
+            # Un cliente que reconecta con la versión vigente no necesita el snapshot
+            if canal.kpis is not None and last_event_id != canal.event_id:
+                yield kpi_broadcaster.evento(canal)
+            while True:
+                try:
+                    yield await asyncio.wait_for(cola.get(), timeout=HEARTBEAT_SEGUNDOS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": heartbeat\n\n"
+        finally:
+            kpi_broadcaster.desuscribir(canal, cola)
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/status")
+async def get_eventos_status():
+    """
+    Suscriptores conectados y última versión difundida
+    """
+    return kpi_broadcaster.get_status()
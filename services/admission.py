@@ -0,0 +1,137 @@
+"""
+Control de admisión por clase de endpoint
+Cada clase tiene un máximo de requests concurrentes y una cola de espera
+acotada; lo que no entra a tiempo se rechaza con 503 y Retry-After en vez
+de acaparar conexiones del pool
+"""
+
+import asyncio
+import logging
+import math
+from collections import deque
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class AdmisionRechazada(Exception):
+    def __init__(self, clase, motivo):
+        super().__init__(f"Clase {clase.nombre} saturada ({motivo})")
+        self.clase = clase
+        self.motivo = motivo
+
+class ClaseAdmision:
+    def __init__(self, nombre, max_concurrentes, max_cola, timeout):
+        self.nombre = nombre
+        self.max_concurrentes = max_concurrentes
+        self.max_cola = max_cola
+        self.timeout = timeout
+        self.activos = 0
+        self._espera = deque()
+        self.duracion_media = 0.0
+        self.admitidos = 0
+        self.rechazados_cola_llena = 0
+        self.rechazados_timeout = 0
+
+    @property
+    def en_cola(self):
+        return sum(1 for futuro in self._espera if not futuro.done())
+
+    async def adquirir(self):
+        """Espera un lugar o lanza AdmisionRechazada"""
+        if self.activos < self.max_concurrentes and not self.en_cola:
+            self.activos += 1
+            self.admitidos += 1
+            return
+
+        if self.en_cola >= self.max_cola:
+            self.rechazados_cola_llena += 1
+            raise AdmisionRechazada(self, "cola llena")
+
+        futuro = asyncio.get_event_loop().create_future()
+        self._espera.append(futuro)
+        try:
+            # liberar() transfiere el lugar resolviendo el futuro (activos no cambia)
+            await asyncio.wait_for(futuro, self.timeout)
+        except asyncio.TimeoutError:
+            self.rechazados_timeout += 1
+            raise AdmisionRechazada(self, "timeout en cola")
+        except asyncio.CancelledError:
+            # El cliente se fue justo cuando recibía el lugar: devolverlo
+            if futuro.done() and not futuro.cancelled():
+                self.liberar()
+            raise
+        finally:
+            if futuro in self._espera:
+                self._espera.remove(futuro)
+        self.admitidos += 1
+
+    def liberar(self, duracion=None):
+        """Cede el lugar al primero en la cola o lo devuelve"""
+        if duracion is not None:
+            # Media móvil exponencial del tiempo de servicio, para estimar Retry-After
+            self.duracion_media = duracion if not self.duracion_media else 0.8 * self.duracion_media + 0.2 * duracion
+        while self._espera:
+            futuro = self._espera.popleft()
+            if not futuro.done():
+                futuro.set_result(None)
+                return
+        self.activos -= 1
+
+    def retry_after(self):
+        """Segundos sugeridos antes de reintentar: lo que tardaría en vaciarse la cola"""
+        espera = self.duracion_media * (self.en_cola + 1) / self.max_concurrentes
+        return max(1, math.ceil(espera))
+
+    def get_status(self):
+        return {
+            "max_concurrentes": self.max_concurrentes,
+            "max_cola": self.max_cola,
+            "timeout_segundos": self.timeout,
+            "activos": self.activos,
+            "en_cola": self.en_cola,
+            "admitidos": self.admitidos,
+            "rechazados_cola_llena": self.rechazados_cola_llena,
+            "rechazados_timeout": self.rechazados_timeout,
+            "duracion_media_segundos": round(self.duracion_media, 3)
+        }
+
+class AdmissionController:
+    def __init__(self, prefijo_api):
+        self.prefijo_api = prefijo_api
+        self.clases = {
+            'export': ClaseAdmision('export', settings.ADMISION_EXPORT, settings.ADMISION_COLA, settings.ADMISION_TIMEOUT),
+            'pesada': ClaseAdmision('pesada', settings.ADMISION_PESADA, settings.ADMISION_COLA, settings.ADMISION_TIMEOUT),
+            'general': ClaseAdmision('general', settings.ADMISION_GENERAL, settings.ADMISION_COLA * 4, settings.ADMISION_TIMEOUT),
+        }
+
+    def clasificar(self, path, query_string=b''):
+        """Clase de un request o None si no pasa por control de admisión"""
+        if not path.startswith(self.prefijo_api):
+            return None
+        ruta = path[len(self.prefijo_api):]
+
+        # Streams de larga duración y endpoints que no consultan la base de datos
+        if ruta.startswith(('/eventos/', '/etl/', '/debug/')):
+            return None
+        if ruta.startswith('/desenlaces/export/'):
+            return self.clases['export']
+        if ruta.startswith(('/estadisticas/estancia-promedio', '/estadisticas/cubo', '/estadisticas/pacientes-unicos')):
+            return self.clases['pesada']
+        if ruta == '/desenlaces/' and _limite(query_string) > 100:
+            return self.clases['pesada']
+        return self.clases['general']
+
+    def get_status(self):
+        return {nombre: clase.get_status() for nombre, clase in self.clases.items()}
+
+def _limite(query_string):
+    """Valor del parámetro limit (100 por defecto, igual que el endpoint)"""
+    for parte in query_string.decode('latin-1').split('&'):
+        clave, _, valor = parte.partition('=')
+        if clave == 'limit' and valor.isdigit():
+            return int(valor)
+    return 100
+
+# Instancia global del control de admisión
+admission_controller = AdmissionController(settings.API_V1_STR)
@@ -0,0 +1,140 @@
+"""
+Invalidación de cachés entre workers con LISTEN/NOTIFY de PostgreSQL
+Al completar un ETL se publica un NOTIFY con la nueva versión de datos; cada
+worker escucha el canal en un hilo propio y, al recibirlo, descarta las
+respuestas de las unidades cargadas, recarga la caché de dimensiones y
+despierta a los KPIs por SSE. Mientras la escucha está activa la versión de
+datos casi no se relee de etl_runs
+"""
+
+import json
+import logging
+import select
+import threading
+import time
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class DataVersionListener:
+    def __init__(self, canal, espera_maxima=30.0):
+        self.canal = canal
+        self.espera_maxima = espera_maxima
+        self._detener = threading.Event()
+        self._hilo = None
+        self.conectado = False
+        self.notificaciones = 0
+        self.ultima = None
+        self.last_error = None
+
+    def start(self):
+        if self._hilo is not None:
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._escuchar, name="data-version-listener", daemon=True)
+        self._hilo.start()
+
+    def stop(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+            self._hilo = None
+
+    def _escuchar(self):
+        """Mantiene la conexión de escucha; si se corta, reconecta con espera creciente"""
+        espera = 1.0
+        while not self._detener.is_set():
+            try:
+                self._sesion()
+                espera = 1.0
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"Escucha de versiones de datos interrumpida: {e}; reintento en {espera:.0f}s")
+            self._desconectado()
+            self._detener.wait(espera)
+            espera = min(espera * 2, self.espera_maxima)
+
+    def _sesion(self):
+        import psycopg2
+
+        # Conexión propia fuera del pool: queda tomada mientras dure la escucha.
+        # Siempre al primario: las réplicas no reciben NOTIFY
+        connection = psycopg2.connect(settings.postgres_url)
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.canal}"')
+            self._conectado()
+            while not self._detener.is_set():
+                # Despierta periódicamente para poder detenerse
+                if select.select([connection], [], [], 5.0) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    self._procesar(connection.notifies.pop(0).payload)
+        finally:
+            connection.close()
+
+    def _conectado(self):
+        from services.dimension_cache import dimension_cache
+        from services.etl_state import etl_state
+        from services.response_cache import response_cache
+
+        # Lo publicado mientras no se escuchaba se perdió: resincronizar desde etl_runs
+        response_cache.set_versiones(etl_state.get_data_versions())
+        response_cache.notificaciones = True
+        dimension_cache.invalidate()
+        self.conectado = True
+        self.last_error = None
+        logger.info(f"Escuchando versiones de datos en el canal {self.canal}")
+
+    def _desconectado(self):
+        from services.response_cache import response_cache
+
+        # Sin notificaciones se vuelve a releer la versión cada pocos segundos
+        response_cache.notificaciones = False
+        self.conectado = False
+
+    def _procesar(self, payload):
+        """Aplica en este worker una versión de datos publicada por cualquier worker o job externo"""
+        from services.database import db_service
+        from services.dimension_cache import dimension_cache
+        from services.etl_state import etl_state
+        from services.kpi_events import kpi_broadcaster
+        from services.response_cache import response_cache
+
+        try:
+            mensaje = json.loads(payload) if payload else {}
+        except ValueError:
+            mensaje = {}
+        version = mensaje.get("run_id")
+        unidades = mensaje.get("unidades") or [settings.UNIDAD_DEFECTO]
+        self.notificaciones += 1
+        self.ultima = {"run_id": version, "unidades": unidades, "recibida": time.time()}
+
+        try:
+            if version is None:
+                # Payload desconocido (p. ej. un NOTIFY manual): releer todas las versiones
+                response_cache.set_versiones(etl_state.get_data_versions())
+            else:
+                response_cache.publicar(version, unidades)
+            # El worker que corrió el ETL ya recargó sus dimensiones
+            if mensaje.get("worker") != etl_state.worker:
+                dimension_cache.refresh(db_service.engine)
+            kpi_broadcaster.despertar()
+            logger.info(f"Versión de datos {version} recibida para unidades {unidades}")
+        except Exception as e:
+            logger.error(f"Error aplicando versión de datos {version}: {e}")
+
+    def get_status(self):
+        return {
+            "canal": self.canal,
+            "conectado": self.conectado,
+            "notificaciones": self.notificaciones,
+            "ultima": self.ultima,
+            "last_error": self.last_error
+        }
+
+# Instancia global de la escucha de versiones de datos
+data_version_listener = DataVersionListener(settings.DATA_NOTIFY_CANAL)
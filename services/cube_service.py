@@ -0,0 +1,125 @@
+"""
+Servicio de agregación genérica (cubo) sobre dashboard_desenlaces
+Compila dimensiones y medidas permitidas más los filtros estándar en una
+sola consulta parametrizada y guarda el SQL compilado por forma de consulta
+"""
+
+import logging
+from functools import lru_cache
+
+from etl.age_bands import sql_case
+from services.database import db_service, CONDICIONES_FILTRO, filtros_activos
+from services.dimension_cache import dimension_cache
+
+logger = logging.getLogger(__name__)
+
+MAX_DIMENSIONES = 3
+MAX_GRUPOS = 5000
+
+# nombre público -> (expresión SQL, columna de dimensión a decodificar o None)
+DIMENSIONES_CUBO = {
+    'aseguradora': ("d.aseguradora_key", 'nombre_aseguradora'),
+    'condicion_egreso': ("d.condicion_egreso_key", 'condicion_egreso_nombre'),
+    'sala_egreso': ("d.sala_egreso_key", 'sala_egreso'),
+    'medico_tratante': ("d.medico_tratante_key", 'medico_tratante'),
+    'diagnostico': ("d.diagnostico_key", 'diagnostico'),
+    'sexo': ("d.sexo", None),
+    'causa': ("d.causa", None),
+    'año': ("EXTRACT(YEAR FROM d.fecha_ingreso)::int", None),
+    'mes': ("TO_CHAR(d.fecha_ingreso, 'YYYY-MM')", None),
+    'rango_edad': (sql_case('d.edad'), None),
+}
+
+# nombre público -> expresión SQL agregada
+FALLECIDOS_SQL = "COUNT(*) FILTER (WHERE d.condicion_egreso_key = ANY(%(fallecido_keys)s))"
+MEDIDAS_CUBO = {
+    'total_casos': "COUNT(*)",
+    'pacientes_unicos': "COUNT(DISTINCT d.numero_historia_clinica)",
+    'promedio_estancia': "ROUND(AVG(d.dias_estancia), 1)",
+    'promedio_edad': "ROUND(AVG(d.edad), 1)",
+    'casos_activos': "COUNT(*) FILTER (WHERE d.fecha_egreso IS NULL)",
+    'casos_fallecidos': FALLECIDOS_SQL,
+    'tasa_mortalidad': f"ROUND({FALLECIDOS_SQL} * 100.0 / NULLIF(COUNT(*), 0), 2)",
+}
+
+class CubeQueryError(ValueError):
+    """Consulta de cubo inválida o que excede los límites permitidos"""
+
+@lru_cache(maxsize=256)
+def compilar_cubo(dimensiones, medidas, filtros):
+    """Compila la forma (dimensiones, medidas, filtros activos) a SQL parametrizado"""
+    columnas = [f"{DIMENSIONES_CUBO[nombre][0]} AS {nombre}" for nombre in dimensiones]
+    columnas += [f"{MEDIDAS_CUBO[nombre]} AS {nombre}" for nombre in medidas]
+    condiciones = [CONDICIONES_FILTRO[nombre].format(a='d.', f='fecha_ingreso') for nombre in filtros]
+
+    query = "SELECT " + ",\n       ".join(columnas) + "\nFROM dashboard_desenlaces d"
+    if condiciones:
+        query += "\nWHERE " + "\n  AND ".join(condiciones)
+    if dimensiones:
+        posiciones = ", ".join(str(i + 1) for i in range(len(dimensiones)))
+        query += f"\nGROUP BY {posiciones}\nORDER BY {posiciones}"
+    query += "\nLIMIT %(limite_grupos)s"
+    return query
+
+class CubeService:
+    def _validar(self, dimensiones, medidas, max_grupos):
+        desconocidas = [d for d in dimensiones if d not in DIMENSIONES_CUBO]
+        if desconocidas:
+            raise CubeQueryError(f"Dimensiones no permitidas: {desconocidas}. Opciones: {list(DIMENSIONES_CUBO)}")
+        desconocidas = [m for m in medidas if m not in MEDIDAS_CUBO]
+        if desconocidas:
+            raise CubeQueryError(f"Medidas no permitidas: {desconocidas}. Opciones: {list(MEDIDAS_CUBO)}")
+        if len(dimensiones) > MAX_DIMENSIONES:
+            raise CubeQueryError(f"Máximo {MAX_DIMENSIONES} dimensiones por consulta")
+        if len(set(dimensiones)) != len(dimensiones) or len(set(medidas)) != len(medidas):
+            raise CubeQueryError("Dimensiones y medidas no pueden repetirse")
+        if not medidas:
+            raise CubeQueryError("Se requiere al menos una medida")
+        if not 1 <= max_grupos <= MAX_GRUPOS:
+            raise CubeQueryError(f"max_grupos debe estar entre 1 y {MAX_GRUPOS}")
+
+    def consultar(self, dimensiones, medidas, filtros=None, max_grupos=1000):
+        """Ejecuta la agregación y retorna registros con los nombres de dimensión decodificados"""
+        dimensiones = tuple(dimensiones)
+        medidas = tuple(medidas)
+        self._validar(dimensiones, medidas, max_grupos)
+
+        activos = filtros_activos(filtros)
+        query = compilar_cubo(dimensiones, medidas, activos)
+
+        params = {'limite_grupos': max_grupos + 1}
+        for nombre in activos:
+            params.update(db_service.parametros_filtro(nombre, filtros[nombre]))
+        if 'casos_fallecidos' in medidas or 'tasa_mortalidad' in medidas:
+            dimension_cache.ensure_loaded(db_service.engine)
+            params['fallecido_keys'] = dimension_cache.keys_like('condicion_egreso_nombre', 'fallecido')
+
+        df = db_service.execute_query(query, params, nombre="cubo__" + "__".join(dimensiones))
+
+        if len(df) > max_grupos:
+            raise CubeQueryError(
+                f"La consulta produce más de {max_grupos} grupos; agregue filtros o reduzca dimensiones"
+            )
+
+        records = df.to_dict('records')
+        dimension_cache.ensure_loaded(db_service.engine)
+        for nombre in dimensiones:
+            columna = DIMENSIONES_CUBO[nombre][1]
+            if columna:
+                for record in records:
+                    value = record[nombre]
+                    record[nombre] = dimension_cache.name(columna, value) if value == value else None
+        return records
+
+    def get_opciones(self):
+        info = compilar_cubo.cache_info()
+        return {
+            "dimensiones": list(DIMENSIONES_CUBO),
+            "medidas": list(MEDIDAS_CUBO),
+            "max_dimensiones": MAX_DIMENSIONES,
+            "max_grupos": MAX_GRUPOS,
+            "cache_planes": {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+        }
+
+# Instancia global del servicio de cubo
+cube_service = CubeService()
@@ -1,27 +1,89 @@
-import pandas as pd
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
 import logging
+import threading
 from config.settings import settings
+from etl.dimensions import desenlaces_select_sql
+from services.dimension_cache import dimension_cache
+from services.query_control import ConsultaCancelada, consulta_controlada
+from services.query_registry import query_registry
+from services.replica_router import replica_router
 
 logger = logging.getLogger(__name__)
 
+# Condiciones SQL de los filtros estándar ({a} = alias de tabla, {f} = columna de fecha)
+CONDICIONES_FILTRO = {
+    # Con unidad_id PostgreSQL lee solo la partición de esa unidad
+    'unidad_id': "{a}unidad_id = %(unidad_id)s",
+    'fecha_inicio': "{a}{f} >= %(fecha_inicio)s",
+    'fecha_fin': "{a}{f} <= %(fecha_fin)s",
+    'aseguradora': "{a}aseguradora_key = ANY(%(aseguradora_keys)s)",
+    'sexo': "{a}sexo = %(sexo)s",
+    'edad_min': "{a}edad >= %(edad_min)s",
+    'edad_max': "{a}edad <= %(edad_max)s",
+    'condicion_egreso': "{a}condicion_egreso_key = ANY(%(condicion_egreso_keys)s)",
+}
+
+def filtros_activos(filtros, incluir_edad=True):
+    """Nombres de los filtros con valor, en orden estable (define la forma de la consulta)"""
+    return tuple(
+        nombre for nombre in CONDICIONES_FILTRO
+        if filtros and filtros.get(nombre) and (incluir_edad or not nombre.startswith('edad'))
+    )
+
 class DatabaseService:
     def __init__(self):
-        self.engine = None
-        self.SessionLocal = None
+        # El engine y el pool se crean en el primer uso o en warmup(), no al importar
+        self._engine = None
+        self._SessionLocal = None
+        self._lock = threading.Lock()
         self.connection_string = settings.postgres_url
-        self._connect()
+        self.warm = False
+    
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._connect()
+        return self._engine
+    
+    @property
+    def read_engine(self):
+        """Engine para lecturas: una réplica al día o, si no hay, el primario"""
+        return replica_router.read_engine() or self.engine
+    
+    @property
+    def SessionLocal(self):
+        if self._SessionLocal is None:
+            self._connect()
+        return self._SessionLocal
     
     def _connect(self):
         """Establece conexión con PostgreSQL"""
+        with self._lock:
+            if self._engine is not None:
+                return
+            try:
+                from sqlalchemy import create_engine
+                from sqlalchemy.orm import sessionmaker
+                
+                self._engine = create_engine(self.connection_string, pool_pre_ping=True)
+                self._SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self._engine)
+                logger.info("Conexión establecida con PostgreSQL")
+            except Exception as e:
+                logger.error(f"Error conectando a PostgreSQL: {e}")
+                raise
+    
+    def warmup(self):
+        """Precarga pandas, abre una conexión del pool y carga la caché de dimensiones"""
         try:
-            self.engine = create_engine(self.connection_string)
-            self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
-            logger.info("Conexión establecida con PostgreSQL")
+            import pandas  # noqa: F401
+            from sqlalchemy import text
+            
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            dimension_cache.ensure_loaded(self.engine)
+            self.warm = True
+            logger.info("Warmup de base de datos completado")
         except Exception as e:
-            logger.error(f"Error conectando a PostgreSQL: {e}")
-            raise
+            logger.warning(f"Warmup de base de datos falló (se reintentará en el primer uso): {e}")
     
     def get_session(self):
         """Obtiene una sesión de base de datos"""
@@ -31,168 +93,377 @@ class DatabaseService:
         finally:
             db.close()
     
-    def execute_query(self, query, params=None):
-        """Ejecuta una consulta y retorna DataFrame"""
+    def execute_query(self, query, params=None, nombre=None):
+        """Ejecuta una consulta de lectura y retorna DataFrame; con nombre usa una sentencia preparada"""
+        import pandas as pd
+        
+        engine = self.read_engine
         try:
-            if params:
-                df = pd.read_sql_query(query, self.engine, params=params)
-            else:
-                df = pd.read_sql_query(query, self.engine)
-            return df
+            return self._execute(engine, query, params, nombre)
+        except ConsultaCancelada:
+            # Timeout o cliente desconectado: no reintentar ni devolver un resultado vacío
+            raise
         except Exception as e:
+            if engine is not self.engine:
+                # La réplica falló: sacarla de rotación y leer del primario
+                replica_router.mark_failed(engine, e)
+                try:
+                    return self._execute(self.engine, query, params, nombre)
+                except ConsultaCancelada:
+                    raise
+                except Exception as primary_error:
+                    e = primary_error
             logger.error(f"Error ejecutando consulta: {e}")
             return pd.DataFrame()
     
-    def get_desenlaces(self, filtros=None):
-        """Obtiene datos de desenlaces con filtros opcionales"""
-        query = """
+    def _execute(self, engine, query, params, nombre):
+        import pandas as pd
+        
+        if nombre:
+            return self._execute_prepared(engine, nombre, query, params or {})
+        with engine.connect() as connection:
+            with consulta_controlada(connection.connection):
+                if params:
+                    return pd.read_sql_query(query, connection, params=params)
+                return pd.read_sql_query(query, connection)
+    
+    def _execute_prepared(self, engine, nombre, query, params, reintentar=True):
+        """Ejecuta una sentencia preparada una sola vez por conexión del pool"""
+        import pandas as pd
+        
+        sentencia = query_registry.compilar(nombre, query)
+        raw = engine.raw_connection()
+        preparadas = raw.info.setdefault('sentencias_preparadas', set())
+        try:
+            with consulta_controlada(raw):
+                cursor = raw.cursor()
+                try:
+                    if sentencia.nombre not in preparadas:
+                        cursor.execute(sentencia.prepare_sql)
+                        preparadas.add(sentencia.nombre)
+                        query_registry.preparaciones += 1
+                    cursor.execute(sentencia.execute_sql, sentencia.valores(params))
+                    columnas = [column[0] for column in cursor.description]
+                    rows = cursor.fetchall()
+                finally:
+                    cursor.close()
+            raw.commit()
+            return pd.DataFrame(rows, columns=columnas)
+        
+        except Exception as e:
+            raw.rollback()
+            if isinstance(e, ConsultaCancelada) or not reintentar or sentencia.nombre not in preparadas:
+                raise
+            # El plan quedó inválido (p. ej. cambió el esquema tras un ETL): preparar de nuevo
+            logger.warning(f"Re-preparando sentencia {sentencia.nombre}: {e}")
+            preparadas.discard(sentencia.nombre)
+            cursor = raw.cursor()
+            try:
+                cursor.execute(f"DEALLOCATE {sentencia.nombre}")
+                raw.commit()
+            except Exception:
+                raw.rollback()
+            finally:
+                cursor.close()
+        finally:
+            raw.close()
+        
+        return self._execute_prepared(engine, nombre, query, params, reintentar=False)
+    
+    def _condiciones_filtro(self, filtros, columna_fecha='fecha_ingreso', alias='d.', incluir_edad=True):
+        """Traduce los filtros estándar a condiciones SQL y parámetros enlazados"""
+        condiciones = []
+        params = {}
+        
+        if not filtros:
+            return condiciones, params
+        
+        for nombre in filtros_activos(filtros, incluir_edad):
+            condiciones.append(CONDICIONES_FILTRO[nombre].format(a=alias, f=columna_fecha))
+            params.update(self.parametros_filtro(nombre, filtros[nombre]))
+        
+        return condiciones, params
+    
+    def parametros_filtro(self, nombre, valor):
+        """Parámetros enlazados de un filtro; los textos se resuelven a claves de dimensión"""
+        if nombre == 'aseguradora':
+            dimension_cache.ensure_loaded(self.engine)
+            return {'aseguradora_keys': dimension_cache.keys_like('nombre_aseguradora', valor)}
+        if nombre == 'condicion_egreso':
+            dimension_cache.ensure_loaded(self.engine)
+            return {'condicion_egreso_keys': dimension_cache.keys_like('condicion_egreso_nombre', valor)}
+        return {nombre: valor}
+    
+    def get_desenlaces(self, filtros=None, columnas=None, limite=1000):
+        """Obtiene datos de desenlaces con filtros opcionales; columnas=None trae todas"""
+        query = desenlaces_select_sql(columnas) + "\nWHERE 1=1"
+        
+        condiciones, params = self._condiciones_filtro(filtros)
+        for condicion in condiciones:
+            query += f" AND {condicion}"
+        
+        query += " ORDER BY d.fecha_ingreso DESC LIMIT %(limite)s"
+        params['limite'] = limite
+        
+        nombre = "desenlaces__" + "__".join(filtros_activos(filtros))
+        return self.execute_query(query, params, nombre=nombre)
+    
+    def _filtros_segmento(self, filtros):
+        """Condiciones WHERE y parámetros para las tablas precalculadas por día y segmento"""
+        condiciones, params = self._condiciones_filtro(filtros, columna_fecha='fecha', alias='', incluir_edad=False)
+        where = " WHERE " + " AND ".join(condiciones) if condiciones else ""
+        return where, params
+    
+    def get_sketches_estancia(self, filtros=None):
+        """Obtiene los histogramas de estancia precalculados que cumplen los filtros"""
+        where, params = self._filtros_segmento(filtros)
+        query = "SELECT histograma FROM dashboard_sketch_estancia" + where
+        return self.execute_query(query, params, nombre="sketch_estancia")
+    
+    def histograma_estancia_exacto(self, filtros=None):
+        """Casos por días de estancia agrupando los registros"""
+        condiciones, params = self._condiciones_filtro(filtros, incluir_edad=False)
+        condiciones.append("d.dias_estancia > 0")
+        
+        query = f"""
+        SELECT d.dias_estancia, COUNT(*) as casos
+        FROM dashboard_desenlaces d
+        WHERE {' AND '.join(condiciones)}
+        GROUP BY d.dias_estancia
+        """
+        nombre = "estancia_exacto__" + "__".join(filtros_activos(filtros, incluir_edad=False))
+        return self.execute_query(query, params, nombre=nombre)
+    
+    def get_histograma_estancia(self, filtros=None, exacto=False):
+        """
+        Histograma de días de estancia combinando los precalculados por día y
+        segmento, o exacto si se pide o aún no hay histogramas
+        """
+        from etl.sketches.estancia import HistogramaEstancia
+        
+        if not exacto:
+            sketches_df = self.get_sketches_estancia(filtros)
+            if not sketches_df.empty:
+                histograma = HistogramaEstancia()
+                for data in sketches_df['histograma']:
+                    histograma.merge(HistogramaEstancia.from_json(data))
+                return histograma
+        
+        df = self.histograma_estancia_exacto(filtros)
+        if df.empty:
+            return HistogramaEstancia()
+        return HistogramaEstancia(dict(zip(df['dias_estancia'], df['casos'])))
+    
+    def get_sketches_pacientes(self, filtros=None):
+        """Obtiene los sketches HyperLogLog de pacientes que cumplen los filtros"""
+        where, params = self._filtros_segmento(filtros)
+        query = "SELECT fecha, aseguradora_key, hll FROM dashboard_sketch_pacientes" + where
+        return self.execute_query(query, params, nombre="sketch_pacientes")
+    
+    def get_sketches_diagnosticos(self, filtros=None):
+        """Obtiene los resúmenes Space-Saving de diagnósticos que cumplen los filtros"""
+        where, params = self._filtros_segmento(filtros)
+        query = "SELECT resumen FROM dashboard_sketch_diagnosticos" + where
+        return self.execute_query(query, params, nombre="sketch_diagnosticos")
+    
+    def top_diagnosticos_exacto(self, filtros=None, limite=10):
+        """Diagnósticos más frecuentes agrupando los registros"""
+        condiciones, params = self._condiciones_filtro(filtros)
+        condiciones.append("d.diagnostico_key IS NOT NULL")
+        params['limite'] = limite
+        
+        query = f"""
         SELECT 
-            id,
-            desenlaceq_id,
-            numero_episodio,
-            fecha_ingreso,
-            fecha_egreso,
-            dias_estancia,
-            diagnostico,
-            sala_egreso,
-            causa,
-            nombre_paciente,
-            sexo,
-            edad,
-            medico_tratante,
-            numero_historia_clinica,
-            nombre_aseguradora,
-            condicion_egreso_nombre,
-            fecha_procesamiento
-        FROM dashboard_desenlaces
-        WHERE 1=1
+            d.diagnostico_key,
+            COUNT(*) as total_casos,
+            ROUND(AVG(d.dias_estancia), 1) as promedio_estancia
+        FROM dashboard_desenlaces d
+        WHERE {' AND '.join(condiciones)}
+        GROUP BY d.diagnostico_key
+        ORDER BY total_casos DESC, d.diagnostico_key
+        LIMIT %(limite)s
+        """
+        nombre = "top_diagnosticos__" + "__".join(filtros_activos(filtros))
+        return self.execute_query(query, params, nombre=nombre)
+    
+    def get_top_diagnosticos(self, filtros=None, limite=10, exacto=False):
         """
+        Diagnósticos más frecuentes (claves) combinando los resúmenes Space-Saving
+        por día y segmento, o exactos si se pide o aún no hay resúmenes
+        """
+        from etl.sketches.space_saving import SpaceSaving
         
-        params = {}
+        if not exacto:
+            sketches_df = self.get_sketches_diagnosticos(filtros)
+            if not sketches_df.empty:
+                resumen = SpaceSaving.merge_json(sketches_df['resumen'])
+                diagnosticos = []
+                for fila in resumen.top(limite):
+                    fila['diagnostico_key'] = fila.pop('item')
+                    fila['modo'] = 'space_saving'
+                    diagnosticos.append(fila)
+                return diagnosticos
         
-        if filtros:
-            if filtros.get('fecha_inicio'):
-                query += " AND fecha_ingreso >= %(fecha_inicio)s"
-                params['fecha_inicio'] = filtros['fecha_inicio']
-            
-            if filtros.get('fecha_fin'):
-                query += " AND fecha_ingreso <= %(fecha_fin)s"
-                params['fecha_fin'] = filtros['fecha_fin']
-            
-            if filtros.get('aseguradora'):
-                query += " AND nombre_aseguradora ILIKE %(aseguradora)s"
-                params['aseguradora'] = f"%{filtros['aseguradora']}%"
-            
-            if filtros.get('sexo'):
-                query += " AND sexo = %(sexo)s"
-                params['sexo'] = filtros['sexo']
-            
-            if filtros.get('edad_min'):
-                query += " AND edad >= %(edad_min)s"
-                params['edad_min'] = filtros['edad_min']
-            
-            if filtros.get('edad_max'):
-                query += " AND edad <= %(edad_max)s"
-                params['edad_max'] = filtros['edad_max']
-            
-            if filtros.get('condicion_egreso'):
-                query += " AND condicion_egreso_nombre ILIKE %(condicion_egreso)s"
-                params['condicion_egreso'] = f"%{filtros['condicion_egreso']}%"
+        import pandas as pd
+        
+        df = self.top_diagnosticos_exacto(filtros, limite)
+        return [
+            {
+                'diagnostico_key': int(record['diagnostico_key']),
+                'total_casos': int(record['total_casos']),
+                'error_maximo': 0,
+                'promedio_estancia': None if pd.isna(record['promedio_estancia']) else float(record['promedio_estancia']),
+                'garantizado': True,
+                'modo': 'exacto'
+            }
+            for record in df.to_dict('records')
+        ]
+    
+    def count_pacientes_exacto(self, filtros=None, agrupar_por=None):
+        """Cuenta exacta de pacientes únicos (COUNT DISTINCT sobre los registros)"""
+        condiciones, params = self._condiciones_filtro(filtros)
+        condiciones.append("d.numero_historia_clinica IS NOT NULL")
+        
+        grupo = {
+            'mes': "TO_CHAR(d.fecha_ingreso, 'YYYY-MM')",
+            'aseguradora': "d.aseguradora_key"
+        }.get(agrupar_por)
+        
+        query = f"""
+        SELECT {grupo + ' as grupo, ' if grupo else ''}COUNT(DISTINCT d.numero_historia_clinica) as total_pacientes
+        FROM dashboard_desenlaces d
+        WHERE {' AND '.join(condiciones)}
+        {'GROUP BY 1 ORDER BY 1' if grupo else ''}
+        """
+        return self.execute_query(query, params, nombre=f"pacientes_exacto_{agrupar_por}")
+    
+    def get_total_pacientes(self, filtros=None, exacto=False):
+        """Pacientes únicos para los filtros dados, aproximado por HyperLogLog o exacto"""
+        from etl.sketches.hll import HyperLogLog
         
-        query += " ORDER BY fecha_ingreso DESC LIMIT 1000"
+        if not exacto:
+            sketches_df = self.get_sketches_pacientes(filtros)
+            if not sketches_df.empty:
+                return HyperLogLog.union_json(sketches_df['hll']).resultado()
         
-        return self.execute_query(query, params)
+        df = self.count_pacientes_exacto(filtros)
+        total = int(df.iloc[0]['total_pacientes']) if not df.empty else 0
+        return {'total_pacientes': total, 'error_relativo': 0.0, 'intervalo_95': [total, total], 'modo': 'exacto'}
     
-    def get_estadisticas_aseguradoras(self):
-        """Obtiene estadísticas por aseguradora"""
-        query = """
+    def _filtro_unidad(self, unidad_id, prefijo="WHERE"):
+        """Condición por unidad para las tablas de estadísticas (vacía = todas las unidades)"""
+        if not unidad_id:
+            return "", {}, ""
+        return f"{prefijo} unidad_id = %(unidad_id)s", {'unidad_id': unidad_id}, "_unidad"
+    
+    def get_estadisticas_aseguradoras(self, unidad_id=None):
+        """Obtiene estadísticas por aseguradora (de una unidad o sumadas entre unidades)"""
+        where, params, sufijo = self._filtro_unidad(unidad_id)
+        query = f"""
         SELECT 
             nombre_aseguradora,
-            total_casos,
-            promedio_estancia,
-            casos_mejorados,
-            casos_fallecidos
+            SUM(total_casos)::int as total_casos,
+            ROUND(SUM(promedio_estancia * total_casos) / NULLIF(SUM(total_casos), 0), 2) as promedio_estancia,
+            SUM(casos_mejorados)::int as casos_mejorados,
+            SUM(casos_fallecidos)::int as casos_fallecidos
         FROM dashboard_stats_aseguradora
+        {where}
+        GROUP BY nombre_aseguradora
         ORDER BY total_casos DESC
         """
-        return self.execute_query(query)
+        return self.execute_query(query, params, nombre="stats_aseguradoras" + sufijo)
     
-    def get_estadisticas_mensuales(self):
-        """Obtiene estadísticas mensuales"""
-        query = """
+    def get_estadisticas_mensuales(self, unidad_id=None):
+        """Obtiene estadísticas mensuales (de una unidad o sumadas entre unidades)"""
+        where, params, sufijo = self._filtro_unidad(unidad_id)
+        query = f"""
         SELECT 
             año,
             mes,
-            total_ingresos,
-            promedio_estancia,
-            casos_mejorados,
-            casos_fallecidos
+            SUM(total_ingresos)::int as total_ingresos,
+            ROUND(SUM(promedio_estancia * total_ingresos) / NULLIF(SUM(total_ingresos), 0), 2) as promedio_estancia,
+            SUM(casos_mejorados)::int as casos_mejorados,
+            SUM(casos_fallecidos)::int as casos_fallecidos
         FROM dashboard_stats_mensual
+        {where}
+        GROUP BY año, mes
         ORDER BY año DESC, mes DESC
         LIMIT 12
         """
-        return self.execute_query(query)
+        return self.execute_query(query, params, nombre="stats_mensuales" + sufijo)
     
-    def get_estadisticas_demografia(self):
-        """Obtiene estadísticas demográficas"""
-        query = """
+    def get_estadisticas_edad_sexo(self, unidad_id=None):
+        """Casos y suma de estancia por sexo y año de edad (de una unidad o sumados entre unidades)"""
+        where, params, sufijo = self._filtro_unidad(unidad_id)
+        query = f"""
         SELECT 
             sexo,
-            rango_edad,
-            total_casos,
-            promedio_estancia
-        FROM dashboard_stats_demografia
-        ORDER BY sexo, rango_edad
+            edad,
+            SUM(total_casos)::int as total_casos,
+            SUM(casos_estancia)::int as casos_estancia,
+            SUM(suma_estancia) as suma_estancia
+        FROM dashboard_stats_edad_sexo
+        {where}
+        GROUP BY sexo, edad
+        ORDER BY sexo, edad
         """
-        return self.execute_query(query)
+        return self.execute_query(query, params, nombre="stats_edad_sexo" + sufijo)
     
-    def get_dashboard_summary(self):
-        """Obtiene resumen para el dashboard"""
+    def _scalar(self, query, columna, params=None, nombre=None):
+        """Ejecuta una consulta de una fila y retorna una columna (0 si no hay resultado)"""
+        df = self.execute_query(query, params, nombre=nombre)
+        return df.iloc[0][columna] if not df.empty else 0
+    
+    def get_dashboard_summary(self, unidad_id=None):
+        """Obtiene resumen para el dashboard (de una unidad o de todas)"""
         try:
-            # Total de pacientes únicos
-            total_pacientes_query = """
-            SELECT COUNT(DISTINCT numero_historia_clinica) as total
-            FROM dashboard_desenlaces
-            WHERE numero_historia_clinica IS NOT NULL
-            """
+            unidad, params, sufijo = self._filtro_unidad(unidad_id, prefijo="AND")
             
             # Ingresos del mes actual
-            ingresos_mes_query = """
+            ingresos_mes_query = f"""
             SELECT COUNT(*) as total
             FROM dashboard_desenlaces
             WHERE EXTRACT(MONTH FROM fecha_ingreso) = EXTRACT(MONTH FROM CURRENT_DATE)
             AND EXTRACT(YEAR FROM fecha_ingreso) = EXTRACT(YEAR FROM CURRENT_DATE)
+            {unidad}
             """
             
             # Promedio de estancia
-            promedio_estancia_query = """
+            promedio_estancia_query = f"""
             SELECT AVG(dias_estancia) as promedio
             FROM dashboard_desenlaces
-            WHERE dias_estancia IS NOT NULL
+            WHERE dias_estancia IS NOT NULL {unidad}
             """
             
             # Tasa de mortalidad
-            mortalidad_query = """
+            mortalidad_query = f"""
             SELECT 
                 COUNT(*) as total,
-                COUNT(CASE WHEN condicion_egreso_nombre ILIKE '%fallecido%' THEN 1 END) as fallecidos
+                COUNT(CASE WHEN condicion_egreso_key = ANY(%(fallecido_keys)s) THEN 1 END) as fallecidos
             FROM dashboard_desenlaces
-            WHERE condicion_egreso_nombre IS NOT NULL
+            WHERE condicion_egreso_key IS NOT NULL {unidad}
             """
             
+            dimension_cache.ensure_loaded(self.engine)
+            mortalidad_params = {
+                **params,
+                'fallecido_keys': dimension_cache.keys_like('condicion_egreso_nombre', 'fallecido')
+            }
+            
             # Casos activos (sin fecha de egreso)
-            casos_activos_query = """
+            casos_activos_query = f"""
             SELECT COUNT(*) as total
             FROM dashboard_desenlaces
-            WHERE fecha_egreso IS NULL
+            WHERE fecha_egreso IS NULL {unidad}
             """
             
-            total_pacientes = self.execute_query(total_pacientes_query).iloc[0]['total'] if not self.execute_query(total_pacientes_query).empty else 0
-            ingresos_mes = self.execute_query(ingresos_mes_query).iloc[0]['total'] if not self.execute_query(ingresos_mes_query).empty else 0
-            promedio_estancia = self.execute_query(promedio_estancia_query).iloc[0]['promedio'] if not self.execute_query(promedio_estancia_query).empty else 0
-            casos_activos = self.execute_query(casos_activos_query).iloc[0]['total'] if not self.execute_query(casos_activos_query).empty else 0
+            # Total de pacientes únicos (HyperLogLog precalculado; exacto si aún no hay sketches)
+            total_pacientes = self.get_total_pacientes({'unidad_id': unidad_id})['total_pacientes']
+            ingresos_mes = self._scalar(ingresos_mes_query, 'total', params, nombre="resumen_ingresos_mes" + sufijo)
+            promedio_estancia = self._scalar(promedio_estancia_query, 'promedio', params, nombre="resumen_promedio_estancia" + sufijo)
+            casos_activos = self._scalar(casos_activos_query, 'total', params, nombre="resumen_casos_activos" + sufijo)
             
-            mortalidad_df = self.execute_query(mortalidad_query)
+            mortalidad_df = self.execute_query(mortalidad_query, mortalidad_params, nombre="resumen_mortalidad" + sufijo)
             tasa_mortalidad = 0
             if not mortalidad_df.empty and mortalidad_df.iloc[0]['total'] > 0:
                 tasa_mortalidad = (mortalidad_df.iloc[0]['fallecidos'] / mortalidad_df.iloc[0]['total']) * 100
@@ -205,6 +476,9 @@ class DatabaseService:
                 'casos_activos': int(casos_activos) if casos_activos else 0
             }
             
+        except ConsultaCancelada:
+            # Un resumen en ceros por timeout no debe servirse (ni cachearse) como válido
+            raise
         except Exception as e:
             logger.error(f"Error obteniendo resumen del dashboard: {e}")
             return {
@@ -1,29 +1,45 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
 import logging
+import threading
 from config.settings import settings
+from etl.dimensions import desenlaces_select_sql
+from services.dimension_cache import dimension_cache
 
 logger = logging.getLogger(__name__)
 
 class DatabaseService:
     def __init__(self):
-        self.engine = None
+        # El engine se crea en el primer uso, no al importar el módulo
+        self._engine = None
+        self._lock = threading.Lock()
         self.SessionLocal = None
         self.connection_string = settings.postgres_url
-        self._connect()
+    
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._connect()
+        return self._engine
     
     def _connect(self):
         """Establece conexión con PostgreSQL"""
-        try:
-            self.engine = create_engine(self.connection_string)
-            self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
-            logger.info("Conexión establecida con PostgreSQL")
-        except Exception as e:
-            logger.error(f"Error conectando a PostgreSQL: {e}")
-            raise
+        with self._lock:
+            if self._engine is not None:
+                return
+            try:
+                from sqlalchemy import create_engine
+                from sqlalchemy.orm import sessionmaker
+                
+                self._engine = create_engine(self.connection_string, pool_pre_ping=True)
+                self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self._engine)
+                logger.info("Conexión establecida con PostgreSQL")
+            except Exception as e:
+                logger.error(f"Error conectando a PostgreSQL: {e}")
+                raise
     
     def execute_query(self, query, params=None):
         """Ejecuta una consulta y retorna lista de diccionarios"""
+        from sqlalchemy import text
+        
         try:
             with self.engine.connect() as conn:
                 if params:
@@ -41,24 +57,13 @@ class DatabaseService:
     
     def get_desenlaces(self, filtros=None):
         """Obtiene datos de desenlaces con filtros opcionales"""
-        query = """
-        SELECT 
-            id,
-            desenlaceq_id,
-            numero_episodio,
-            fecha_ingreso,
-            fecha_egreso,
-            dias_estancia,
-            diagnostico,
-            nombre_paciente,
-            sexo,
-            edad,
-            nombre_aseguradora,
-            condicion_egreso_nombre,
-            fecha_procesamiento
-        FROM dashboard_desenlaces
+        query = desenlaces_select_sql([
+            'id', 'desenlaceq_id', 'numero_episodio', 'fecha_ingreso', 'fecha_egreso',
+            'dias_estancia', 'diagnostico', 'nombre_paciente', 'sexo', 'edad',
+            'nombre_aseguradora', 'condicion_egreso_nombre', 'fecha_procesamiento'
+        ]) + """
         WHERE 1=1
-        ORDER BY fecha_ingreso DESC LIMIT 100
+        ORDER BY d.fecha_ingreso DESC LIMIT 100
         """
         
         return self.execute_query(query)
@@ -94,14 +99,17 @@ class DatabaseService:
         return self.execute_query(query)
     
     def get_estadisticas_demografia(self):
-        """Obtiene estadísticas demográficas"""
-        query = """
+        """Obtiene estadísticas demográficas (bandas de siempre sobre las filas por año de edad)"""
+        from etl.age_bands import sql_case
+        
+        query = f"""
         SELECT 
             sexo,
-            rango_edad,
-            total_casos,
-            promedio_estancia
-        FROM dashboard_stats_demografia
+            {sql_case('edad')} as rango_edad,
+            SUM(total_casos)::int as total_casos,
+            ROUND((SUM(suma_estancia) / NULLIF(SUM(casos_estancia), 0))::numeric, 2) as promedio_estancia
+        FROM dashboard_stats_edad_sexo
+        GROUP BY 1, 2
         ORDER BY sexo, rango_edad
         """
         return self.execute_query(query)
@@ -139,13 +147,14 @@ class DatabaseService:
             """)
             
             # Tasa de mortalidad
+            dimension_cache.ensure_loaded(self.engine)
             mortalidad = self.execute_query("""
                 SELECT 
                     COUNT(*) as total,
-                    COUNT(CASE WHEN condicion_egreso_nombre ILIKE '%fallecido%' THEN 1 END) as fallecidos
+                    COUNT(CASE WHEN condicion_egreso_key = ANY(:fallecido_keys) THEN 1 END) as fallecidos
                 FROM dashboard_desenlaces
-                WHERE condicion_egreso_nombre IS NOT NULL
-            """)
+                WHERE condicion_egreso_key IS NOT NULL
+            """, {'fallecido_keys': dimension_cache.keys_like('condicion_egreso_nombre', 'fallecido')})
             
             # Extraer valores
             total_pac = total_pacientes[0]['total'] if total_pacientes else 0
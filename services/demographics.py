@@ -0,0 +1,45 @@
+"""
+Demografía por bandas de edad arbitrarias
+Las filas por sexo y año de edad de cada unidad (unos cientos) se guardan en
+memoria por versión de datos; cada banda pedida se arma sumándolas, sin
+volver a consultar PostgreSQL hasta el siguiente ETL
+"""
+
+import logging
+import threading
+
+from etl.age_bands import LIMITES_DEFECTO, agregar
+from services.database import db_service
+from services.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+class DemografiaService:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filas = {}   # unidad_id (None = todas) -> (versión de datos, filas)
+
+    def filas(self, unidad_id=None):
+        """Filas (sexo, edad, total_casos, casos_estancia, suma_estancia) de la versión vigente"""
+        version = response_cache.current_version(unidad_id)
+        with self._lock:
+            guardadas = self._filas.get(unidad_id)
+        if guardadas is not None and version is not None and guardadas[0] == version:
+            return guardadas[1]
+
+        df = db_service.get_estadisticas_edad_sexo(unidad_id)
+        filas = [
+            tuple(None if valor != valor else valor for valor in fila)
+            for fila in df[['sexo', 'edad', 'total_casos', 'casos_estancia', 'suma_estancia']].itertuples(index=False, name=None)
+        ]
+        if version is not None:
+            with self._lock:
+                self._filas[unidad_id] = (version, filas)
+        return filas
+
+    def por_bandas(self, limites=LIMITES_DEFECTO, unidad_id=None):
+        """Casos y estancia promedio por sexo y banda de edad"""
+        return agregar(self.filas(unidad_id), limites)
+
+# Instancia global del servicio de demografía
+demografia_service = DemografiaService()
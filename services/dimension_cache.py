@@ -0,0 +1,92 @@
+"""
+Caché en proceso de las tablas de dimensión de dashboard_desenlaces
+Resuelve filtros de texto a claves SMALLINT y decodifica claves a nombres
+sin volver a consultar PostgreSQL en cada request
+"""
+
+import logging
+import threading
+from datetime import datetime
+
+from etl.dimensions import DIMENSIONES
+
+logger = logging.getLogger(__name__)
+
+class DimensionCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nombres = {}   # columna -> {clave: nombre}
+        self.loaded_at = None
+
+    @property
+    def is_loaded(self):
+        return self.loaded_at is not None
+
+    def refresh(self, engine):
+        """Recarga todas las dimensiones desde PostgreSQL"""
+        from sqlalchemy import text
+
+        try:
+            nombres = {}
+            with engine.connect() as connection:
+                for columna, (tabla, _) in DIMENSIONES.items():
+                    rows = connection.execute(text(f"SELECT id, nombre FROM {tabla}")).fetchall()
+                    nombres[columna] = {key: nombre for key, nombre in rows}
+
+            with self._lock:
+                self._nombres = nombres
+                self.loaded_at = datetime.now()
+
+            logger.info(f"Caché de dimensiones actualizada ({sum(len(v) for v in nombres.values())} valores)")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error actualizando caché de dimensiones: {e}")
+            return False
+
+    def ensure_loaded(self, engine):
+        """Carga las dimensiones en el primer uso"""
+        if not self.is_loaded:
+            self.refresh(engine)
+
+    def invalidate(self):
+        """Descarta el contenido; la siguiente consulta recarga las dimensiones"""
+        with self._lock:
+            self._nombres = {}
+            self.loaded_at = None
+
+    def keys_like(self, columna, texto):
+        """Claves cuyo nombre contiene el texto (equivalente a ILIKE '%texto%')"""
+        buscado = texto.strip().lower()
+        return [
+            key for key, nombre in self._nombres.get(columna, {}).items()
+            if buscado in nombre.lower()
+        ]
+
+    def name(self, columna, key):
+        """Nombre asociado a una clave de dimensión"""
+        if key is None:
+            return None
+        return self._nombres.get(columna, {}).get(int(key))
+
+    def decode(self, records, columna):
+        """Reemplaza en cada registro la clave de dimensión por su nombre original"""
+        clave = DIMENSIONES[columna][1]
+        decoded = []
+        for record in records:
+            decoded.append({
+                (columna if key == clave else key): (
+                    self.name(columna, value) if key == clave and value == value else value
+                )
+                for key, value in record.items()
+            })
+        return decoded
+
+    def get_status(self):
+        return {
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+            "dimensiones": {columna: len(valores) for columna, valores in self._nombres.items()}
+        }
+
+# Instancia global de la caché de dimensiones
+dimension_cache = DimensionCache()
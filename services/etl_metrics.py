@@ -0,0 +1,111 @@
+"""
+Métricas por etapa de una ejecución del ETL
+Cada etapa registra tiempo, filas de entrada/salida, filas por segundo y
+memoria pico (RSS) del proceso mientras corre; con tracemalloc activo,
+también la memoria asignada y los sitios que más asignaron
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+
+from services.memory_tracker import MuestreadorRSS, TrazaMemoria
+
+logger = logging.getLogger(__name__)
+
+class Etapa:
+    def __init__(self, nombre, tabla=None, filas_entrada=None):
+        self.nombre = nombre
+        self.tabla = tabla
+        self.filas_entrada = filas_entrada
+        self.filas_salida = None
+        self.segundos = 0.0
+        self.memoria_pico_mb = None
+        self.asignado_mb = None
+        self.sitios = None
+        self.estado = "ok"
+
+    @property
+    def clave(self):
+        return f"{self.nombre}:{self.tabla}" if self.tabla else self.nombre
+
+    def to_dict(self):
+        filas = self.filas_salida if self.filas_salida is not None else self.filas_entrada
+        return {
+            "etapa": self.nombre,
+            "tabla": self.tabla,
+            "estado": self.estado,
+            "segundos": round(self.segundos, 3),
+            "filas_entrada": self.filas_entrada,
+            "filas_salida": self.filas_salida,
+            "filas_por_segundo": round(filas / self.segundos, 1) if filas and self.segundos > 0 else None,
+            "memoria_pico_mb": round(self.memoria_pico_mb, 1) if self.memoria_pico_mb is not None else None,
+            "asignado_mb": self.asignado_mb,
+            "sitios": self.sitios
+        }
+
+class RunMetrics:
+    def __init__(self, top_sitios=10):
+        self.etapas = []
+        self.top_sitios = top_sitios
+
+    @contextmanager
+    def etapa(self, nombre, tabla=None, filas_entrada=None):
+        """Mide una etapa; el bloque puede fijar filas_entrada / filas_salida en el objeto retornado"""
+        etapa = Etapa(nombre, tabla, filas_entrada)
+        inicio = time.perf_counter()
+        traza = TrazaMemoria(self.top_sitios)
+        try:
+            with MuestreadorRSS() as muestreador, traza:
+                yield etapa
+        except Exception:
+            etapa.estado = "error"
+            raise
+        finally:
+            etapa.segundos = time.perf_counter() - inicio
+            etapa.memoria_pico_mb = muestreador.pico
+            etapa.asignado_mb = traza.asignado_mb
+            etapa.sitios = traza.sitios
+            self.etapas.append(etapa)
+            logger.info(
+                f"Etapa {etapa.clave}: {etapa.segundos:.2f}s, "
+                f"{etapa.filas_entrada} -> {etapa.filas_salida} filas, pico {etapa.memoria_pico_mb:.0f} MB"
+            )
+
+    def to_list(self):
+        return [etapa.to_dict() for etapa in self.etapas]
+
+def comparar_con_historial(actual, anteriores, umbral=1.5, delta_minimo=0.5):
+    """
+    Compara las etapas de una ejecución con la mediana de ejecuciones previas.
+    Marca regresión cuando el tiempo supera umbral x mediana y al menos
+    delta_minimo segundos (evita falsas alarmas en etapas muy cortas).
+    """
+    historial = {}
+    for etapas in anteriores:
+        for etapa in etapas or []:
+            clave = f"{etapa['etapa']}:{etapa['tabla']}" if etapa.get('tabla') else etapa['etapa']
+            historial.setdefault(clave, []).append(etapa['segundos'])
+
+    comparacion = []
+    for etapa in actual or []:
+        clave = f"{etapa['etapa']}:{etapa['tabla']}" if etapa.get('tabla') else etapa['etapa']
+        previos = sorted(historial.get(clave, []))
+        if not previos:
+            comparacion.append({"etapa": clave, "segundos": etapa['segundos'], "mediana_previa": None,
+                                "variacion": None, "regresion": False})
+            continue
+        mitad = len(previos) // 2
+        mediana = previos[mitad] if len(previos) % 2 else (previos[mitad - 1] + previos[mitad]) / 2
+        variacion = etapa['segundos'] / mediana if mediana > 0 else None
+        comparacion.append({
+            "etapa": clave,
+            "segundos": etapa['segundos'],
+            "mediana_previa": round(mediana, 3),
+            "variacion": round(variacion, 2) if variacion is not None else None,
+            "regresion": (
+                variacion is not None and variacion > umbral
+                and etapa['segundos'] - mediana >= delta_minimo
+            )
+        })
+    return comparacion
@@ -4,56 +4,102 @@ Permite ejecutar ETL bajo demanda via endpoint HTTP
 """
 
 import logging
-import pandas as pd
+import threading
 from datetime import datetime
-import asyncio
 from typing import Dict, Any
 
-from etl.connectors.sqlserver_connector import SQLServerConnector
-from etl.connectors.postgres_connector import PostgresConnector
-from etl.transformers.data_transformer import DataTransformer
+# Conectores y transformador (pandas, pyodbc) se importan al ejecutar el ETL,
+# no al arrancar la API
 from config.settings import settings
+from services.dimension_cache import dimension_cache
+from services.etl_metrics import RunMetrics, comparar_con_historial
+from services.etl_state import etl_state
+from services.memory_tracker import memory_tracker
+from services.profiler import sampling_profiler
+from services.response_cache import response_cache
 
 logger = logging.getLogger(__name__)
 
 class ETLService:
     def __init__(self):
-        self.sqlserver = None
         self.postgres = None
-        self.transformer = DataTransformer()
+        self._transformer = None
         self.status = "idle"
         self.last_run = None
         self.last_error = None
+        self.metrics = RunMetrics(top_sitios=settings.MEMORY_TOP_SITIOS)
+        self.checkpoints = None
+        self._checkpoint_store = None
+        # Extracciones simultáneas contra SQL Server (entre todas las unidades)
+        self._fuentes = threading.BoundedSemaphore(max(1, settings.ETL_FUENTES_CONCURRENTES))
     
-    async def run_etl_process(self, use_sample_data: bool = False) -> Dict[str, Any]:
+    @property
+    def transformer(self):
+        if self._transformer is None:
+            from etl.transformers.data_transformer import DataTransformer
+            self._transformer = DataTransformer(
+                dedup_claves=settings.etl_dedup_claves,
+                dedup_version=settings.ETL_DEDUP_VERSION,
+                dedup_regla=settings.ETL_DEDUP_REGLA,
+                workers=settings.ETL_TRANSFORM_WORKERS,
+                min_filas_paralelo=settings.ETL_PARALELO_MIN_FILAS,
+                diagnosticos_k=settings.ETL_DIAGNOSTICOS_K
+            )
+        return self._transformer
+    
+    async def run_etl_process(self, use_sample_data: bool = False, unidades=None, tareas=None,
+                              reanudar: bool = True) -> Dict[str, Any]:
         """
         Ejecuta el proceso ETL completo
         Args:
             use_sample_data: Si True, genera datos de ejemplo en lugar de extraer de SQL Server
+            unidades: Unidades a procesar (por defecto todas las configuradas); las demás no se tocan
+            tareas: Patrones de tareas a re-ejecutar (ej. ["load_stats_*"]); se agregan las que necesitan
+            reanudar: Si la última ejecución falló, retomar sus checkpoints en vez de re-extraer
         """
+        from starlette.concurrency import run_in_threadpool
+        
+        data_source = "sample_data" if use_sample_data else "sql_server"
+        unidades = sorted(set(unidades or settings.unidades))
+        
+        # El grafo se arma antes del lock: una selección de tareas inválida no llega a ejecutarse
+        dag = self._construir_dag(use_sample_data, unidades)
+        dag.validar()
+        dag.seleccionar(tareas)
+        
+        # Solo un worker puede ejecutar el ETL a la vez. Las idas a PostgreSQL
+        # y al disco de este método corren en el threadpool: el event loop sigue
+        # atendiendo requests (admisión, SSE) mientras tanto
+        lock = await run_in_threadpool(etl_state.acquire_lock)
+        if lock is None:
+            logger.info("ETL en ejecución en otro worker, se omite la solicitud")
+            return {
+                "status": "busy",
+                "message": "ETL process is already running. Please wait for it to complete.",
+                "timestamp": datetime.now().isoformat()
+            }
+        
         self.status = "running"
+        self.metrics = RunMetrics(top_sitios=settings.MEMORY_TOP_SITIOS)
         start_time = datetime.now()
+        run_id = None
+        # Perfil por muestreo de esta ejecución si se pidió en /debug/profile/etl
+        perfil = sampling_profiler.iniciar_etl()
         
         try:
-            logger.info("=== Iniciando proceso ETL bajo demanda ===")
+            run_id = await run_in_threadpool(etl_state.start_run, data_source, unidades)
+            logger.info(f"=== Iniciando proceso ETL bajo demanda (run {run_id}, unidades {unidades}) ===")
             
             # Inicializar conectores
+            from etl.connectors.postgres_connector import PostgresConnector
             self.postgres = PostgresConnector()
+            self.checkpoints = await run_in_threadpool(self._iniciar_checkpoints, run_id, data_source, reanudar)
             
-            # 1. Crear tablas si no existen
-            logger.info("Verificando/creando tablas en PostgreSQL...")
-            tables_created = self.postgres.create_tables()
-            if not tables_created:
-                raise Exception("No se pudieron crear las tablas en PostgreSQL")
-            
-            if use_sample_data:
-                # Usar generador de datos de ejemplo
-                logger.info("Generando datos de ejemplo médicos...")
-                result = await self._generate_sample_data()
-            else:
-                # Extraer de SQL Server real
-                logger.info("Extrayendo datos de SQL Server fibidesen1...")
-                result = await self._extract_from_sqlserver()
+            # Tareas independientes en paralelo; el event loop queda libre mientras tanto
+            fallidas = await run_in_threadpool(dag.ejecutar, tareas)
+            result = self._resultado(dag, unidades)
+            if fallidas:
+                raise Exception(f"Tareas fallidas: {', '.join(fallidas)}")
             
             # Actualizar estado
             self.status = "completed"
@@ -61,14 +107,25 @@ class ETLService:
             self.last_error = None
             
             execution_time = (datetime.now() - start_time).total_seconds()
+            await run_in_threadpool(etl_state.finish_run, run_id, "completed", execution_time, statistics=result,
+                                    etapas=self.metrics.to_list(), tareas=dag.to_list())
+            checkpoints = await run_in_threadpool(self._cerrar_checkpoints, "completed")
+            
+            # Nueva versión de datos de estas unidades: sus respuestas precomprimidas quedan obsoletas
+            response_cache.publicar(run_id, unidades)
             
             return {
                 "status": "success",
                 "message": "ETL ejecutado exitosamente",
+                "run_id": run_id,
+                "unidades": unidades,
                 "execution_time_seconds": round(execution_time, 2),
                 "timestamp": self.last_run.isoformat(),
-                "data_source": "sample_data" if use_sample_data else "sql_server",
-                "statistics": result
+                "data_source": data_source,
+                "statistics": result,
+                "etapas": self.metrics.to_list(),
+                "tareas": dag.to_list(),
+                "checkpoints": checkpoints
             }
             
         except Exception as e:
@@ -77,102 +134,417 @@ class ETLService:
             execution_time = (datetime.now() - start_time).total_seconds()
             
             logger.error(f"Error en proceso ETL: {e}")
+            # Los checkpoints quedan para que la próxima ejecución retome desde aquí
+            checkpoints = await run_in_threadpool(self._cerrar_checkpoints, "error")
+            if run_id is not None:
+                try:
+                    await run_in_threadpool(etl_state.finish_run, run_id, "error", execution_time, error=str(e),
+                                            etapas=self.metrics.to_list(), tareas=dag.to_list())
+                except Exception as state_error:
+                    logger.error(f"Error registrando fallo del ETL: {state_error}")
             
             return {
                 "status": "error",
                 "message": f"Error ejecutando ETL: {str(e)}",
+                "run_id": run_id,
                 "execution_time_seconds": round(execution_time, 2),
                 "timestamp": datetime.now().isoformat(),
-                "error": str(e)
+                "error": str(e),
+                "tareas": dag.to_list(),
+                "checkpoints": checkpoints
             }
         
         finally:
+            sampling_profiler.finalizar_etl(perfil, run_id)
+            # Memoria por etapa de la última ejecución, también en /debug/memory
+            memory_tracker.registrar_etl(run_id, self.metrics.to_list())
             # Limpiar conexiones
             if self.postgres:
-                self.postgres.close()
-            if self.sqlserver:
-                self.sqlserver.close()
+                await run_in_threadpool(self.postgres.close)
+            await run_in_threadpool(etl_state.release_lock, lock)
+    
+    def _construir_dag(self, use_sample_data, unidades):
+        """
+        Grafo de tareas de una ejecución. Por unidad: obtener desenlaces y las
+        tres estadísticas, codificar, cargar, construir y cargar sketches.
+        Cada tarea de carga solo espera lo que lee, no a las demás tablas
+        """
+        from etl.dag import DAG, DAGError
+        
+        dag = DAG(
+            workers=settings.ETL_DAG_WORKERS,
+            reintentos=settings.ETL_TAREA_REINTENTOS,
+            espera_reintento=settings.ETL_TAREA_ESPERA
+        )
+        dag.tarea("create_tables", lambda entradas: self._create_tables())
+        
+        fuentes = settings.fuentes_sqlserver
+        sin_fuente = [unidad_id for unidad_id in unidades if unidad_id not in fuentes]
+        if not use_sample_data and sin_fuente:
+            # Error de la solicitud (como una selección de tareas inválida), no del ETL
+            raise DAGError(f"Unidades sin fuente SQL Server configurada: {sin_fuente}")
+        
+        for unidad_id in unidades:
+            if use_sample_data:
+                origenes = self._tareas_ejemplo(dag, unidad_id)
+            else:
+                origenes = self._tareas_sqlserver(dag, unidad_id, fuentes[unidad_id])
+            self._tareas_carga(dag, unidad_id, origenes)
+        
+        # Refrescar la caché de dimensiones de la API con las claves recién cargadas
+        dag.tarea(
+            "refresh_dimension_cache",
+            lambda entradas: self._refresh_dimension_cache(),
+            depende_de=[f"load_desenlaces/u{unidad_id}" for unidad_id in unidades]
+        )
+        return dag
     
-    async def _generate_sample_data(self) -> Dict[str, Any]:
-        """Genera datos de ejemplo médicos"""
+    def _tareas_ejemplo(self, dag, unidad_id):
+        """Tareas que generan los datos de ejemplo de una unidad; retorna {conjunto: tarea}"""
+        from etl.create_sample_data import SampleDataGenerator
+        
+        generator = SampleDataGenerator()
+        u = f"u{unidad_id}"
+        desenlaces = self._tarea_checkpoint(
+            dag, f"generate_desenlaces/{u}",
+            lambda entradas: self._extract(self._tabla('desenlaces', unidad_id),
+                                           lambda: generator.generate_desenlaces_data(150))
+        )
+        origenes = {'desenlaces': desenlaces}
+        for conjunto, generar in (
+            ('stats_aseguradora', generator.generate_stats_aseguradora),
+            ('stats_mensual', generator.generate_stats_mensual),
+            ('stats_edad_sexo', generator.generate_stats_edad_sexo),
+        ):
+            origenes[conjunto] = self._tarea_checkpoint(
+                dag, f"generate_{conjunto}/{u}",
+                # El generador agrega columnas a su entrada: cada tarea trabaja sobre una copia
+                lambda entradas, conjunto=conjunto, generar=generar: self._extract(
+                    self._tabla(conjunto, unidad_id), lambda: generar(entradas[desenlaces].copy())
+                ),
+                depende_de=[desenlaces]
+            )
+        return origenes
+    
+    def _tareas_sqlserver(self, dag, unidad_id, connection_string):
+        """Tareas que extraen de SQL Server los datos de una unidad, cada una con su conexión"""
+        u = f"u{unidad_id}"
+        origenes = {}
+        if settings.ETL_CHUNK_SIZE > 0:
+            # Extracción, limpieza y deduplicación por chunks en una sola tarea
+            origenes['desenlaces'] = self._tarea_checkpoint(
+                dag, f"extract_desenlaces/{u}",
+                lambda entradas: self._con_sqlserver(
+                    unidad_id, connection_string,
+                    lambda sqlserver: self._extract_desenlaces_chunks(sqlserver, settings.ETL_CHUNK_SIZE)
+                )
+            )
+        else:
+            # Con los desenlaces limpios en checkpoint no hace falta releer los crudos
+            extraccion = self._tarea_checkpoint(
+                dag, f"extract_desenlaces/{u}",
+                lambda entradas: self._con_sqlserver(
+                    unidad_id, connection_string,
+                    lambda sqlserver: self._extract(self._tabla('desenlaces', unidad_id), sqlserver.get_desenlaces_data)
+                ),
+                cubierta_por=f"clean_desenlaces/{u}"
+            )
+            origenes['desenlaces'] = self._tarea_checkpoint(
+                dag, f"clean_desenlaces/{u}",
+                lambda entradas: self._clean_desenlaces(entradas[extraccion], unidad_id),
+                depende_de=[extraccion]
+            )
+        for conjunto, metodo in (
+            ('stats_aseguradora', 'get_estadisticas_por_aseguradora'),
+            ('stats_mensual', 'get_estadisticas_por_mes'),
+            ('stats_edad_sexo', 'get_estadisticas_por_edad_sexo'),
+        ):
+            origenes[conjunto] = self._tarea_checkpoint(
+                dag, f"extract_{conjunto}/{u}",
+                lambda entradas, conjunto=conjunto, metodo=metodo: self._con_sqlserver(
+                    unidad_id, connection_string,
+                    lambda sqlserver: self._extract(self._tabla(conjunto, unidad_id), getattr(sqlserver, metodo))
+                )
+            )
+        return origenes
+    
+    def _tareas_carga(self, dag, unidad_id, origenes):
+        """Tareas de carga de una unidad a partir de las tareas que producen cada conjunto"""
+        u = f"u{unidad_id}"
+        codificar = dag.tarea(
+            f"encode_desenlaces/{u}",
+            lambda entradas: self._encode_desenlaces(entradas[origenes['desenlaces']], unidad_id),
+            depende_de=[origenes['desenlaces'], "create_tables"]
+        )
+        carga = dag.tarea(
+            f"load_desenlaces/{u}",
+            lambda entradas: self._load_desenlaces(entradas[codificar], unidad_id),
+            depende_de=[codificar]
+        )
+        for tabla, metodo in (
+            ('dashboard_sketch_estancia', 'build_estancia_sketches'),
+            ('dashboard_sketch_pacientes', 'build_pacientes_sketches'),
+            ('dashboard_sketch_diagnosticos', 'build_diagnosticos_sketches'),
+        ):
+            sketch = dag.tarea(
+                f"build_{tabla.replace('dashboard_', '')}/{u}",
+                lambda entradas, tabla=tabla, metodo=metodo: self._build_sketches(
+                    entradas[codificar], tabla, metodo, unidad_id
+                ),
+                depende_de=[codificar]
+            )
+            # Los sketches se reemplazan solo si los desenlaces de los que salen quedaron cargados
+            dag.tarea(
+                f"load_{tabla.replace('dashboard_', '')}/{u}",
+                lambda entradas, tabla=tabla, sketch=sketch: self._load_tarea(entradas[sketch], tabla, unidad_id),
+                depende_de=[sketch, carga]
+            )
+        for conjunto in ('stats_aseguradora', 'stats_mensual', 'stats_edad_sexo'):
+            dag.tarea(
+                f"load_{conjunto}/{u}",
+                lambda entradas, conjunto=conjunto: self._load_tarea(
+                    entradas[origenes[conjunto]], f"dashboard_{conjunto}", unidad_id
+                ),
+                depende_de=[origenes[conjunto], "create_tables"]
+            )
+    
+    def _tarea_checkpoint(self, dag, nombre, funcion, depende_de=(), cubierta_por=None):
+        """
+        Registra una tarea cuyo DataFrame se guarda como checkpoint y se retoma
+        si la ejecución anterior falló; cubierta_por: tarea siguiente cuyo
+        checkpoint hace innecesario este resultado
+        """
+        def tarea(entradas):
+            checkpoints = self.checkpoints
+            if checkpoints is None:
+                return funcion(entradas)
+            if cubierta_por and checkpoints.existe(cubierta_por):
+                return None
+            df = checkpoints.leer(nombre)
+            if df is not None:
+                return df
+            df = funcion(entradas)
+            with self.metrics.etapa("checkpoint", tabla=nombre, filas_entrada=len(df)) as etapa:
+                etapa.filas_salida = len(df) if checkpoints.guardar(nombre, df) else 0
+            return df
+        return dag.tarea(nombre, tarea, depende_de)
+    
+    def _iniciar_checkpoints(self, run_id, data_source, reanudar):
+        """Checkpoints de la ejecución (None si están desactivados o falta pyarrow)"""
+        from etl import checkpoints
+        
+        if not settings.ETL_CHECKPOINTS or not checkpoints.disponible():
+            return None
         try:
-            # Importar el generador de datos de ejemplo
-            from etl.create_sample_data import SampleDataGenerator
-            
-            generator = SampleDataGenerator()
-            
-            # Generar datos
-            desenlaces_df = generator.generate_desenlaces_data(150)
-            stats_aseg = generator.generate_stats_aseguradora(desenlaces_df)
-            stats_mensual = generator.generate_stats_mensual(desenlaces_df)
-            stats_demo = generator.generate_stats_demografia(desenlaces_df)
-            
-            # Cargar en base de datos
-            success1 = self.postgres.load_data(desenlaces_df, 'dashboard_desenlaces')
-            success2 = self.postgres.load_data(stats_aseg, 'dashboard_stats_aseguradora')
-            success3 = self.postgres.load_data(stats_mensual, 'dashboard_stats_mensual')
-            success4 = self.postgres.load_data(stats_demo, 'dashboard_stats_demografia')
-            
-            if not all([success1, success2, success3, success4]):
-                raise Exception("Error cargando algunos conjuntos de datos")
-            
-            return {
-                "desenlaces_count": len(desenlaces_df),
-                "aseguradoras_count": len(stats_aseg),
-                "meses_count": len(stats_mensual),
-                "grupos_demograficos_count": len(stats_demo)
-            }
-            
+            return self.checkpoint_store.iniciar(
+                run_id, data_source, settings.ETL_CHECKPOINT_REANUDAR_HORAS if reanudar else 0
+            )
         except Exception as e:
-            logger.error(f"Error generando datos de ejemplo: {e}")
-            raise
+            logger.error(f"Error preparando checkpoints del ETL, se ejecuta sin ellos: {e}")
+            return None
+    
+    @property
+    def checkpoint_store(self):
+        if self._checkpoint_store is None:
+            from etl.checkpoints import CheckpointStore
+            self._checkpoint_store = CheckpointStore(
+                settings.ETL_CHECKPOINT_DIR,
+                max_horas=settings.ETL_CHECKPOINT_MAX_HORAS,
+                max_mb=settings.ETL_CHECKPOINT_MAX_MB
+            )
+        return self._checkpoint_store
     
-    async def _extract_from_sqlserver(self) -> Dict[str, Any]:
-        """Extrae datos reales de SQL Server"""
+    def _cerrar_checkpoints(self, estado):
+        """Marca el estado final de los checkpoints de la ejecución, borra los vencidos y retorna su resumen"""
+        checkpoints, self.checkpoints = self.checkpoints, None
+        if checkpoints is None:
+            return None
         try:
-            self.sqlserver = SQLServerConnector()
-            
-            if not self.sqlserver.connect():
-                raise Exception("No se pudo conectar a SQL Server")
-            
-            # Extraer datos
-            desenlaces_df = self.sqlserver.get_desenlaces_data()
-            stats_aseg_df = self.sqlserver.get_estadisticas_por_aseguradora()
-            stats_mensual_df = self.sqlserver.get_estadisticas_por_mes()
-            stats_demo_df = self.sqlserver.get_estadisticas_por_edad_sexo()
-            
-            # Transformar datos
-            if not desenlaces_df.empty:
-                desenlaces_cleaned = self.transformer.clean_desenlaces_data(desenlaces_df)
-            else:
-                desenlaces_cleaned = pd.DataFrame()
-            
-            # Cargar en PostgreSQL
-            if not desenlaces_cleaned.empty:
-                self.postgres.load_data(desenlaces_cleaned, 'dashboard_desenlaces')
-            
-            if not stats_aseg_df.empty:
-                self.postgres.load_data(stats_aseg_df, 'dashboard_stats_aseguradora')
-            
-            if not stats_mensual_df.empty:
-                self.postgres.load_data(stats_mensual_df, 'dashboard_stats_mensual')
-            
-            if not stats_demo_df.empty:
-                self.postgres.load_data(stats_demo_df, 'dashboard_stats_demografia')
-            
-            return {
-                "desenlaces_count": len(desenlaces_cleaned),
-                "aseguradoras_count": len(stats_aseg_df),
-                "meses_count": len(stats_mensual_df),
-                "grupos_demograficos_count": len(stats_demo_df)
-            }
-            
+            checkpoints.finalizar(estado)
+            self.checkpoint_store.gc(conservar=checkpoints.run_id)
         except Exception as e:
-            logger.error(f"Error extrayendo de SQL Server: {e}")
-            raise
+            logger.error(f"Error cerrando checkpoints del ETL: {e}")
+        return checkpoints.get_status()
+    
+    def _create_tables(self):
+        logger.info("Verificando/creando tablas en PostgreSQL...")
+        with self.metrics.etapa("create_tables"):
+            tables_created = self.postgres.create_tables()
+        if not tables_created:
+            raise Exception("No se pudieron crear las tablas en PostgreSQL")
+    
+    def _refresh_dimension_cache(self):
+        with self.metrics.etapa("refresh_dimension_cache"):
+            dimension_cache.refresh(self.postgres.engine)
+    
+    def _con_sqlserver(self, unidad_id, connection_string, extraer):
+        """Ejecuta una extracción con una conexión propia al SQL Server de la unidad"""
+        from etl.connectors.sqlserver_connector import SQLServerConnector
+        
+        # Como mucho ETL_FUENTES_CONCURRENTES extracciones contra SQL Server a la vez
+        with self._fuentes:
+            sqlserver = SQLServerConnector(connection_string, unidad_id)
+            if not sqlserver.connect():
+                raise Exception(f"No se pudo conectar a SQL Server (unidad {unidad_id})")
+            try:
+                return extraer(sqlserver)
+            finally:
+                sqlserver.close()
+    
+    def _clean_desenlaces(self, desenlaces_df, unidad_id):
+        """Limpia y deduplica los desenlaces extraídos de una unidad"""
+        import pandas as pd
+        
+        if desenlaces_df.empty:
+            return pd.DataFrame()
+        with self.metrics.etapa("clean_desenlaces_data", tabla=self._tabla('desenlaces', unidad_id),
+                                filas_entrada=len(desenlaces_df)) as etapa:
+            desenlaces_cleaned = self.transformer.clean_desenlaces_data(desenlaces_df)
+            etapa.filas_salida = len(desenlaces_cleaned)
+        return desenlaces_cleaned
+    
+    def _extract_desenlaces_chunks(self, sqlserver, chunksize):
+        """Extrae, limpia y deduplica desenlaces por chunks sin materializar el origen completo"""
+        import pandas as pd
+        
+        dedup = self.transformer.nuevo_deduplicador()
+        with self.metrics.etapa("extract_clean_chunks", tabla=self._tabla('desenlaces', sqlserver.unidad_id)) as etapa:
+            chunks = sqlserver.get_desenlaces_data(chunksize=chunksize)
+            if isinstance(chunks, pd.DataFrame):
+                # extract_data retorna un DataFrame vacío si falla la consulta
+                chunks = [chunks]
+            limpios = list(self.transformer.clean_desenlaces_stream(chunks, dedup))
+            desenlaces = dedup.finales(pd.concat(limpios, ignore_index=True)) if limpios else pd.DataFrame()
+            etapa.filas_entrada = dedup.filas_leidas
+            etapa.filas_salida = len(desenlaces)
+        
+        estado = dedup.get_status()
+        logger.info(
+            f"Desenlaces por chunks (unidad {sqlserver.unidad_id}): {estado['filas_leidas']} leídos, "
+            f"{estado['descartadas']} duplicados descartados, "
+            f"{estado['reemplazadas']} reemplazados por versiones posteriores"
+        )
+        return desenlaces
+    
+    def _resultado(self, dag, unidades):
+        """Totales de la ejecución más el detalle por unidad (filas cargadas de cada conjunto)"""
+        conjuntos = {
+            "desenlaces_count": "desenlaces",
+            "aseguradoras_count": "stats_aseguradora",
+            "meses_count": "stats_mensual",
+            "grupos_demograficos_count": "stats_edad_sexo"
+        }
+        por_unidad = {
+            unidad_id: {
+                clave: dag.resultado(f"load_{conjunto}/u{unidad_id}") or 0
+                for clave, conjunto in conjuntos.items()
+            }
+            for unidad_id in unidades
+        }
+        totales = {
+            clave: sum(conteos[clave] for conteos in por_unidad.values())
+            for clave in conjuntos
+        }
+        return {**totales, "unidades": {str(unidad_id): conteos for unidad_id, conteos in por_unidad.items()}}
+    
+    def _tabla(self, nombre, unidad_id):
+        """Nombre de tabla/origen para las métricas por etapa de una unidad"""
+        return f"{nombre}/u{unidad_id}"
+    
+    def _extract(self, origen, extraer):
+        """Ejecuta una extracción midiendo tiempo, filas y memoria"""
+        with self.metrics.etapa("extract", tabla=origen) as etapa:
+            df = extraer()
+            etapa.filas_salida = len(df)
+        return df
+    
+    def _load(self, df, table_name, unidad_id) -> bool:
+        """Carga una tabla de una unidad midiendo tiempo, filas y memoria"""
+        with self.metrics.etapa("load", tabla=self._tabla(table_name, unidad_id), filas_entrada=len(df)) as etapa:
+            success = self.postgres.load_data(df, table_name, unidad_id=unidad_id)
+            etapa.filas_salida = len(df) if success else 0
+            if not success:
+                etapa.estado = "error"
+        return success
+    
+    def _load_tarea(self, df, table_name, unidad_id):
+        """Carga de una tarea: un conjunto vacío no reemplaza lo ya cargado; un fallo se reintenta"""
+        if df is None or df.empty:
+            return 0
+        if not self._load(df, table_name, unidad_id):
+            raise Exception(f"Error cargando {table_name} (unidad {unidad_id})")
+        return len(df)
+    
+    def _encode_desenlaces(self, desenlaces_df, unidad_id):
+        """Reemplaza los textos de dimensión por sus claves"""
+        if desenlaces_df.empty:
+            return desenlaces_df
+        with self.metrics.etapa("encode_dimensions", tabla=self._tabla('desenlaces', unidad_id),
+                                filas_entrada=len(desenlaces_df)) as etapa:
+            encoded_df = self.postgres.encode_dimensions(desenlaces_df)
+            etapa.filas_salida = len(encoded_df)
+        return encoded_df
+    
+    def _load_desenlaces(self, encoded_df, unidad_id):
+        """Carga los desenlaces codificados en la partición de la unidad"""
+        if encoded_df.empty:
+            return 0
+        self.postgres.ensure_unidad(unidad_id)
+        return self._load_tarea(encoded_df, 'dashboard_desenlaces', unidad_id)
+    
+    def _build_sketches(self, encoded_df, table_name, metodo, unidad_id):
+        """Resúmenes precalculados por día y segmento a partir de los desenlaces codificados"""
+        if encoded_df.empty:
+            return encoded_df
+        with self.metrics.etapa("build_sketches", tabla=self._tabla(table_name, unidad_id),
+                                filas_entrada=len(encoded_df)) as etapa:
+            sketches_df = getattr(self.transformer, metodo)(encoded_df)
+            etapa.filas_salida = len(sketches_df)
+        return sketches_df
+    
+    def get_dag(self, use_sample_data: bool = False, unidades=None):
+        """Tareas del ETL y sus dependencias, sin ejecutarlas"""
+        dag = self._construir_dag(use_sample_data, sorted(set(unidades or settings.unidades)))
+        return [{"tarea": tarea.nombre, "depende_de": tarea.depende_de} for tarea in dag.tareas.values()]
+    
+    def get_runs(self, limit: int = 20, umbral: float = 1.5) -> Dict[str, Any]:
+        """Historial de ejecuciones con tendencias por etapa y regresiones de la última"""
+        runs = etl_state.get_runs(limit)
+        completadas = [run for run in runs if run['estado'] == 'completed' and run['etapas']]
+        
+        # Serie de tiempos por etapa, de la más antigua a la más reciente
+        tendencias = {}
+        for run in reversed(completadas):
+            for etapa in run['etapas']:
+                clave = f"{etapa['etapa']}:{etapa['tabla']}" if etapa.get('tabla') else etapa['etapa']
+                tendencias.setdefault(clave, []).append({
+                    "run_id": run['id'],
+                    "segundos": etapa['segundos'],
+                    "filas_por_segundo": etapa['filas_por_segundo'],
+                    "memoria_pico_mb": etapa['memoria_pico_mb']
+                })
+        
+        regresiones = []
+        if completadas:
+            ultima, anteriores = completadas[0], completadas[1:]
+            regresiones = comparar_con_historial(
+                ultima['etapas'], [run['etapas'] for run in anteriores], umbral=umbral
+            )
+        
+        return {
+            "runs": runs,
+            "tendencias": tendencias,
+            "comparacion_ultima": regresiones,
+            "regresiones": [c['etapa'] for c in regresiones if c['regresion']]
+        }
     
     def get_status(self) -> Dict[str, Any]:
-        """Obtiene el estado actual del ETL"""
+        """Obtiene el estado del ETL compartido por todos los workers"""
+        try:
+            return etl_state.get_status()
+        except Exception as e:
+            # Sin acceso a PostgreSQL solo se conoce el estado de este worker
+            logger.error(f"Error leyendo estado del ETL desde PostgreSQL: {e}")
         return {
             "status": self.status,
             "last_run": self.last_run.isoformat() if self.last_run else None,
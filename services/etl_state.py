@@ -0,0 +1,234 @@
+"""
+Estado compartido del ETL en PostgreSQL
+Un advisory lock garantiza una sola ejecución a la vez entre workers y la
+tabla etl_runs guarda estado, tiempos y errores de cada ejecución
+"""
+
+import json
+import logging
+import os
+import socket
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Clave del advisory lock de sesión que serializa las ejecuciones del ETL
+ETL_LOCK_ID = 740_215_001
+
+class ETLStateStore:
+    def __init__(self, engine_provider):
+        # engine_provider: callable que retorna el engine del primario (creado en el primer uso)
+        self._engine_provider = engine_provider
+        self._table_ready = False
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+
+    @property
+    def engine(self):
+        return self._engine_provider()
+
+    def ensure_table(self):
+        if self._table_ready:
+            return
+        from sqlalchemy import text
+
+        with self.engine.connect() as connection:
+            connection.execute(text("""
+                CREATE TABLE IF NOT EXISTS etl_runs (
+                    id SERIAL PRIMARY KEY,
+                    estado VARCHAR(20) NOT NULL,
+                    data_source VARCHAR(50),
+                    worker VARCHAR(200),
+                    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    finished_at TIMESTAMP,
+                    execution_time_seconds DECIMAL(10,2),
+                    statistics JSONB,
+                    etapas JSONB,
+                    error TEXT
+                )
+            """))
+            connection.execute(text("ALTER TABLE etl_runs ADD COLUMN IF NOT EXISTS etapas JSONB"))
+            connection.execute(text("ALTER TABLE etl_runs ADD COLUMN IF NOT EXISTS unidades SMALLINT[]"))
+            connection.execute(text("ALTER TABLE etl_runs ADD COLUMN IF NOT EXISTS tareas JSONB"))
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_etl_runs_started_at ON etl_runs (started_at DESC)"
+            ))
+            connection.commit()
+        self._table_ready = True
+
+    def acquire_lock(self):
+        """Intenta tomar el lock del ETL; retorna la conexión que lo mantiene o None si está ocupado"""
+        from sqlalchemy import text
+
+        connection = self.engine.connect()
+        try:
+            acquired = connection.execute(text("SELECT pg_try_advisory_lock(:lock_id)"), {'lock_id': ETL_LOCK_ID}).scalar()
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+
+        if not acquired:
+            connection.close()
+            return None
+        return connection
+
+    def release_lock(self, connection):
+        """Libera el lock (también se libera solo si la conexión se pierde)"""
+        from sqlalchemy import text
+
+        try:
+            connection.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {'lock_id': ETL_LOCK_ID})
+            connection.commit()
+        except Exception as e:
+            logger.error(f"Error liberando lock del ETL: {e}")
+        finally:
+            connection.close()
+
+    def is_locked(self):
+        """Indica si algún worker tiene el lock del ETL en este momento"""
+        from sqlalchemy import text
+
+        with self.engine.connect() as connection:
+            return bool(connection.execute(text("""
+                SELECT EXISTS (
+                    SELECT 1 FROM pg_locks
+                    WHERE locktype = 'advisory' AND granted
+                      AND ((classid::bigint << 32) | objid::bigint) = :lock_id
+                )
+            """), {'lock_id': ETL_LOCK_ID}).scalar())
+
+    def start_run(self, data_source, unidades=None):
+        """Registra el inicio de una ejecución; debe llamarse con el lock tomado"""
+        from sqlalchemy import text
+
+        self.ensure_table()
+        with self.engine.connect() as connection:
+            # Ejecuciones que quedaron 'running' pertenecen a un worker que murió sin liberar el lock
+            connection.execute(text("""
+                UPDATE etl_runs
+                SET estado = 'error', finished_at = CURRENT_TIMESTAMP,
+                    error = 'Ejecución interrumpida (worker terminado)'
+                WHERE estado = 'running'
+            """))
+            run_id = connection.execute(text("""
+                INSERT INTO etl_runs (estado, data_source, worker, started_at, unidades)
+                VALUES ('running', :data_source, :worker, :started_at, :unidades)
+                RETURNING id
+            """), {
+                'data_source': data_source,
+                'worker': self.worker,
+                'started_at': datetime.now(),
+                'unidades': list(unidades) if unidades else None
+            }).scalar()
+            connection.commit()
+        return run_id
+
+    def finish_run(self, run_id, estado, execution_time, statistics=None, error=None, etapas=None, tareas=None):
+        """Cierra una ejecución; si se completó, publica su versión de datos (NOTIFY)"""
+        from sqlalchemy import text
+        from config.settings import settings
+
+        with self.engine.connect() as connection:
+            connection.execute(text("""
+                UPDATE etl_runs
+                SET estado = :estado, finished_at = :finished_at,
+                    execution_time_seconds = :execution_time,
+                    statistics = :statistics, etapas = :etapas, tareas = :tareas, error = :error
+                WHERE id = :run_id
+            """), {
+                'run_id': run_id,
+                'estado': estado,
+                'finished_at': datetime.now(),
+                'execution_time': round(execution_time, 2),
+                'statistics': json.dumps(statistics) if statistics is not None else None,
+                'etapas': json.dumps(etapas) if etapas is not None else None,
+                'tareas': json.dumps(tareas) if tareas is not None else None,
+                'error': error
+            })
+            if estado == "completed":
+                # Nueva versión de datos para todos los workers; PostgreSQL entrega el
+                # NOTIFY recién al confirmar, junto con el registro de la ejecución
+                connection.execute(text("""
+                    SELECT pg_notify(:canal, json_build_object(
+                        'run_id', id, 'unidades', unidades, 'worker', worker
+                    )::text)
+                    FROM etl_runs WHERE id = :run_id
+                """), {'canal': settings.DATA_NOTIFY_CANAL, 'run_id': run_id})
+            connection.commit()
+
+    def get_runs(self, limit=20):
+        """Historial de ejecuciones, la más reciente primero"""
+        from sqlalchemy import text
+
+        self.ensure_table()
+        with self.engine.connect() as connection:
+            rows = connection.execute(text("""
+                SELECT id, estado, data_source, worker, unidades, started_at, finished_at,
+                       execution_time_seconds, statistics, etapas, tareas, error
+                FROM etl_runs ORDER BY started_at DESC LIMIT :limit
+            """), {'limit': limit}).mappings().all()
+
+        runs = []
+        for row in rows:
+            run = dict(row)
+            run['started_at'] = run['started_at'].isoformat() if run['started_at'] else None
+            run['finished_at'] = run['finished_at'].isoformat() if run['finished_at'] else None
+            if run['execution_time_seconds'] is not None:
+                run['execution_time_seconds'] = float(run['execution_time_seconds'])
+            runs.append(run)
+        return runs
+
+    def get_data_versions(self):
+        """
+        Versión de datos por unidad (última ejecución completada que la
+        incluyó) y la global bajo la clave None
+        """
+        from sqlalchemy import text
+        from config.settings import settings
+
+        self.ensure_table()
+        with self.engine.connect() as connection:
+            rows = connection.execute(text("""
+                SELECT unidad_id, MAX(id)
+                FROM etl_runs, unnest(COALESCE(unidades, ARRAY[CAST(:defecto AS SMALLINT)])) AS unidad_id
+                WHERE estado = 'completed'
+                GROUP BY unidad_id
+            """), {'defecto': settings.UNIDAD_DEFECTO}).fetchall()
+
+        versiones = {int(unidad_id): version for unidad_id, version in rows}
+        versiones[None] = max(versiones.values(), default=0)
+        return versiones
+
+    def get_status(self):
+        """Estado del ETL visto por cualquier worker"""
+        from sqlalchemy import text
+
+        self.ensure_table()
+        with self.engine.connect() as connection:
+            last = connection.execute(text("""
+                SELECT estado, started_at, finished_at, error
+                FROM etl_runs ORDER BY started_at DESC LIMIT 1
+            """)).mappings().first()
+            last_success = connection.execute(text("""
+                SELECT finished_at FROM etl_runs
+                WHERE estado = 'completed' ORDER BY finished_at DESC LIMIT 1
+            """)).scalar()
+
+        is_running = self.is_locked()
+        if last is None:
+            estado = "running" if is_running else "idle"
+        else:
+            estado = "running" if is_running else last['estado']
+        return {
+            "status": estado,
+            "last_run": last_success.isoformat() if last_success else None,
+            "last_error": last['error'] if last and estado == 'error' else None,
+            "is_running": is_running
+        }
+
+def _primary_engine():
+    from services.database import db_service
+    return db_service.engine
+
+# Instancia global del estado compartido del ETL
+etl_state = ETLStateStore(_primary_engine)
@@ -0,0 +1,152 @@
+"""
+Exportación de desenlaces en Parquet y Arrow IPC
+Lee con un cursor del lado del servidor y escribe record batches a medida
+que llegan, así la memoria queda acotada al tamaño de un lote
+"""
+
+import logging
+import uuid
+
+from etl.dimensions import COLUMNAS_DESENLACE, desenlaces_select_sql
+from services.database import db_service
+from services.query_control import ConsultaCancelada, consulta_controlada
+from services.replica_router import replica_router
+
+logger = logging.getLogger(__name__)
+
+FILAS_POR_LOTE = 50_000
+
+# Tipos Arrow de las columnas de desenlace (el resto se exporta como texto)
+TIPOS_ARROW = {
+    'id': 'int32',
+    'unidad_id': 'int32',
+    'desenlaceq_id': 'int32',
+    'numero_episodio': 'int32',
+    'fecha_ingreso': 'date32',
+    'fecha_egreso': 'date32',
+    'dias_estancia': 'int32',
+    'edad': 'int32',
+    'fecha_procesamiento': 'timestamp',
+}
+
+FORMATOS = {
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+def arrow_schema(columnas=None):
+    import pyarrow as pa
+
+    tipos = {
+        'int32': pa.int32(),
+        'date32': pa.date32(),
+        'timestamp': pa.timestamp('us'),
+    }
+    return pa.schema([
+        pa.field(columna, tipos.get(TIPOS_ARROW.get(columna), pa.string()))
+        for columna in columnas or COLUMNAS_DESENLACE
+    ])
+
+class _Buffer:
+    """Destino de escritura que acumula bytes hasta que el generador los entrega"""
+
+    def __init__(self):
+        self.partes = []
+        self.closed = False
+
+    def write(self, data):
+        self.partes.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.partes)
+        self.partes = []
+        return data
+
+class ExportService:
+    def export_query(self, filtros=None, columnas=None):
+        """SELECT de desenlaces (sin LIMIT) con los filtros estándar; columnas=None exporta todas"""
+        condiciones, params = db_service._condiciones_filtro(filtros)
+        query = desenlaces_select_sql(columnas)
+        if condiciones:
+            query += "\nWHERE " + " AND ".join(condiciones)
+        return query + " ORDER BY d.fecha_ingreso DESC", params
+
+    def stream(self, formato, filtros=None, columnas=None, filas_por_lote=FILAS_POR_LOTE):
+        """
+        Generador de bytes del archivo exportado, un record batch por lote de filas.
+        Lee de una réplica si hay una al día; si falla antes de entregar el primer
+        byte se lee del primario, como en db_service.execute_query
+        """
+        query, params = self.export_query(filtros, columnas)
+        engine = db_service.read_engine
+        entregado = False
+        try:
+            for parte in self._stream(engine, formato, query, params, columnas, filas_por_lote):
+                entregado = True
+                yield parte
+        except ConsultaCancelada:
+            raise
+        except Exception as e:
+            # Con bytes ya enviados el archivo quedaría mezclado: solo se reintenta desde cero
+            if entregado or engine is db_service.engine:
+                raise
+            replica_router.mark_failed(engine, e)
+            yield from self._stream(db_service.engine, formato, query, params, columnas, filas_por_lote)
+
+    def _stream(self, engine, formato, query, params, columnas, filas_por_lote):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = arrow_schema(columnas)
+        sink = _Buffer()
+        if formato == 'parquet':
+            writer = pq.ParquetWriter(sink, schema, compression='zstd')
+        else:
+            options = pa.ipc.IpcWriteOptions(compression='zstd')
+            writer = pa.ipc.new_stream(sink, schema, options=options)
+
+        raw = engine.raw_connection()
+        total = 0
+        try:
+            # Cada FETCH del cursor queda sujeto al statement_timeout de la clase export
+            # y se cancela si el cliente corta la descarga
+            with consulta_controlada(raw):
+                # Cursor con nombre = cursor del lado del servidor: PostgreSQL entrega las filas por lotes
+                cursor = raw.cursor(name=f"export_{uuid.uuid4().hex[:12]}")
+                cursor.itersize = filas_por_lote
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(filas_por_lote)
+                    if not rows:
+                        break
+                    columnas = list(zip(*rows))
+                    batch = pa.RecordBatch.from_arrays(
+                        [pa.array(valores, type=campo.type) for valores, campo in zip(columnas, schema)],
+                        schema=schema
+                    )
+                    if formato == 'parquet':
+                        writer.write_batch(batch, row_group_size=filas_por_lote)
+                    else:
+                        writer.write_batch(batch)
+                    total += len(rows)
+                    yield sink.drain()
+                cursor.close()
+            writer.close()
+            yield sink.drain()
+            logger.info(f"Exportación {formato}: {total} registros")
+        except Exception as e:
+            logger.error(f"Error exportando desenlaces en {formato}: {e}")
+            raise
+        finally:
+            raw.rollback()
+            raw.close()
+
+# Instancia global del servicio de exportación
+export_service = ExportService()
@@ -0,0 +1,141 @@
+"""
+Difusión de KPIs por Server-Sent Events
+Un único monitor por worker detecta cambios de versión de datos (nuevo ETL),
+calcula los KPIs una vez por unidad suscrita y los reparte a todos los
+suscriptores de esa unidad. Un NOTIFY de versión lo despierta sin esperar
+al siguiente intervalo
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+
+from starlette.concurrency import run_in_threadpool
+
+from services.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+class _Canal:
+    """Suscriptores y último snapshot de KPIs de una unidad (None = todas)"""
+
+    def __init__(self, unidad_id):
+        self.unidad_id = unidad_id
+        self.suscriptores = set()
+        self.version = None
+        self.kpis = None
+
+    @property
+    def event_id(self):
+        # version = (unidad_id, id de ejecución, fecha)
+        return "-".join(str(v) for v in self.version if v is not None) if self.version else None
+
+class KPIBroadcaster:
+    def __init__(self, intervalo=5.0):
+        self.intervalo = intervalo
+        self._canales = {}
+        self._monitor = None
+        self._loop = None
+        self._despertador = None
+        self.eventos_emitidos = 0
+
+    def canal(self, unidad_id=None):
+        if unidad_id not in self._canales:
+            self._canales[unidad_id] = _Canal(unidad_id)
+        return self._canales[unidad_id]
+
+    def evento(self, canal, cambios=None):
+        """Evento SSE con los KPIs vigentes de un canal"""
+        data = {
+            "version": canal.event_id,
+            "unidad_id": canal.unidad_id,
+            "kpis": canal.kpis,
+            "cambios": cambios if cambios is not None else list(canal.kpis or {}),
+            "timestamp": datetime.now().isoformat()
+        }
+        return f"id: {canal.event_id}\nevent: kpis\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+    async def _actualizar(self, canal):
+        """Recalcula los KPIs si cambió la versión de datos de la unidad; retorna las claves que cambiaron"""
+        from services.database import db_service
+
+        version = await run_in_threadpool(response_cache.current_version, canal.unidad_id)
+        if version is None or version == canal.version:
+            return None
+
+        kpis = await run_in_threadpool(db_service.get_dashboard_summary, canal.unidad_id)
+        anteriores = canal.kpis or {}
+        cambios = [clave for clave, valor in kpis.items() if anteriores.get(clave) != valor]
+        canal.version, canal.kpis = version, kpis
+        return cambios
+
+    def despertar(self):
+        """Adelanta la próxima revisión del monitor; se puede llamar desde cualquier hilo"""
+        loop, despertador = self._loop, self._despertador
+        if loop is not None and despertador is not None:
+            loop.call_soon_threadsafe(despertador.set)
+
+    async def _monitorear(self):
+        self._loop = asyncio.get_event_loop()
+        self._despertador = asyncio.Event()
+        while any(canal.suscriptores for canal in self._canales.values()):
+            for canal in [canal for canal in self._canales.values() if canal.suscriptores]:
+                try:
+                    cambios = await self._actualizar(canal)
+                    if cambios is not None:
+                        self._difundir(canal, self.evento(canal, cambios))
+                except Exception as e:
+                    logger.error(f"Error actualizando KPIs para SSE (unidad {canal.unidad_id}): {e}")
+            try:
+                await asyncio.wait_for(self._despertador.wait(), timeout=self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            self._despertador.clear()
+        self._loop = self._despertador = None
+        self._monitor = None
+
+    def _difundir(self, canal, evento):
+        """Entrega el evento a cada suscriptor; si uno no leyó el anterior, se reemplaza"""
+        for cola in list(canal.suscriptores):
+            if cola.full():
+                cola.get_nowait()
+            cola.put_nowait(evento)
+        self.eventos_emitidos += 1
+        logger.info(
+            f"KPIs difundidos a {len(canal.suscriptores)} suscriptores "
+            f"(unidad {canal.unidad_id}, versión {canal.event_id})"
+        )
+
+    async def suscribir(self, unidad_id=None):
+        """
+        Registra un suscriptor de una unidad; el monitor arranca con el primero.
+        Si falla el primer cálculo de KPIs la excepción sale sin dejar suscriptor
+        """
+        canal = self.canal(unidad_id)
+        if canal.kpis is None:
+            await self._actualizar(canal)
+        cola = asyncio.Queue(maxsize=1)
+        canal.suscriptores.add(cola)
+        if self._monitor is None:
+            self._monitor = asyncio.ensure_future(self._monitorear())
+        return canal, cola
+
+    def desuscribir(self, canal, cola):
+        canal.suscriptores.discard(cola)
+
+    def get_status(self):
+        return {
+            "suscriptores": sum(len(canal.suscriptores) for canal in self._canales.values()),
+            "canales": {
+                str(unidad) if unidad is not None else "todas": {
+                    "suscriptores": len(canal.suscriptores),
+                    "version": canal.event_id
+                }
+                for unidad, canal in self._canales.items()
+            },
+            "eventos_emitidos": self.eventos_emitidos
+        }
+
+# Instancia global del difusor de KPIs
+kpi_broadcaster = KPIBroadcaster()
@@ -0,0 +1,197 @@
+"""
+Medición de memoria por etapa del ETL y por respuesta grande
+Cada medición registra el RSS pico del proceso mientras corre (hilo que
+muestrea /proc) y, con tracemalloc activo, la memoria asignada neta y los
+sitios que más asignaron (diferencia de snapshots antes y después).
+tracemalloc es opcional: encarece cada asignación, se activa por
+configuración o desde /debug/memory
+"""
+
+import logging
+import resource
+import threading
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_MUESTREO = 0.05
+MB = 1024 * 1024
+
+def rss_actual_mb():
+    """RSS actual del proceso en MB (/proc en Linux; pico histórico en otros sistemas)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            paginas = int(statm.read().split()[1])
+        return paginas * resource.getpagesize() / MB
+    except OSError:
+        # ru_maxrss está en KB en Linux y en bytes en macOS; solo se usa como aproximación
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class MuestreadorRSS:
+    """Hilo que registra el RSS máximo observado mientras corre un bloque"""
+
+    def __init__(self):
+        self.inicial = rss_actual_mb()
+        self.pico = self.inicial
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, name="rss-muestreo", daemon=True)
+
+    def _muestrear(self):
+        while not self._detener.wait(INTERVALO_MUESTREO):
+            self.pico = max(self.pico, rss_actual_mb())
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._detener.set()
+        self._hilo.join()
+        self.pico = max(self.pico, rss_actual_mb())
+
+def _sin_ruido(snapshot):
+    # Las trazas del propio tracemalloc y de los imports no son del código medido
+    return snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ])
+
+def sitios(estadisticas, top):
+    """Sitios de asignación (archivo:línea) más pesados de una lista de Statistic/StatisticDiff"""
+    resultado = []
+    for estadistica in estadisticas[:top]:
+        tamano = getattr(estadistica, 'size_diff', estadistica.size)
+        if tamano <= 0:
+            break
+        marco = estadistica.traceback[0]
+        resultado.append({
+            "sitio": f"{marco.filename}:{marco.lineno}",
+            "mb": round(tamano / MB, 2),
+            "bloques": getattr(estadistica, 'count_diff', estadistica.count)
+        })
+    return resultado
+
+class TrazaMemoria:
+    """
+    Asignaciones netas de un bloque según tracemalloc (sin efecto si no está
+    activo). Es global al proceso: incluye lo que asignan otros hilos a la vez
+    """
+
+    def __init__(self, top=10):
+        self.top = top
+        self.asignado_mb = None
+        self.sitios = None
+        self._antes = None
+
+    def __enter__(self):
+        if tracemalloc.is_tracing():
+            self._antes = _sin_ruido(tracemalloc.take_snapshot())
+        return self
+
+    def __exit__(self, *exc):
+        if self._antes is None or not tracemalloc.is_tracing():
+            return
+        despues = _sin_ruido(tracemalloc.take_snapshot())
+        diferencias = despues.compare_to(self._antes, 'lineno')
+        self.asignado_mb = round(sum(d.size_diff for d in diferencias) / MB, 2)
+        self.sitios = sitios(diferencias, self.top)
+        self._antes = None
+
+class Medicion:
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.fecha = datetime.now()
+        self.segundos = None
+        self.rss_inicial_mb = None
+        self.rss_pico_mb = None
+        self.asignado_mb = None
+        self.sitios = None
+
+    def to_dict(self):
+        return {
+            "nombre": self.nombre,
+            "fecha": self.fecha.isoformat(),
+            "segundos": round(self.segundos, 3) if self.segundos is not None else None,
+            "rss_inicial_mb": round(self.rss_inicial_mb, 1) if self.rss_inicial_mb is not None else None,
+            "rss_pico_mb": round(self.rss_pico_mb, 1) if self.rss_pico_mb is not None else None,
+            "asignado_mb": self.asignado_mb,
+            "sitios": self.sitios
+        }
+
+class MemoryTracker:
+    def __init__(self, top=10, max_respuestas=50):
+        self.top = top
+        self.respuestas = deque(maxlen=max_respuestas)
+        self.ultimo_etl = None
+
+    @property
+    def trazando(self):
+        return tracemalloc.is_tracing()
+
+    def iniciar_traza(self, frames=1):
+        """Activa tracemalloc (frames = profundidad de pila guardada por asignación)"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            logger.info(f"tracemalloc activado ({frames} frames)")
+
+    def detener_traza(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("tracemalloc desactivado")
+
+    def medir_respuesta(self, nombre):
+        """Context manager que mide un request y guarda el resultado entre las respuestas recientes"""
+        return _MedicionRespuesta(self, nombre)
+
+    def registrar_etl(self, run_id, etapas):
+        self.ultimo_etl = {"run_id": run_id, "fecha": datetime.now().isoformat(), "etapas": etapas}
+
+    def get_status(self):
+        estado = {
+            "tracemalloc": self.trazando,
+            "rss_mb": round(rss_actual_mb(), 1),
+            "rss_pico_proceso_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "respuestas": [medicion.to_dict() for medicion in reversed(self.respuestas)],
+            "ultimo_etl": self.ultimo_etl
+        }
+        if self.trazando:
+            actual, pico = tracemalloc.get_traced_memory()
+            estado["trazado_mb"] = round(actual / MB, 1)
+            estado["trazado_pico_mb"] = round(pico / MB, 1)
+            estado["sitios"] = sitios(_sin_ruido(tracemalloc.take_snapshot()).statistics('lineno'), self.top)
+        return estado
+
+class _MedicionRespuesta:
+    def __init__(self, tracker, nombre):
+        self.tracker = tracker
+        self.medicion = Medicion(nombre)
+        self._rss = MuestreadorRSS()
+        self._traza = TrazaMemoria(tracker.top)
+        self._inicio = None
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        self._rss.__enter__()
+        self._traza.__enter__()
+        return self.medicion
+
+    def __exit__(self, *exc):
+        self._traza.__exit__(*exc)
+        self._rss.__exit__(*exc)
+        medicion = self.medicion
+        medicion.segundos = time.perf_counter() - self._inicio
+        medicion.rss_inicial_mb = self._rss.inicial
+        medicion.rss_pico_mb = self._rss.pico
+        medicion.asignado_mb = self._traza.asignado_mb
+        medicion.sitios = self._traza.sitios
+        self.tracker.respuestas.append(medicion)
+
+# Instancia global de la medición de memoria
+memory_tracker = MemoryTracker(top=settings.MEMORY_TOP_SITIOS)
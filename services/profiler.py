@@ -0,0 +1,157 @@
+"""
+Profiler por muestreo para diagnóstico en producción
+Un hilo toma las pilas de todos los hilos (sys._current_frames) a una
+frecuencia fija y cuenta cada pila en formato "collapsed" (una línea
+"hilo;modulo:funcion;... N"), lista para flamegraph.pl o speedscope.
+No instrumenta el código: el costo es proporcional a la frecuencia
+"""
+
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+class ProfilerOcupado(Exception):
+    """Ya hay una captura en curso en este worker"""
+
+def _etiqueta(frame):
+    modulo = frame.f_globals.get('__name__', '?')
+    return f"{modulo}:{frame.f_code.co_name}".replace(';', ':')
+
+def pila_colapsada(frame, hilo):
+    """Pila de un hilo de la raíz a la hoja, separada por ';'"""
+    etiquetas = []
+    while frame is not None:
+        etiquetas.append(_etiqueta(frame))
+        frame = frame.f_back
+    etiquetas.append(hilo.replace(';', ':').replace(' ', '_'))
+    return ";".join(reversed(etiquetas))
+
+class Captura:
+    """Muestreo en un hilo aparte hasta que se detiene"""
+
+    def __init__(self, hz, filtro_hilos=None):
+        self.hz = hz
+        self.filtro_hilos = filtro_hilos
+        self.pilas = Counter()
+        self.muestras = 0
+        self.inicio = None
+        self.segundos = None
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        self.inicio = time.perf_counter()
+        self._hilo = threading.Thread(target=self._muestrear, name="profiler-muestreo", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+        self.segundos = time.perf_counter() - self.inicio
+
+    def _muestrear(self):
+        propio = threading.get_ident()
+        periodo = 1.0 / self.hz
+        siguiente = time.perf_counter()
+        while not self._detener.is_set():
+            nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                nombre = nombres.get(ident, f"hilo-{ident}")
+                if self.filtro_hilos and not nombre.startswith(self.filtro_hilos):
+                    continue
+                self.pilas[pila_colapsada(frame, nombre)] += 1
+            self.muestras += 1
+            # Periodo fijo sin acumular el tiempo de muestreo
+            siguiente += periodo
+            espera = siguiente - time.perf_counter()
+            if espera > 0:
+                self._detener.wait(espera)
+            else:
+                siguiente = time.perf_counter()
+
+    def colapsado(self):
+        return "".join(f"{pila} {n}\n" for pila, n in self.pilas.most_common())
+
+    def resumen(self):
+        return {
+            "hz": self.hz,
+            "muestras": self.muestras,
+            "segundos": round(self.segundos, 3) if self.segundos is not None else None,
+            "pilas": len(self.pilas)
+        }
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._captura = None
+        self.etl_armado = None   # hz del muestreo de la próxima ejecución del ETL
+        self.ultimo_etl = None
+        self.ultimo_etl_info = None
+
+    def _tomar(self, captura):
+        with self._lock:
+            if self._captura is not None:
+                raise ProfilerOcupado("Ya hay una captura del profiler en curso")
+            self._captura = captura
+        captura.iniciar()
+
+    def _soltar(self, captura):
+        captura.detener()
+        with self._lock:
+            self._captura = None
+
+    def iniciar(self, hz):
+        """Empieza a muestrear todos los hilos; ProfilerOcupado si ya hay una captura"""
+        captura = Captura(hz)
+        self._tomar(captura)
+        return captura
+
+    def detener(self, captura):
+        self._soltar(captura)
+        logger.info(f"Perfil capturado: {captura.muestras} muestras, {len(captura.pilas)} pilas")
+        return captura
+
+    def armar_etl(self, hz):
+        """La próxima ejecución del ETL en este worker se perfila completa"""
+        self.etl_armado = hz
+
+    def iniciar_etl(self):
+        """Captura de las tareas del ETL si estaba armada; None si no"""
+        hz, self.etl_armado = self.etl_armado, None
+        if hz is None:
+            return None
+        # Solo los hilos de las tareas del grafo, no los requests que atiende el worker
+        captura = Captura(hz, filtro_hilos="etl-tarea")
+        try:
+            self._tomar(captura)
+        except ProfilerOcupado:
+            logger.warning("Profiler ocupado: la ejecución del ETL no se perfila")
+            return None
+        return captura
+
+    def finalizar_etl(self, captura, run_id):
+        if captura is None:
+            return None
+        self._soltar(captura)
+        self.ultimo_etl = captura
+        self.ultimo_etl_info = {"run_id": run_id, "fecha": datetime.now().isoformat(), **captura.resumen()}
+        logger.info(f"Perfil del ETL {run_id}: {captura.muestras} muestras, {len(captura.pilas)} pilas")
+        return self.ultimo_etl_info
+
+    def get_status(self):
+        return {
+            "en_curso": self._captura is not None,
+            "etl_armado": self.etl_armado is not None,
+            "ultimo_etl": self.ultimo_etl_info
+        }
+
+# Instancia global del profiler por muestreo
+sampling_profiler = SamplingProfiler()
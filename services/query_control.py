@@ -0,0 +1,130 @@
+"""
+Control de consultas por request
+Aplica el statement_timeout de la clase de endpoint a cada consulta y
+permite cancelar en PostgreSQL las consultas en curso cuando el cliente
+se desconecta
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# statement_timeout (ms) por clase de endpoint (ver services.admission)
+STATEMENT_TIMEOUTS = {
+    'export': settings.STATEMENT_TIMEOUT_EXPORT,
+    'pesada': settings.STATEMENT_TIMEOUT_PESADA,
+    'general': settings.STATEMENT_TIMEOUT_GENERAL,
+}
+
+# Código SQLSTATE de query_canceled (statement_timeout o pg_cancel_backend)
+QUERY_CANCELED = '57014'
+
+_control_actual = ContextVar('control_consulta', default=None)
+
+class ConsultaCancelada(Exception):
+    """La consulta se canceló por statement_timeout o por desconexión del cliente"""
+
+    def __init__(self, motivo):
+        super().__init__(f"Consulta cancelada ({motivo})")
+        self.motivo = motivo
+
+class ControlConsulta:
+    def __init__(self, clase):
+        self.clase = clase
+        self.timeout_ms = STATEMENT_TIMEOUTS.get(clase)
+        self.cancelada = False
+        self._conexiones = set()
+        self._lock = threading.Lock()
+
+    def cancelar(self):
+        """Cancela en el servidor las consultas registradas (el cliente se desconectó)"""
+        with self._lock:
+            self.cancelada = True
+            conexiones = list(self._conexiones)
+        for conexion in conexiones:
+            try:
+                conexion.cancel()
+            except Exception as e:
+                logger.error(f"Error cancelando consulta: {e}")
+        if conexiones:
+            query_metrics.registrar(self.clase, 'cancelaciones', len(conexiones))
+            logger.info(f"Cliente desconectado: {len(conexiones)} consultas canceladas ({self.clase})")
+
+    @contextmanager
+    def registrar(self, conexion):
+        with self._lock:
+            if self.cancelada:
+                raise ConsultaCancelada("cliente desconectado")
+            self._conexiones.add(conexion)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._conexiones.discard(conexion)
+
+class QueryMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.contadores = {}
+
+    def registrar(self, clase, evento, cantidad=1):
+        with self._lock:
+            por_clase = self.contadores.setdefault(clase or 'sin_clase', {'timeouts': 0, 'cancelaciones': 0})
+            por_clase[evento] += cantidad
+
+    def get_status(self):
+        return {
+            "statement_timeout_ms": STATEMENT_TIMEOUTS,
+            "por_clase": self.contadores
+        }
+
+def iniciar_control(clase):
+    """Asocia un control al request actual; retorna (control, token para finalizar)"""
+    control = ControlConsulta(clase)
+    return control, _control_actual.set(control)
+
+def finalizar_control(token):
+    _control_actual.reset(token)
+
+def _es_cancelacion(error):
+    original = getattr(error, 'orig', error)
+    return getattr(original, 'pgcode', None) == QUERY_CANCELED
+
+@contextmanager
+def consulta_controlada(conexion):
+    """
+    Ejecuta consultas sobre una conexión DBAPI con el timeout de la clase del
+    request actual y registrada para cancelación. Traduce query_canceled a
+    ConsultaCancelada. La conexión debe estar dentro de una transacción
+    (el timeout es local a ella).
+    """
+    control = _control_actual.get()
+    if control is None:
+        yield
+        return
+
+    with control.registrar(conexion):
+        if control.timeout_ms:
+            cursor = conexion.cursor()
+            try:
+                cursor.execute("SELECT set_config('statement_timeout', %s, true)", (str(control.timeout_ms),))
+            finally:
+                cursor.close()
+        try:
+            yield
+        except Exception as e:
+            if not _es_cancelacion(e):
+                raise
+            if control.cancelada:
+                raise ConsultaCancelada("cliente desconectado") from e
+            query_metrics.registrar(control.clase, 'timeouts')
+            logger.warning(f"statement_timeout de {control.timeout_ms} ms alcanzado ({control.clase})")
+            raise ConsultaCancelada("statement_timeout") from e
+
+# Instancia global de métricas de timeouts y cancelaciones
+query_metrics = QueryMetrics()
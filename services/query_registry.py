@@ -0,0 +1,62 @@
+"""
+Registro de sentencias SQL con nombre
+Compila cada forma de consulta (SQL con parámetros %(nombre)s) una sola vez
+a una sentencia PREPARE de PostgreSQL con parámetros posicionales
+"""
+
+import hashlib
+import re
+import threading
+
+_PARAMETRO = re.compile(r"%\((\w+)\)s")
+
+class SentenciaPreparada:
+    """Forma de consulta compilada: SQL de PREPARE/EXECUTE y orden de parámetros"""
+
+    def __init__(self, nombre, query):
+        self.parametros = []
+        for parametro in _PARAMETRO.findall(query):
+            if parametro not in self.parametros:
+                self.parametros.append(parametro)
+
+        sql = _PARAMETRO.sub(lambda m: f"${self.parametros.index(m.group(1)) + 1}", query)
+        sql = sql.replace('%%', '%')
+
+        huella = hashlib.md5(sql.encode('utf-8')).hexdigest()[:10]
+        self.nombre = f"{re.sub(r'[^a-z0-9_]', '_', nombre.lower())[:40]}_{huella}"
+        self.prepare_sql = f"PREPARE {self.nombre} AS {sql}"
+        if self.parametros:
+            self.execute_sql = f"EXECUTE {self.nombre} ({', '.join(['%s'] * len(self.parametros))})"
+        else:
+            self.execute_sql = f"EXECUTE {self.nombre}"
+        self.ejecuciones = 0
+
+    def valores(self, params):
+        """Valores de los parámetros en el orden de $1..$n"""
+        return [params.get(parametro) for parametro in self.parametros]
+
+class QueryRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sentencias = {}
+        self.preparaciones = 0
+
+    def compilar(self, nombre, query):
+        """Retorna la sentencia compilada para (nombre, SQL), compilándola en el primer uso"""
+        clave = (nombre, query)
+        sentencia = self._sentencias.get(clave)
+        if sentencia is None:
+            with self._lock:
+                sentencia = self._sentencias.setdefault(clave, SentenciaPreparada(nombre, query))
+        sentencia.ejecuciones += 1
+        return sentencia
+
+    def get_status(self):
+        return {
+            "sentencias": len(self._sentencias),
+            "preparaciones": self.preparaciones,
+            "ejecuciones": {s.nombre: s.ejecuciones for s in self._sentencias.values()}
+        }
+
+# Instancia global del registro de consultas
+query_registry = QueryRegistry()
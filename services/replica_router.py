@@ -0,0 +1,153 @@
+"""
+Enrutamiento de lecturas a réplicas de PostgreSQL
+Elige una réplica sana con retraso de replicación bajo el umbral y, si no
+hay ninguna, las lecturas vuelven al primario. ETL y migraciones siempre
+usan el primario
+"""
+
+import itertools
+import logging
+import threading
+import time
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Retraso de replicación en segundos (0 si la réplica ya aplicó todo lo recibido).
+# NULL si el receptor WAL no está en streaming o lleva más de wal_receiver_timeout
+# sin noticias del primario (en reposo el receptor lo consulta cada medio timeout):
+# sin receptor, "aplicó todo lo recibido" no dice nada del primario.
+# Sin pg_read_all_stats, status se ve NULL y las lecturas quedan en el primario
+LAG_QUERY = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN r.status IS DISTINCT FROM 'streaming' THEN NULL
+    WHEN current_setting('wal_receiver_timeout')::interval > interval '0'
+         AND r.last_msg_receipt_time < now() - current_setting('wal_receiver_timeout')::interval THEN NULL
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END AS lag
+FROM (SELECT 1) AS base
+LEFT JOIN pg_stat_wal_receiver r ON true
+"""
+
+class Replica:
+    def __init__(self, url):
+        self.url = url
+        self._engine = None
+        self.healthy = False
+        self.lag = None
+        self.checked_at = 0.0
+        self.last_error = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from sqlalchemy import create_engine
+            self._engine = create_engine(self.url, pool_pre_ping=True)
+        return self._engine
+
+    @property
+    def host(self):
+        # No exponer credenciales en el estado
+        return self.url.rsplit('@', 1)[-1]
+
+    def check(self):
+        """Consulta salud y retraso de replicación de la réplica"""
+        from sqlalchemy import text
+
+        try:
+            with self.engine.connect() as connection:
+                lag = connection.execute(text(LAG_QUERY)).scalar()
+            self.healthy = True
+            if lag is None:
+                # Responde pero no recibe WAL: se trata como atrasada
+                self.lag = None
+                self.last_error = "Receptor WAL sin streaming activo"
+                logger.warning(f"Réplica {self.host} sin streaming desde el primario")
+            else:
+                self.lag = float(lag)
+                self.last_error = None
+        except Exception as e:
+            self.healthy = False
+            self.lag = None
+            self.last_error = str(e)
+            logger.warning(f"Réplica {self.host} no disponible: {e}")
+        self.checked_at = time.monotonic()
+
+class ReplicaRouter:
+    def __init__(self, urls, max_lag_seconds, check_interval):
+        self.replicas = [Replica(url) for url in urls]
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._turno = itertools.count()
+        self.lecturas_replica = 0
+        self.lecturas_primario = 0
+
+    @property
+    def enabled(self):
+        return bool(self.replicas)
+
+    def _refresh(self):
+        """Revisa las réplicas cuyo último chequeo venció (un solo hilo a la vez)"""
+        ahora = time.monotonic()
+        vencidas = [r for r in self.replicas if ahora - r.checked_at >= self.check_interval]
+        if not vencidas or not self._lock.acquire(blocking=False):
+            return
+        try:
+            for replica in vencidas:
+                replica.check()
+        finally:
+            self._lock.release()
+
+    def read_engine(self):
+        """Engine de una réplica utilizable o None para leer del primario"""
+        if not self.replicas:
+            return None
+
+        self._refresh()
+        candidatas = [
+            r for r in self.replicas
+            if r.healthy and r.lag is not None and r.lag <= self.max_lag_seconds
+        ]
+        if not candidatas:
+            self.lecturas_primario += 1
+            return None
+
+        self.lecturas_replica += 1
+        return candidatas[next(self._turno) % len(candidatas)].engine
+
+    def mark_failed(self, engine, error):
+        """Saca de rotación la réplica de un engine que falló hasta el próximo chequeo"""
+        for replica in self.replicas:
+            if replica._engine is engine:
+                replica.healthy = False
+                replica.last_error = str(error)
+                replica.checked_at = time.monotonic()
+                logger.warning(f"Réplica {replica.host} fuera de rotación: {error}")
+
+    def get_status(self):
+        return {
+            "enabled": self.enabled,
+            "max_lag_seconds": self.max_lag_seconds,
+            "lecturas_replica": self.lecturas_replica,
+            "lecturas_primario": self.lecturas_primario,
+            "replicas": [
+                {
+                    "host": r.host,
+                    "healthy": r.healthy,
+                    "lag_seconds": round(r.lag, 2) if r.lag is not None else None,
+                    "last_error": r.last_error
+                }
+                for r in self.replicas
+            ]
+        }
+
+# Instancia global del enrutador de réplicas
+replica_router = ReplicaRouter(
+    settings.replica_urls,
+    settings.REPLICA_MAX_LAG_SECONDS,
+    settings.REPLICA_CHECK_INTERVAL
+)
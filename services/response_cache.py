@@ -0,0 +1,138 @@
+"""
+Caché de respuestas precomprimidas por versión de datos
+Las respuestas de estadísticas son deterministas mientras no corra un ETL:
+el cuerpo se comprime una sola vez (gzip y brotli) y se sirve tal cual
+hasta que cambia la versión de datos. La versión es por unidad: un ETL de
+una unidad solo invalida las respuestas de esa unidad (y las globales).
+Con LISTEN/NOTIFY activo (services.cache_invalidation) los cambios llegan
+al instante y etl_runs solo se relee como respaldo
+"""
+
+import gzip
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from urllib.parse import parse_qs
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+def brotli_module():
+    """Módulo brotli si está instalado (dependencia opcional)"""
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+def unidad_de_query(query_string):
+    """unidad_id pedido en el query string (None = todas las unidades)"""
+    if isinstance(query_string, bytes):
+        query_string = query_string.decode('latin-1')
+    valores = parse_qs(query_string).get('unidad_id')
+    try:
+        return int(valores[0]) if valores else None
+    except ValueError:
+        return None
+
+class CachedResponse:
+    """Cuerpo de una respuesta con sus variantes comprimidas"""
+
+    def __init__(self, body, headers):
+        self.headers = headers
+        self.bodies = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9)}
+        brotli = brotli_module()
+        if brotli is not None:
+            self.bodies['br'] = brotli.compress(body, quality=11)
+
+    @property
+    def size(self):
+        return sum(len(body) for body in self.bodies.values())
+
+class ResponseCache:
+    def __init__(self, max_entries=512, version_ttl=5.0, version_ttl_notify=300.0):
+        self.max_entries = max_entries
+        self.version_ttl = version_ttl
+        self.version_ttl_notify = version_ttl_notify
+        self.notificaciones = False   # True mientras este worker escucha los NOTIFY de versión
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._versiones = {}   # unidad_id (None = todas) -> id de la última ejecución que la cargó
+        self._version_checked = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def set_versiones(self, versiones):
+        """Fija las versiones por unidad; descarta solo las respuestas de las unidades que cambiaron"""
+        with self._lock:
+            self._version_checked = time.monotonic()
+            cambiadas = {
+                unidad for unidad, version in versiones.items()
+                if self._versiones.get(unidad) != version
+            }
+            if not cambiadas:
+                return
+            logger.info(f"Nueva versión de datos para unidades {sorted(cambiadas, key=str)}, respuestas descartadas")
+            self._versiones.update(versiones)
+            for clave in [clave for clave in self._entries if clave[0][0] in cambiadas]:
+                del self._entries[clave]
+
+    def publicar(self, version, unidades):
+        """Registra en este worker la versión que acaba de cargar un ETL"""
+        self.set_versiones({**{unidad: version for unidad in unidades}, None: version})
+
+    def current_version(self, unidad_id=None):
+        """
+        Versión de datos vigente de una unidad (None = todas); se relee de
+        etl_runs como máximo cada version_ttl segundos (version_ttl_notify
+        si llegan las notificaciones)
+        """
+        ttl = self.version_ttl_notify if self.notificaciones else self.version_ttl
+        if time.monotonic() - self._version_checked >= ttl:
+            try:
+                from services.etl_state import etl_state
+                self.set_versiones(etl_state.get_data_versions())
+            except Exception as e:
+                logger.error(f"Error leyendo versión de datos: {e}")
+                return None
+        # La fecha forma parte de la versión: hay KPIs relativos al mes en curso
+        return (unidad_id, self._versiones.get(unidad_id, 0), date.today().isoformat())
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get((version, key))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((version, key))
+            self.hits += 1
+            return entry
+
+    def store(self, key, version, body, headers):
+        entry = CachedResponse(body, headers)
+        with self._lock:
+            self._entries[(version, key)] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_status(self):
+        return {
+            "versiones": {str(unidad) if unidad is not None else "todas": version
+                          for unidad, version in self._versiones.items()},
+            "entries": len(self._entries),
+            "bytes": sum(entry.size for entry in list(self._entries.values())),
+            "hits": self.hits,
+            "misses": self.misses,
+            "notificaciones": self.notificaciones,
+            "brotli": brotli_module() is not None
+        }
+
+# Instancia global de la caché de respuestas
+response_cache = ResponseCache(
+    version_ttl=settings.CACHE_VERSION_TTL,
+    version_ttl_notify=settings.CACHE_VERSION_TTL_NOTIFY
+)
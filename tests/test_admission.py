@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from app.admission import AdmissionMiddleware
+from services.admission import AdmisionRechazada, AdmissionController, ClaseAdmision, admission_controller
+
+def test_cola_llena_rechaza_al_instante():
+    async def escenario():
+        clase = ClaseAdmision('general', max_concurrentes=1, max_cola=1, timeout=5)
+        await clase.adquirir()
+        en_espera = asyncio.ensure_future(clase.adquirir())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmisionRechazada) as error:
+            await clase.adquirir()
+        assert error.value.motivo == "cola llena"
+        clase.liberar()
+        await en_espera
+        return clase
+
+    clase = asyncio.run(escenario())
+    assert clase.activos == 1
+    assert (clase.admitidos, clase.rechazados_cola_llena) == (2, 1)
+
+def test_timeout_en_cola():
+    async def escenario():
+        clase = ClaseAdmision('pesada', max_concurrentes=1, max_cola=4, timeout=0.01)
+        await clase.adquirir()
+        with pytest.raises(AdmisionRechazada) as error:
+            await clase.adquirir()
+        assert error.value.motivo == "timeout en cola"
+        return clase
+
+    clase = asyncio.run(escenario())
+    assert clase.rechazados_timeout == 1
+    assert clase.en_cola == 0 and clase.activos == 1
+
+def test_liberar_cede_el_lugar_en_orden():
+    async def escenario():
+        clase = ClaseAdmision('export', max_concurrentes=1, max_cola=4, timeout=5)
+        orden = []
+
+        async def pedir(nombre):
+            await clase.adquirir()
+            orden.append(nombre)
+
+        await clase.adquirir()
+        esperas = [asyncio.ensure_future(pedir(n)) for n in ('a', 'b')]
+        await asyncio.sleep(0)
+        clase.liberar()
+        await esperas[0]
+        clase.liberar()
+        await esperas[1]
+        clase.liberar()
+        return clase, orden
+
+    clase, orden = asyncio.run(escenario())
+    assert orden == ['a', 'b']
+    assert clase.activos == 0
+
+def test_retry_after_segun_duracion_media():
+    clase = ClaseAdmision('pesada', max_concurrentes=2, max_cola=4, timeout=5)
+    assert clase.retry_after() == 1
+    clase.activos = 1
+    clase.liberar(duracion=10)
+    assert clase.retry_after() == 5
+
+def test_clasificar():
+    controlador = AdmissionController('/api/v1')
+    assert controlador.clasificar('/health') is None
+    assert controlador.clasificar('/api/v1/eventos/kpis') is None
+    assert controlador.clasificar('/api/v1/debug/profile') is None
+    assert controlador.clasificar('/api/v1/desenlaces/export/parquet').nombre == 'export'
+    assert controlador.clasificar('/api/v1/estadisticas/cubo').nombre == 'pesada'
+    assert controlador.clasificar('/api/v1/desenlaces/', b'limit=500').nombre == 'pesada'
+    assert controlador.clasificar('/api/v1/desenlaces/', b'limit=50').nombre == 'general'
+
+def test_middleware_responde_503_con_retry_after(monkeypatch):
+    clase = ClaseAdmision('general', max_concurrentes=1, max_cola=0, timeout=5)
+    monkeypatch.setitem(admission_controller.clases, 'general', clase)
+    llamadas = []
+
+    async def app(scope, receive, send):
+        llamadas.append(scope['path'])
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    enviados = []
+
+    async def send(mensaje):
+        enviados.append(mensaje)
+
+    async def escenario():
+        await clase.adquirir()
+        scope = {'type': 'http', 'path': '/api/v1/estadisticas/resumen', 'query_string': b''}
+        await AdmissionMiddleware(app)(scope, receive, send)
+
+    asyncio.run(escenario())
+    assert llamadas == []
+    assert enviados[0]['status'] == 503
+    assert (b'retry-after', b'1') in enviados[0]['headers']
+    assert b'cola llena' in enviados[1]['body']
+
+def test_middleware_admite_y_libera(monkeypatch):
+    clase = ClaseAdmision('general', max_concurrentes=1, max_cola=0, timeout=5)
+    monkeypatch.setitem(admission_controller.clases, 'general', clase)
+
+    async def app(scope, receive, send):
+        assert clase.activos == 1
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b'{}'})
+
+    async def receive():
+        await asyncio.sleep(10)
+
+    enviados = []
+
+    async def send(mensaje):
+        enviados.append(mensaje)
+
+    scope = {'type': 'http', 'path': '/api/v1/estadisticas/resumen', 'query_string': b''}
+    asyncio.run(AdmissionMiddleware(app)(scope, receive, send))
+    assert enviados[0]['status'] == 200
+    assert clase.activos == 0 and clase.admitidos == 1
@@ -0,0 +1,45 @@
+import pytest
+
+from etl.age_bands import SIN_EDAD, agregar, categorizar, etiquetas, limites_pedidos, sql_case
+
+def test_categorizar_bandas_por_defecto():
+    assert [categorizar(e) for e in (0, 17, 18, 30, 31, 50, 51, 70, 71, 99)] == [
+        'Menor de 18', 'Menor de 18', '18-30', '18-30', '31-50', '31-50', '51-70', '51-70', 'Mayor de 70', 'Mayor de 70'
+    ]
+
+def test_categorizar_sin_edad():
+    assert categorizar(None) == SIN_EDAD
+    assert categorizar(float('nan')) == SIN_EDAD
+
+def test_bandas_pediatricas():
+    limites = limites_pedidos("1,5,12,18")
+    assert etiquetas(limites) == ['Menor de 1', '1-4', '5-11', '12-17', 'Mayor de 17']
+    assert categorizar(0, limites) == 'Menor de 1'
+    assert categorizar(12, limites) == '12-17'
+    assert etiquetas((10, 11)) == ['Menor de 10', '10', 'Mayor de 10']
+
+@pytest.mark.parametrize("texto", ["a,b", "18,18", "30,18", "0,5", "1,200", ",".join(str(i) for i in range(1, 40))])
+def test_limites_invalidos(texto):
+    with pytest.raises(ValueError):
+        limites_pedidos(texto)
+
+def test_limites_por_defecto():
+    assert limites_pedidos(None) == limites_pedidos("") == (18, 31, 51, 71)
+
+def test_sql_case_igual_a_categorizar():
+    sql = sql_case("d.edad")
+    assert sql.startswith("CASE WHEN d.edad IS NULL THEN 'No especificado' WHEN d.edad < 18 THEN 'Menor de 18'")
+    assert sql.endswith("ELSE 'Mayor de 70' END")
+
+def test_agregar_por_sexo_y_banda():
+    filas = [
+        ('F', 20, 2, 2, 10.0),
+        ('F', 25, 1, 0, 0.0),
+        ('F', None, 1, 1, 3.0),
+        ('M', 80, 3, 2, 12.0),
+    ]
+    assert agregar(filas) == [
+        {'sexo': 'F', 'rango_edad': '18-30', 'total_casos': 3, 'promedio_estancia': 5.0},
+        {'sexo': 'F', 'rango_edad': SIN_EDAD, 'total_casos': 1, 'promedio_estancia': 3.0},
+        {'sexo': 'M', 'rango_edad': 'Mayor de 70', 'total_casos': 3, 'promedio_estancia': 6.0},
+    ]
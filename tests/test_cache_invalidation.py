@@ -0,0 +1,66 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from services import dimension_cache, etl_state, kpi_events, response_cache
+from services.cache_invalidation import DataVersionListener
+from services.database import db_service
+from services.response_cache import ResponseCache
+
+CLAVES = {unidad: ('/estadisticas/resumen', unidad) for unidad in (None, 1, 2)}
+
+@pytest.fixture
+def worker(monkeypatch):
+    """Cachés y servicios de un worker con una respuesta guardada por unidad"""
+    cache = ResponseCache(version_ttl=3600, version_ttl_notify=3600)
+    cache.set_versiones({None: 10, 1: 10, 2: 10})
+    for unidad, clave in CLAVES.items():
+        cache.store(clave, cache.current_version(unidad), b'{}', [])
+    monkeypatch.setattr(cache, 'set_versiones', MagicMock(wraps=cache.set_versiones))
+    monkeypatch.setattr(response_cache, 'response_cache', cache)
+
+    estado = MagicMock(worker='worker-a')
+    estado.get_data_versions.return_value = {None: 12, 1: 10, 2: 12}
+    monkeypatch.setattr(etl_state, 'etl_state', estado)
+
+    dimensiones = MagicMock()
+    monkeypatch.setattr(dimension_cache, 'dimension_cache', dimensiones)
+    monkeypatch.setattr(db_service, '_engine', object())
+
+    despertares = []
+    monkeypatch.setattr(kpi_events.kpi_broadcaster, 'despertar', lambda: despertares.append(1))
+    return cache, dimensiones, despertares
+
+def _vigentes(cache):
+    return {unidad for unidad, clave in CLAVES.items() if cache.get(clave, cache.current_version(unidad))}
+
+def test_notificacion_de_otro_worker_descarta_solo_la_unidad_cargada(worker):
+    cache, dimensiones, despertares = worker
+    listener = DataVersionListener('canal')
+
+    listener._procesar('{"run_id": 11, "unidades": [2], "worker": "worker-b"}')
+
+    cache.set_versiones.assert_called_once_with({2: 11, None: 11})
+    assert _vigentes(cache) == {1}
+    dimensiones.refresh.assert_called_once_with(db_service._engine)
+    assert despertares == [1]
+    assert listener.notificaciones == 1
+    assert listener.ultima["run_id"] == 11 and listener.ultima["unidades"] == [2]
+
+def test_notificacion_propia_no_recarga_dimensiones(worker):
+    cache, dimensiones, despertares = worker
+
+    DataVersionListener('canal')._procesar('{"run_id": 11, "unidades": [1], "worker": "worker-a"}')
+
+    assert _vigentes(cache) == {2}
+    dimensiones.refresh.assert_not_called()
+    assert despertares == [1]
+
+def test_payload_desconocido_relee_las_versiones(worker):
+    cache, _, despertares = worker
+
+    DataVersionListener('canal')._procesar('refrescar')
+
+    cache.set_versiones.assert_called_once_with({None: 12, 1: 10, 2: 12})
+    assert _vigentes(cache) == {1}
+    assert despertares == [1]
@@ -0,0 +1,110 @@
+import json
+import os
+import time
+
+import pandas as pd
+
+from etl.checkpoints import MANIFIESTO, CheckpointStore
+
+def _df(filas=50):
+    return pd.DataFrame({'desenlaceq_id': range(filas), 'sexo': ['F', 'M'] * (filas // 2)})
+
+def _ejecucion_fallida(store, run_id, df=None, data_source='sample'):
+    checkpoints = store.iniciar(run_id, data_source)
+    assert checkpoints.guardar("extract_desenlaces/u1", _df() if df is None else df)
+    checkpoints.finalizar("error")
+    return checkpoints
+
+def _envejecer(checkpoints, horas):
+    ruta = os.path.join(checkpoints.directorio, MANIFIESTO)
+    with open(ruta) as archivo:
+        manifiesto = json.load(archivo)
+    manifiesto["actualizado"] = time.time() - horas * 3600
+    with open(ruta, "w") as archivo:
+        json.dump(manifiesto, archivo)
+
+def test_retoma_la_ejecucion_fallida_con_hard_link(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    anterior = _ejecucion_fallida(store, 1)
+
+    checkpoints = store.iniciar(2, 'sample')
+
+    assert checkpoints.origen.run_id == 1
+    pd.testing.assert_frame_equal(checkpoints.leer("extract_desenlaces/u1"), _df())
+    assert checkpoints.leidos == ["extract_desenlaces/u1"]
+    ruta = os.path.join(checkpoints.directorio, "extract_desenlaces__u1.parquet")
+    assert os.path.samefile(ruta, os.path.join(anterior.directorio, "extract_desenlaces__u1.parquet"))
+
+def test_retoma_copiando_si_no_se_puede_enlazar(tmp_path, monkeypatch):
+    store = CheckpointStore(str(tmp_path))
+    anterior = _ejecucion_fallida(store, 1)
+    checkpoints = store.iniciar(2, 'sample')
+
+    def sin_enlaces(origen, destino):
+        raise OSError("otro sistema de archivos")
+    monkeypatch.setattr(os, 'link', sin_enlaces)
+
+    pd.testing.assert_frame_equal(checkpoints.leer("extract_desenlaces/u1"), _df())
+    ruta = os.path.join(checkpoints.directorio, "extract_desenlaces__u1.parquet")
+    assert not os.path.samefile(ruta, os.path.join(anterior.directorio, "extract_desenlaces__u1.parquet"))
+
+def test_no_retoma_ejecuciones_completas_ni_de_otro_origen(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    _ejecucion_fallida(store, 1, data_source='sqlserver')
+    assert store.iniciar(2, 'sample').origen is None
+
+    completa = store.iniciar(3, 'sqlserver')
+    completa.finalizar("completed")
+    assert store.iniciar(4, 'sqlserver').origen is None
+
+def test_escritura_interrumpida_no_deja_checkpoint(tmp_path, monkeypatch):
+    import pyarrow.parquet as pq
+
+    store = CheckpointStore(str(tmp_path))
+    checkpoints = store.iniciar(1, 'sample')
+    assert checkpoints.guardar("extract_desenlaces/u1", _df(10))
+
+    def escritura_cortada(tabla, ruta, **kwargs):
+        with open(ruta, "wb") as archivo:
+            archivo.write(b"PAR1 incompleto")
+        raise OSError("disco lleno")
+    monkeypatch.setattr(pq, 'write_table', escritura_cortada)
+
+    assert not checkpoints.guardar("extract_desenlaces/u1", _df(50))
+    assert not checkpoints.guardar("clean_desenlaces/u1", _df(50))
+    monkeypatch.undo()
+
+    # El checkpoint previo queda intacto y el interrumpido no existe
+    assert sorted(os.listdir(checkpoints.directorio)) == ["extract_desenlaces__u1.parquet", MANIFIESTO]
+    assert not checkpoints.existe("clean_desenlaces/u1")
+    pd.testing.assert_frame_equal(checkpoints.leer("extract_desenlaces/u1"), _df(10))
+
+def test_extraccion_vacia_no_se_guarda(tmp_path):
+    checkpoints = CheckpointStore(str(tmp_path)).iniciar(1, 'sample')
+    assert not checkpoints.guardar("extract_desenlaces/u1", _df(0))
+    assert not checkpoints.existe("extract_desenlaces/u1")
+
+def test_gc_borra_las_ejecuciones_vencidas(tmp_path):
+    store = CheckpointStore(str(tmp_path), max_horas=72)
+    vieja = _ejecucion_fallida(store, 1)
+    _envejecer(vieja, 100)
+    _ejecucion_fallida(store, 2)
+
+    resultado = store.gc(conservar=3)
+
+    assert resultado["borradas"] == [1]
+    assert [e["run_id"] for e in store.get_status()["ejecuciones"]] == [2]
+
+def test_gc_por_tamano_conserva_las_mas_recientes(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    for run_id in range(1, 5):
+        _ejecucion_fallida(store, run_id, df=_df(2000))
+    run_1 = os.path.join(str(tmp_path), "run_1")
+    tamano = sum(os.path.getsize(os.path.join(run_1, archivo)) for archivo in os.listdir(run_1))
+    # Entran la ejecución en curso (4) y la más reciente de las anteriores
+    store.max_mb = 2.5 * tamano / (1024 * 1024)
+
+    resultado = store.gc(conservar=4)
+
+    assert resultado["borradas"] == [1, 2]
+    assert sorted(os.listdir(str(tmp_path))) == ["run_3", "run_4"]
@@ -0,0 +1,25 @@
+"""
+Arranque en frío: import app.main dentro del presupuesto y sin módulos pesados
+Cada medición corre en un intérprete nuevo (ver benchmarks/import_profile.py)
+"""
+
+import json
+
+from benchmarks.import_profile import MODULOS_PESADOS, ejecutar, perfil_importacion
+
+PRESUPUESTO_MS = 800
+
+def test_import_app_main_dentro_del_presupuesto():
+    # El primer import compila bytecode y llena cachés del sistema: se toma el mejor de tres
+    tiempos = []
+    for _ in range(3):
+        filas = perfil_importacion()
+        tiempos.append(next(a for a, _, m in filas if m.strip() == 'app.main') / 1000)
+    assert min(tiempos) < PRESUPUESTO_MS, f"import app.main tardó {min(tiempos):.0f} ms"
+
+def test_import_app_main_no_carga_modulos_pesados():
+    cargados = json.loads(ejecutar(
+        "import sys, json, app.main; "
+        f"print(json.dumps([m for m in {MODULOS_PESADOS!r} if m in sys.modules]))"
+    ).stdout)
+    assert cargados == []
@@ -0,0 +1,78 @@
+import pandas as pd
+import pytest
+
+from services.cube_service import MAX_DIMENSIONES, MAX_GRUPOS, CubeQueryError, compilar_cubo, cube_service
+from services.database import db_service
+from services.dimension_cache import dimension_cache
+
+@pytest.fixture
+def consultas(monkeypatch):
+    """execute_query falso: registra (query, params, nombre) y devuelve respuesta['df']"""
+    llamadas = []
+    respuesta = {'df': pd.DataFrame({'sexo': ['F'], 'total_casos': [1]})}
+
+    def ejecutar(query, params=None, nombre=None):
+        llamadas.append((query, params, nombre))
+        return respuesta['df']
+    monkeypatch.setattr(db_service, 'execute_query', ejecutar)
+    monkeypatch.setattr(db_service, '_engine', object())
+    monkeypatch.setattr(dimension_cache, 'ensure_loaded', lambda engine: None)
+    monkeypatch.setattr(dimension_cache, 'name', lambda columna, key: f"{columna}:{key}")
+    return llamadas, respuesta
+
+def test_compila_agrupando_por_posicion_con_filtros_enlazados():
+    query = compilar_cubo(('sexo', 'mes'), ('total_casos',), ('unidad_id', 'fecha_inicio'))
+
+    assert query.startswith("SELECT d.sexo AS sexo,\n       TO_CHAR(d.fecha_ingreso, 'YYYY-MM') AS mes,")
+    assert "WHERE d.unidad_id = %(unidad_id)s\n  AND d.fecha_ingreso >= %(fecha_inicio)s" in query
+    assert "GROUP BY 1, 2\nORDER BY 1, 2" in query
+    assert query.endswith("LIMIT %(limite_grupos)s")
+
+def test_misma_forma_reusa_el_sql_compilado():
+    forma = (('aseguradora',), ('promedio_estancia',), ('sexo',))
+    compilar_cubo(*forma)
+    hits = compilar_cubo.cache_info().hits
+    assert compilar_cubo(*forma) is compilar_cubo(*forma)
+    assert compilar_cubo.cache_info().hits == hits + 2
+
+@pytest.mark.parametrize("dimensiones, medidas, max_grupos, mensaje", [
+    (['sexo; DROP TABLE dashboard_desenlaces'], ['total_casos'], 10, "Dimensiones no permitidas"),
+    (['sexo'], ['SUM(edad)'], 10, "Medidas no permitidas"),
+    (['sexo', 'mes', 'año', 'causa'], ['total_casos'], 10, f"Máximo {MAX_DIMENSIONES} dimensiones"),
+    (['sexo', 'sexo'], ['total_casos'], 10, "no pueden repetirse"),
+    (['sexo'], [], 10, "al menos una medida"),
+    (['sexo'], ['total_casos'], MAX_GRUPOS + 1, "max_grupos debe estar entre"),
+    (['sexo'], ['total_casos'], 0, "max_grupos debe estar entre"),
+])
+def test_rechaza_consultas_fuera_de_la_lista_o_los_limites(consultas, dimensiones, medidas, max_grupos, mensaje):
+    llamadas, _ = consultas
+    with pytest.raises(CubeQueryError) as error:
+        cube_service.consultar(dimensiones, medidas, max_grupos=max_grupos)
+    assert mensaje in str(error.value)
+    assert llamadas == []
+
+def test_pide_un_grupo_de_mas_para_detectar_el_exceso(consultas):
+    llamadas, respuesta = consultas
+    respuesta['df'] = pd.DataFrame({'sexo': ['F', 'M', 'X'], 'total_casos': [1, 2, 3]})
+
+    with pytest.raises(CubeQueryError) as error:
+        cube_service.consultar(['sexo'], ['total_casos'], max_grupos=2)
+    assert "más de 2 grupos" in str(error.value)
+    assert llamadas[0][1]['limite_grupos'] == 3
+
+    assert len(cube_service.consultar(['sexo'], ['total_casos'], max_grupos=3)) == 3
+
+def test_decodifica_dimensiones_y_enlaza_filtros(consultas):
+    llamadas, respuesta = consultas
+    respuesta['df'] = pd.DataFrame({'aseguradora': [4.0, float('nan')], 'total_casos': [7, 2]})
+
+    records = cube_service.consultar(['aseguradora'], ['total_casos'], filtros={'sexo': 'F', 'edad_min': None})
+
+    assert records == [
+        {'aseguradora': 'nombre_aseguradora:4.0', 'total_casos': 7},
+        {'aseguradora': None, 'total_casos': 2},
+    ]
+    query, params, nombre = llamadas[0]
+    assert params == {'limite_grupos': 1001, 'sexo': 'F'}
+    assert "d.sexo = %(sexo)s" in query and "edad" not in query
+    assert nombre == "cubo__aseguradora"
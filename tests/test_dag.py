@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+from etl import dag as dag_module
+from etl.dag import DAG, DAGError
+
+def _grafo():
+    dag = DAG(workers=4)
+    dag.tarea("create_tables", lambda e: "tablas")
+    dag.tarea("fetch/u1", lambda e: [1, 2, 3])
+    dag.tarea("load_desenlaces/u1", lambda e: len(e["fetch/u1"]), depende_de=["create_tables", "fetch/u1"])
+    dag.tarea("load_stats_mensual/u1", lambda e: "ok", depende_de=["create_tables", "fetch/u1"])
+    dag.tarea("refresh", lambda e: e["load_desenlaces/u1"], depende_de=["load_desenlaces/u1"])
+    return dag
+
+def test_seleccion_agrega_las_dependencias():
+    assert _grafo().seleccionar(["refresh"]) == {"refresh", "load_desenlaces/u1", "create_tables", "fetch/u1"}
+    assert _grafo().seleccionar(["load_stats_*"]) == {"load_stats_mensual/u1", "create_tables", "fetch/u1"}
+    assert _grafo().seleccionar(None) == set(_grafo().tareas)
+
+def test_seleccion_sin_coincidencias():
+    with pytest.raises(DAGError):
+        _grafo().seleccionar(["no_existe*"])
+
+def test_resultados_pasan_a_las_dependientes():
+    dag = _grafo()
+    assert dag.ejecutar() == []
+    assert dag.resultado("refresh") == 3
+    assert {t["estado"] for t in dag.to_list()} == {"ok"}
+
+def test_solo_corren_las_seleccionadas():
+    dag = _grafo()
+    dag.ejecutar(["load_stats_*"])
+    estados = {t["tarea"]: t["estado"] for t in dag.to_list()}
+    assert estados["load_desenlaces/u1"] == estados["refresh"] == "no_seleccionada"
+    assert estados["load_stats_mensual/u1"] == "ok"
+
+def test_falla_omite_dependientes_y_no_detiene_independientes():
+    dag = _grafo()
+
+    def falla(entradas):
+        raise RuntimeError("carga fallida")
+    dag.tareas["load_desenlaces/u1"].funcion = falla
+
+    assert dag.ejecutar() == ["load_desenlaces/u1"]
+    estados = {t["tarea"]: t["estado"] for t in dag.to_list()}
+    assert estados["refresh"] == "omitida"
+    assert estados["load_stats_mensual/u1"] == "ok"
+    assert dag.resultado("load_desenlaces/u1") is None
+
+def test_reintentos_con_espera_exponencial(monkeypatch):
+    esperas = []
+    monkeypatch.setattr(dag_module.time, "sleep", esperas.append)
+    intentos = []
+
+    def inestable(entradas):
+        intentos.append(1)
+        if len(intentos) < 3:
+            raise ConnectionError("timeout")
+        return "ok"
+
+    dag = DAG(reintentos=3, espera_reintento=0.5)
+    dag.tarea("extraer", inestable)
+    assert dag.ejecutar() == []
+    assert esperas == [0.5, 1.0]
+    assert dag.tareas["extraer"].intentos == 3
+
+def test_reintentos_agotados():
+    dag = DAG(reintentos=0)
+    dag.tarea("extraer", lambda e: 1 / 0)
+    assert dag.ejecutar() == ["extraer"]
+    assert "division by zero" in dag.tareas["extraer"].error
+
+def test_independientes_corren_en_paralelo():
+    # Con ejecución en serie la barrera nunca se completa y rompe por timeout
+    barrera = threading.Barrier(2, timeout=5)
+    dag = DAG(workers=2)
+    dag.tarea("a", lambda e: barrera.wait())
+    dag.tarea("b", lambda e: barrera.wait())
+    assert dag.ejecutar() == []
+
+def test_grafo_invalido():
+    dag = DAG()
+    dag.tarea("a", lambda e: None, depende_de=["b"])
+    with pytest.raises(DAGError, match="inexistentes"):
+        dag.validar()
+    dag.tarea("b", lambda e: None, depende_de=["a"])
+    with pytest.raises(DAGError, match="Ciclo"):
+        dag.validar()
+    with pytest.raises(DAGError, match="duplicada"):
+        dag.tarea("a", lambda e: None)
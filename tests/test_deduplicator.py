@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from etl.transformers.deduplicator import KeyDeduplicator
+
+def _procesar(dedup, chunks):
+    emitido = pd.concat([dedup.procesar(chunk) for chunk in chunks])
+    return dedup.finales(emitido)
+
+def _chunk(filas):
+    df = pd.DataFrame(filas, columns=['desenlaceq_id', 'fecha_procesamiento', 'valor'])
+    df['fecha_procesamiento'] = pd.to_datetime(df['fecha_procesamiento'])
+    return df
+
+def test_ultimo_gana_la_version_mas_reciente_entre_chunks():
+    chunks = [
+        _chunk([(1, '2024-01-02', 'a'), (2, '2024-01-01', 'b')]),
+        _chunk([(1, '2024-01-01', 'viejo'), (2, '2024-01-05', 'nuevo'), (3, None, 'c')]),
+        _chunk([(3, '2024-01-01', 'con fecha')]),
+    ]
+    resultado = _procesar(KeyDeduplicator(), chunks)
+    assert dict(zip(resultado['desenlaceq_id'], resultado['valor'])) == {1: 'a', 2: 'nuevo', 3: 'con fecha'}
+    assert list(resultado.columns) == ['desenlaceq_id', 'fecha_procesamiento', 'valor']
+
+def test_a_igual_version_gana_el_que_llego_despues():
+    chunks = [_chunk([(1, '2024-01-01', 'a'), (1, '2024-01-01', 'b')]), _chunk([(1, '2024-01-01', 'c')])]
+    dedup = KeyDeduplicator()
+    resultado = _procesar(dedup, chunks)
+    assert resultado['valor'].tolist() == ['c']
+    assert dedup.get_status()['reemplazadas'] == 1
+
+def test_primero_conserva_el_primer_registro():
+    chunks = [_chunk([(1, '2024-01-01', 'a')]), _chunk([(1, '2024-02-01', 'b'), (2, '2024-01-01', 'c')])]
+    resultado = _procesar(KeyDeduplicator(regla='primero'), chunks)
+    assert resultado['valor'].tolist() == ['a', 'c']
+
+def test_filas_sin_clave_se_conservan_sin_duplicados():
+    chunk = _chunk([(None, '2024-01-01', 'x'), (None, '2024-01-01', 'x'), (None, '2024-01-01', 'y'), (1, '2024-01-01', 'z')])
+    resultado = _procesar(KeyDeduplicator(), [chunk])
+    assert sorted(resultado['valor']) == ['x', 'y', 'z']
+
+def test_claves_de_texto_normalizadas():
+    df = pd.DataFrame({'historia': [' hc-1', 'HC-1 ', 'hc-2'], 'valor': [1, 2, 3]})
+    resultado = _procesar(KeyDeduplicator(claves=['historia'], columna_version=None), [df])
+    assert resultado['valor'].tolist() == [2, 3]
+
+def test_igual_que_deduplicar_todo_junto():
+    rng = np.random.default_rng(5)
+    n = 5_000
+    df = pd.DataFrame({
+        'desenlaceq_id': rng.integers(0, 800, n),
+        'fecha_procesamiento': pd.to_datetime('2024-01-01') + pd.to_timedelta(rng.integers(0, 5, n), unit='D'),
+        'valor': np.arange(n),
+    })
+    resultado = _procesar(KeyDeduplicator(), [df.iloc[i:i + 700] for i in range(0, n, 700)])
+
+    # Referencia: por clave, versión máxima y a igual versión la última llegada
+    esperado = df.sort_values(['fecha_procesamiento', 'valor']).groupby('desenlaceq_id').tail(1)
+    assert sorted(resultado['valor']) == sorted(esperado['valor'])
+
+def test_regla_invalida():
+    with pytest.raises(ValueError):
+        KeyDeduplicator(regla='mayor')
+
+def test_misma_clave_entera_en_chunk_con_nulos():
+    # Con un NULL el chunk llega como float64 (1.0) y la clave debe seguir siendo 1
+    chunks = [
+        _chunk([(1, '2024-01-01', 'viejo')]),
+        _chunk([(1.0, '2024-01-02', 'nuevo'), (None, '2024-01-02', 'sin clave')]),
+    ]
+    resultado = _procesar(KeyDeduplicator(), chunks)
+    assert sorted(resultado['valor']) == ['nuevo', 'sin clave']
+
+def test_misma_clave_en_chunks_numericos_y_alfanumericos():
+    chunks = [
+        pd.DataFrame({'historia': ['7', '8'], 'valor': ['a', 'b']}),
+        pd.DataFrame({'historia': ['7 ', 'X9'], 'valor': ['c', 'd']}),
+        pd.DataFrame({'historia': [7.0, ' x9'], 'valor': ['e', 'f']}),
+    ]
+    resultado = _procesar(KeyDeduplicator(claves=['historia'], columna_version=None), chunks)
+    assert dict(zip(resultado['historia'], resultado['valor'])) == {'8': 'b', 7.0: 'e', ' x9': 'f'}
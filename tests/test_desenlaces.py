@@ -0,0 +1,14 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes import desenlaces
+
+app = FastAPI()
+app.include_router(desenlaces.router)
+client = TestClient(app)
+
+def test_limit_fuera_de_rango_es_422():
+    # La validación ocurre antes de consultar la base de datos
+    assert client.get("/desenlaces/", params={"limit": -1}).status_code == 422
+    assert client.get("/desenlaces/", params={"limit": 0}).status_code == 422
+    assert client.get("/desenlaces/", params={"limit": 1001}).status_code == 422
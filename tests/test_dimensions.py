@@ -0,0 +1,26 @@
+import pytest
+
+from etl.dimensions import COLUMNAS_DESENLACE, columnas_pedidas, desenlaces_select_sql
+
+def test_columnas_pedidas_en_orden_de_la_tabla():
+    assert columnas_pedidas("sexo, fecha_ingreso,,sexo") == ['fecha_ingreso', 'sexo']
+
+def test_sin_fields_son_todas():
+    assert columnas_pedidas(None) is None
+    assert columnas_pedidas(" , ") is None
+
+def test_campo_desconocido():
+    with pytest.raises(ValueError) as error:
+        columnas_pedidas("sexo,clave_secreta")
+    assert "clave_secreta" in str(error.value)
+
+def test_solo_se_unen_las_dimensiones_pedidas():
+    sql = desenlaces_select_sql(['fecha_ingreso', 'nombre_aseguradora'])
+    assert sql.startswith("SELECT d.fecha_ingreso, aseguradora.nombre AS nombre_aseguradora\n")
+    assert "JOIN dim_aseguradora" in sql
+    assert "dim_diagnostico" not in sql and "dim_medico_tratante" not in sql
+
+def test_sin_columnas_mantiene_la_forma_original():
+    sql = desenlaces_select_sql()
+    assert sql.count("LEFT JOIN") == 5
+    assert [c.split(' AS ')[-1].split('.')[-1] for c in sql.split('\n')[0][len("SELECT "):].split(', ')] == COLUMNAS_DESENLACE
@@ -0,0 +1,25 @@
+import asyncio
+import threading
+
+from etl.dag import DAGError
+from services.etl_service import etl_service
+from services.etl_state import etl_state
+
+import pytest
+
+def test_lock_del_etl_se_toma_fuera_del_event_loop(monkeypatch):
+    hilos = []
+
+    def acquire_lock():
+        hilos.append(threading.current_thread())
+        return None
+    monkeypatch.setattr(etl_state, 'acquire_lock', acquire_lock)
+
+    resultado = asyncio.run(etl_service.run_etl_process(use_sample_data=True, unidades=[1]))
+
+    assert resultado["status"] == "busy"
+    assert hilos and hilos[0] is not threading.main_thread()
+
+def test_unidad_sin_fuente_sqlserver_es_error_del_dag():
+    with pytest.raises(DAGError):
+        etl_service.get_dag(use_sample_data=False, unidades=[999])
@@ -0,0 +1,74 @@
+import io
+from datetime import date
+
+import pyarrow.parquet as pq
+import pytest
+
+from services.database import db_service
+from services.export_service import export_service
+from services.replica_router import replica_router
+
+class _Cursor:
+    def __init__(self, filas):
+        self.filas = list(filas)
+        self.itersize = None
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchmany(self, n):
+        lote, self.filas = self.filas[:n], self.filas[n:]
+        return lote
+
+    def close(self):
+        pass
+
+class _Conexion:
+    def __init__(self, filas):
+        self.filas = filas
+
+    def cursor(self, name=None):
+        return _Cursor(self.filas)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+class _Engine:
+    def __init__(self, filas=None, error=None):
+        self.filas = filas or []
+        self.error = error
+
+    def raw_connection(self):
+        if self.error:
+            raise self.error
+        return _Conexion(self.filas)
+
+@pytest.fixture
+def engines(monkeypatch):
+    primario = _Engine(filas=[(date(2024, 1, d), 'M') for d in range(1, 6)])
+    replica = _Engine(error=ConnectionError("réplica caída"))
+    fallidas = []
+    monkeypatch.setattr(db_service, '_engine', primario)
+    monkeypatch.setattr(replica_router, 'read_engine', lambda: replica)
+    monkeypatch.setattr(replica_router, 'mark_failed', lambda engine, error: fallidas.append(engine))
+    return primario, replica, fallidas
+
+def test_exportacion_lee_del_primario_si_la_replica_falla(engines):
+    _, replica, fallidas = engines
+
+    data = b''.join(export_service.stream('parquet', columnas=['fecha_ingreso', 'sexo'], filas_por_lote=2))
+
+    tabla = pq.read_table(io.BytesIO(data))
+    assert tabla.num_rows == 5
+    assert tabla.column('sexo').to_pylist() == ['M'] * 5
+    assert fallidas == [replica]
+
+def test_exportacion_sin_respaldo_si_falla_el_primario(engines):
+    primario, _, _ = engines
+    primario.error = ConnectionError("primario caído")
+
+    with pytest.raises(ConnectionError):
+        b''.join(export_service.stream('arrow', columnas=['fecha_ingreso', 'sexo']))
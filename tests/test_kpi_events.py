@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from services.kpi_events import KPIBroadcaster
+
+def test_suscribir_sin_kpis_no_deja_suscriptor():
+    broadcaster = KPIBroadcaster()
+
+    async def falla(canal):
+        raise ConnectionError("base de datos caída")
+    broadcaster._actualizar = falla
+
+    async def suscribir():
+        await broadcaster.suscribir(3)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(suscribir())
+    assert broadcaster.get_status()["suscriptores"] == 0
+    assert broadcaster._monitor is None
+
+def test_suscribir_arranca_monitor_y_desuscribir_lo_detiene():
+    broadcaster = KPIBroadcaster(intervalo=0.01)
+    calculos = []
+
+    async def actualizar(canal):
+        calculos.append(canal.unidad_id)
+        canal.version, canal.kpis = (canal.unidad_id, 1, None), {"total_casos": 10}
+        return None
+    broadcaster._actualizar = actualizar
+
+    async def ciclo():
+        canal, cola = await broadcaster.suscribir(None)
+        assert broadcaster.get_status()["suscriptores"] == 1
+        monitor = broadcaster._monitor
+        broadcaster.desuscribir(canal, cola)
+        await asyncio.wait_for(monitor, timeout=1)
+
+    asyncio.run(ciclo())
+    assert calculos[0] is None
+    assert broadcaster._monitor is None
@@ -0,0 +1,39 @@
+import threading
+
+import pandas as pd
+
+from benchmarks.bench_transform_paralelo import generar_desenlaces
+from etl.transformers import parallel
+from etl.transformers.data_transformer import DataTransformer
+
+transformer = DataTransformer()
+
+def test_paralelo_igual_a_serie():
+    df = generar_desenlaces(6_000, seed=1)
+    df.index = df.index + 1_000
+    esperado = transformer._normalizar_desenlaces(df)
+    pd.testing.assert_frame_equal(parallel.normalizar_en_paralelo(transformer, df, 2), esperado, check_exact=True)
+
+def test_dos_unidades_limpiando_a_la_vez():
+    # Cada llamada tiene su propia entrada: ninguna recibe las filas de la otra
+    lotes = {'u1': generar_desenlaces(8_000, seed=2), 'u2': generar_desenlaces(3_000, seed=3)}
+    resultados, errores = {}, []
+
+    def limpiar(unidad):
+        try:
+            resultados[unidad] = parallel.normalizar_en_paralelo(transformer, lotes[unidad], 2)
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=limpiar, args=(unidad,)) for unidad in lotes]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert errores == []
+    for unidad, df in lotes.items():
+        pd.testing.assert_frame_equal(resultados[unidad], transformer._normalizar_desenlaces(df), check_exact=True)
+
+def test_workers_sin_fork():
+    assert parallel.contexto().get_start_method() in ('forkserver', 'spawn')
@@ -0,0 +1,67 @@
+from unittest.mock import MagicMock
+
+from etl.connectors import postgres_connector
+from etl.connectors.postgres_connector import PostgresConnector
+from etl.dimensions import DIMENSIONES, tipo_clave
+
+class ConexionEsquemaAntiguo:
+    """Conexión falsa con un dashboard_desenlaces sin particiones y claves SMALLINT"""
+    
+    def __init__(self):
+        self.sentencias = []
+        self.relkind = 'r'
+        self.tipos = {
+            'dashboard_desenlaces': {
+                clave: 'smallint' for _, (_, clave) in DIMENSIONES.items()
+            },
+        }
+        for columna, (tabla, _) in DIMENSIONES.items():
+            self.tipos[tabla] = {'id': 'smallint', 'nombre': 'text'}
+    
+    def execute(self, sentencia, parametros=None):
+        sql = " ".join(str(sentencia).split())
+        self.sentencias.append(sql)
+        resultado = MagicMock()
+        if "FROM information_schema.columns" in sql:
+            resultado.fetchall.return_value = list(self.tipos.get(parametros['tabla'], {}).items())
+        elif "SELECT relkind" in sql:
+            resultado.scalar.return_value = self.relkind
+        elif "pg_get_serial_sequence(:tabla" in sql:
+            resultado.scalar.return_value = f"{parametros['tabla']}_id_seq"
+        elif sql.startswith("ALTER TABLE dashboard_desenlaces ATTACH PARTITION"):
+            # Postgres rechaza el ATTACH si los tipos no coinciden con el padre
+            for columna, (_, clave) in DIMENSIONES.items():
+                assert self.tipos['dashboard_desenlaces'][clave] == tipo_clave(columna).lower(), clave
+        elif sql.startswith("ALTER TABLE dashboard_desenlaces ALTER COLUMN") and "TYPE INTEGER" in sql:
+            self.tipos['dashboard_desenlaces'][sql.split()[5]] = 'integer'
+        elif " ALTER COLUMN id TYPE INTEGER" in sql:
+            self.tipos[sql.split()[2]]['id'] = 'integer'
+        elif sql.startswith("ALTER TABLE dashboard_desenlaces RENAME TO"):
+            # El padre nuevo nace con los tipos de create_desenlaces_table
+            self.relkind = 'p'
+        return resultado
+    
+    def commit(self):
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+def test_create_tables_amplia_claves_antes_de_particionar(monkeypatch):
+    monkeypatch.setattr(postgres_connector.settings, 'UNIDAD_DEFECTO', 1)
+    conexion = ConexionEsquemaAntiguo()
+    connector = PostgresConnector()
+    connector.engine = MagicMock()
+    connector.engine.connect.return_value = conexion
+    
+    assert connector.create_tables()
+    
+    sentencias = conexion.sentencias
+    attach = next(i for i, sql in enumerate(sentencias) if "ATTACH PARTITION" in sql)
+    ampliaciones = [i for i, sql in enumerate(sentencias) if "TYPE INTEGER" in sql]
+    assert ampliaciones and max(ampliaciones) < attach
+    assert "ALTER SEQUENCE dim_diagnostico_id_seq AS INTEGER" in sentencias
+    assert any(sql.startswith("CREATE OR REPLACE VIEW dashboard_desenlaces_vista") for sql in sentencias[attach:])
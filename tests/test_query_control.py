@@ -0,0 +1,112 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.admission import AdmissionMiddleware
+from services import query_control
+from services.admission import ClaseAdmision, admission_controller
+from services.query_control import (
+    ConsultaCancelada, QueryMetrics, consulta_controlada, finalizar_control, iniciar_control
+)
+
+class ErrorPostgres(Exception):
+    """Error del driver con SQLSTATE (como psycopg2)"""
+
+    def __init__(self, pgcode):
+        super().__init__(f"SQLSTATE {pgcode}")
+        self.pgcode = pgcode
+
+class ErrorSQLAlchemy(Exception):
+    """Error de SQLAlchemy que envuelve al del driver en .orig"""
+
+    def __init__(self, orig):
+        super().__init__(str(orig))
+        self.orig = orig
+
+@pytest.fixture
+def metricas(monkeypatch):
+    metricas = QueryMetrics()
+    monkeypatch.setattr(query_control, 'query_metrics', metricas)
+    return metricas
+
+@pytest.fixture
+def control(monkeypatch):
+    monkeypatch.setitem(query_control.STATEMENT_TIMEOUTS, 'pesada', 1500)
+    control, token = iniciar_control('pesada')
+    yield control
+    finalizar_control(token)
+
+def test_sin_control_no_toca_la_conexion():
+    conexion = MagicMock()
+    with consulta_controlada(conexion):
+        pass
+    conexion.cursor.assert_not_called()
+
+def test_aplica_el_timeout_de_la_clase_en_la_transaccion(control):
+    conexion = MagicMock()
+    with consulta_controlada(conexion):
+        assert conexion in control._conexiones
+
+    cursor = conexion.cursor.return_value
+    cursor.execute.assert_called_once_with("SELECT set_config('statement_timeout', %s, true)", ('1500',))
+    cursor.close.assert_called_once()
+    assert not control._conexiones
+
+def test_query_canceled_es_consulta_cancelada_por_timeout(control, metricas):
+    with pytest.raises(ConsultaCancelada) as error:
+        with consulta_controlada(MagicMock()):
+            raise ErrorSQLAlchemy(ErrorPostgres('57014'))
+
+    assert error.value.motivo == "statement_timeout"
+    assert metricas.contadores == {'pesada': {'timeouts': 1, 'cancelaciones': 0}}
+
+def test_otros_errores_no_se_traducen(control, metricas):
+    with pytest.raises(ErrorSQLAlchemy):
+        with consulta_controlada(MagicMock()):
+            raise ErrorSQLAlchemy(ErrorPostgres('42P01'))
+    assert metricas.contadores == {}
+
+def test_cancelar_corta_las_consultas_en_curso(control, metricas):
+    conexion = MagicMock()
+    with pytest.raises(ConsultaCancelada) as error:
+        with consulta_controlada(conexion):
+            control.cancelar()
+            raise ErrorPostgres('57014')
+
+    conexion.cancel.assert_called_once()
+    assert error.value.motivo == "cliente desconectado"
+    # La cancelación por desconexión no cuenta como timeout
+    assert metricas.contadores == {'pesada': {'timeouts': 0, 'cancelaciones': 1}}
+
+    # Las consultas posteriores del mismo request ni se envían
+    otra = MagicMock()
+    with pytest.raises(ConsultaCancelada):
+        with consulta_controlada(otra):
+            pass
+    otra.cursor.assert_not_called()
+
+def test_desconexion_del_cliente_cancela_en_el_middleware(monkeypatch, metricas):
+    clase = ClaseAdmision('general', max_concurrentes=1, max_cola=0, timeout=5)
+    monkeypatch.setitem(admission_controller.clases, 'general', clase)
+    conexion = MagicMock()
+
+    async def app(scope, receive, send):
+        control = query_control._control_actual.get()
+        with control.registrar(conexion):
+            while not control.cancelada:
+                await asyncio.sleep(0.01)
+
+    async def receive():
+        return {'type': 'http.disconnect'}
+
+    async def send(mensaje):
+        pass
+
+    scope = {'type': 'http', 'path': '/api/v1/estadisticas/resumen', 'query_string': b''}
+    asyncio.run(asyncio.wait_for(AdmissionMiddleware(app)(scope, receive, send), 5))
+
+    conexion.cancel.assert_called_once()
+    assert metricas.contadores['general']['cancelaciones'] == 1
+    assert query_control._control_actual.get() is None
+    assert clase.activos == 0
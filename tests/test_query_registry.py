@@ -0,0 +1,37 @@
+from services.query_registry import QueryRegistry, SentenciaPreparada
+
+def test_parametros_nombrados_a_posicionales():
+    sentencia = SentenciaPreparada(
+        "desenlaces__sexo",
+        "SELECT * FROM d WHERE sexo = %(sexo)s AND edad >= %(edad)s AND sexo <> %(sexo)s LIMIT %(limite)s"
+    )
+    assert sentencia.parametros == ['sexo', 'edad', 'limite']
+    assert sentencia.prepare_sql.endswith("WHERE sexo = $1 AND edad >= $2 AND sexo <> $1 LIMIT $3")
+    assert sentencia.execute_sql == f"EXECUTE {sentencia.nombre} (%s, %s, %s)"
+    assert sentencia.valores({'limite': 10, 'sexo': 'F'}) == ['F', None, 10]
+
+def test_nombre_valido_y_distinto_por_sql():
+    a = SentenciaPreparada("Top-Diagnósticos/unidad", "SELECT 1")
+    b = SentenciaPreparada("Top-Diagnósticos/unidad", "SELECT 2")
+    assert a.nombre != b.nombre
+    assert a.nombre == SentenciaPreparada("Top-Diagnósticos/unidad", "SELECT 1").nombre
+    for sentencia in (a, b):
+        assert sentencia.nombre.replace('_', '').isalnum() and sentencia.nombre.isascii()
+        assert sentencia.execute_sql == f"EXECUTE {sentencia.nombre}"
+
+def test_nombre_acotado_para_identificadores_de_postgres():
+    sentencia = SentenciaPreparada("x" * 200, "SELECT 1")
+    assert len(sentencia.nombre) <= 63
+
+def test_porcentaje_escapado():
+    sentencia = SentenciaPreparada("like", "SELECT * FROM d WHERE nombre LIKE 'A%%' AND id = %(id)s")
+    assert sentencia.prepare_sql.endswith("LIKE 'A%' AND id = $1")
+
+def test_registro_compila_una_vez_por_forma():
+    registro = QueryRegistry()
+    primera = registro.compilar("q", "SELECT %(a)s")
+    assert registro.compilar("q", "SELECT %(a)s") is primera
+    assert registro.compilar("q", "SELECT %(a)s, 1") is not primera
+    estado = registro.get_status()
+    assert estado["sentencias"] == 2
+    assert estado["ejecuciones"][primera.nombre] == 2
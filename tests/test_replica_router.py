@@ -0,0 +1,99 @@
+import pandas as pd
+
+from services.database import db_service
+from services.replica_router import ReplicaRouter, replica_router
+
+class _Resultado:
+    def __init__(self, valor):
+        self.valor = valor
+
+    def scalar(self):
+        return self.valor
+
+class _Conexion:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def execute(self, sentencia):
+        if isinstance(self.engine.lag, Exception):
+            raise self.engine.lag
+        return _Resultado(self.engine.lag)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class _Engine:
+    """Engine falso: LAG_QUERY devuelve lag (None = receptor WAL sin streaming)"""
+
+    def __init__(self, lag):
+        self.lag = lag
+
+    def connect(self):
+        return _Conexion(self)
+
+def _router(*lags, max_lag=5, intervalo=3600):
+    router = ReplicaRouter([f"postgresql://u:p@replica{i}/db" for i in range(len(lags))], max_lag, intervalo)
+    for replica, lag in zip(router.replicas, lags):
+        replica._engine = _Engine(lag)
+    return router
+
+def test_sin_replicas_lee_del_primario():
+    assert ReplicaRouter([], 5, 30).read_engine() is None
+
+def test_reparte_entre_replicas_al_dia():
+    router = _router(0, 1.5, 60)
+    al_dia = {router.replicas[0]._engine, router.replicas[1]._engine}
+
+    elegidos = [router.read_engine() for _ in range(4)]
+
+    assert set(elegidos) == al_dia
+    assert elegidos[0] is not elegidos[1]
+    assert router.lecturas_replica == 4
+
+def test_replica_atrasada_o_caida_vuelve_al_primario():
+    router = _router(60, ConnectionError("sin conexión"))
+
+    assert router.read_engine() is None
+    assert router.lecturas_primario == 1
+    estado = router.get_status()["replicas"]
+    assert estado[0]["lag_seconds"] == 60 and estado[0]["healthy"]
+    assert not estado[1]["healthy"] and "sin conexión" in estado[1]["last_error"]
+
+def test_receptor_wal_detenido_no_cuenta_como_al_dia():
+    router = _router(None)
+
+    assert router.read_engine() is None
+    replica = router.get_status()["replicas"][0]
+    assert replica["lag_seconds"] is None
+    assert replica["last_error"] == "Receptor WAL sin streaming activo"
+
+def test_replica_fallida_sale_de_rotacion_hasta_el_proximo_chequeo():
+    router = _router(0, 0)
+    caida = router.replicas[0]._engine
+
+    router.mark_failed(caida, RuntimeError("conexión perdida"))
+
+    assert all(router.read_engine() is not caida for _ in range(3))
+    router.replicas[0].checked_at -= router.check_interval
+    assert caida in {router.read_engine() for _ in range(2)}
+
+def test_consulta_reintenta_en_el_primario_si_falla_la_replica(monkeypatch):
+    primario, replica = object(), object()
+    fallidas = []
+    monkeypatch.setattr(db_service, '_engine', primario)
+    monkeypatch.setattr(replica_router, 'read_engine', lambda: replica)
+    monkeypatch.setattr(replica_router, 'mark_failed', lambda engine, error: fallidas.append(engine))
+
+    def ejecutar(engine, query, params, nombre):
+        if engine is replica:
+            raise ConnectionError("réplica caída")
+        return pd.DataFrame({'total': [3]})
+    monkeypatch.setattr(db_service, '_execute', ejecutar)
+
+    df = db_service.execute_query("SELECT COUNT(*) AS total FROM dashboard_desenlaces")
+
+    assert df['total'].tolist() == [3]
+    assert fallidas == [replica]
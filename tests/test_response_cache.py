@@ -0,0 +1,55 @@
+import gzip
+
+from services.response_cache import ResponseCache, unidad_de_query
+
+def _cache(**kwargs):
+    # TTL alto: las versiones solo cambian con set_versiones/publicar, sin leer etl_runs
+    cache = ResponseCache(version_ttl=3600, version_ttl_notify=3600, **kwargs)
+    cache.set_versiones({None: 10, 1: 10, 2: 10})
+    return cache
+
+def test_unidad_de_query():
+    assert unidad_de_query(b"unidad_id=3&sexo=F") == 3
+    assert unidad_de_query("sexo=F") is None
+    assert unidad_de_query(b"unidad_id=x") is None
+
+def test_version_por_unidad_incluye_el_dia():
+    cache = _cache()
+    unidad, version, dia = cache.current_version(2)
+    assert (unidad, version) == (2, 10)
+    assert cache.current_version(None)[:2] == (None, 10)
+    assert cache.current_version(7)[:2] == (7, 0)
+    assert len(dia) == 10
+
+def test_etl_de_una_unidad_invalida_solo_esa_y_las_globales():
+    cache = _cache()
+    claves = {unidad: ('/estadisticas/resumen', unidad) for unidad in (None, 1, 2)}
+    for unidad, clave in claves.items():
+        cache.store(clave, cache.current_version(unidad), b'{}', [])
+
+    cache.publicar(11, [2])
+
+    assert cache.get(claves[1], cache.current_version(1)) is not None
+    assert cache.get(claves[2], cache.current_version(2)) is None
+    assert cache.get(claves[None], cache.current_version(None)) is None
+    assert cache.get_status()["entries"] == 1
+
+def test_misma_version_no_descarta():
+    cache = _cache()
+    version = cache.current_version(1)
+    cache.store('k', version, b'x', [])
+    cache.set_versiones({1: 10})
+    assert cache.get('k', version) is not None
+
+def test_variantes_comprimidas_y_lru():
+    cache = _cache(max_entries=2)
+    version = cache.current_version(None)
+    cuerpo = b'{"total_casos": 1}' * 100
+    entrada = cache.store('a', version, cuerpo, [])
+    assert gzip.decompress(entrada.bodies['gzip']) == cuerpo
+    cache.store('b', version, b'b', [])
+    cache.get('a', version)
+    cache.store('c', version, b'c', [])
+    # 'b' fue la menos usada
+    assert cache.get('b', version) is None
+    assert cache.get('a', version) is not None
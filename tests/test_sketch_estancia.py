@@ -0,0 +1,69 @@
+import random
+
+import numpy as np
+import pandas as pd
+
+from etl.sketches.estancia import HistogramaEstancia
+from routes.estadisticas import get_analisis_estancia
+from services.database import db_service
+
+def test_combinar_por_dia_equivale_a_histograma_del_rango():
+    random.seed(7)
+    dias = [[random.randint(0, 60) for _ in range(random.randint(0, 40))] for _ in range(30)]
+
+    combinado = HistogramaEstancia()
+    for valores in dias:
+        combinado.merge(HistogramaEstancia.from_json(HistogramaEstancia.from_values(valores).to_json()))
+
+    todos = [v for valores in dias for v in valores]
+    assert combinado.conteos == HistogramaEstancia.from_values(todos).conteos
+    assert combinado.total == len(todos)
+    assert combinado.promedio() == sum(todos) / len(todos)
+
+def test_cuantiles_iguales_a_percentile_cont():
+    random.seed(3)
+    valores = [random.randint(1, 90) for _ in range(501)]
+    histograma = HistogramaEstancia.from_values(valores)
+    for q in (0, 0.1, 0.25, 0.5, 0.9, 0.99, 1):
+        # numpy 'linear' es la interpolación de PERCENTILE_CONT
+        assert histograma.quantile(q) == np.percentile(valores, q * 100)
+
+def test_rango_y_resumen():
+    histograma = HistogramaEstancia.from_values([1, 3, 7, 8, 14, 15, 40])
+    assert histograma.rango(8, 14).total == 2
+    assert histograma.rango(31).conteos == {40: 1}
+    assert histograma.resumen() == {'total_casos': 7, 'promedio_estancia': 12.6, 'minimo': 1, 'maximo': 40}
+
+def test_histograma_vacio():
+    vacio = HistogramaEstancia()
+    assert vacio.quantile(0.5) is None
+    assert vacio.resumen() == {'total_casos': 0, 'promedio_estancia': None, 'minimo': None, 'maximo': None}
+
+def _sin_histogramas(monkeypatch, sketches):
+    exactas = []
+
+    def exacto(filtros):
+        exactas.append(filtros)
+        return pd.DataFrame({'dias_estancia': [3, 10, 45], 'casos': [2, 1, 1]})
+
+    monkeypatch.setattr(db_service, 'get_sketches_estancia', lambda filtros: sketches)
+    monkeypatch.setattr(db_service, 'histograma_estancia_exacto', exacto)
+    return exactas
+
+def test_sin_histogramas_precalculados_agrupa_los_registros(monkeypatch):
+    exactas = _sin_histogramas(monkeypatch, pd.DataFrame())
+
+    respuesta = get_analisis_estancia(None, None, None, None, 'F', None, False)
+
+    assert exactas[0]['sexo'] == 'F'
+    assert respuesta['resumen_general']['total_casos'] == 4
+    assert respuesta['resumen_general']['mediana'] == 6.5
+    assert [r['rango_estancia'] for r in respuesta['distribución_por_rangos']] == ['1-7 días', '8-14 días', 'Más de 30 días']
+
+def test_exacto_no_usa_los_histogramas(monkeypatch):
+    precalculados = pd.DataFrame({'histograma': [HistogramaEstancia.from_values([1, 2]).to_json()]})
+    exactas = _sin_histogramas(monkeypatch, precalculados)
+
+    assert db_service.get_histograma_estancia({}).conteos == {1: 1, 2: 1}
+    assert exactas == []
+    assert db_service.get_histograma_estancia({}, exacto=True).total == 4
@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from etl.sketches.hll import HyperLogLog
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _sketch(valores):
+    return HyperLogLog().add_all(valores)
+
+def test_estimacion_dentro_del_error():
+    for n in (10, 1_000, 50_000):
+        resultado = _sketch(f"HC{i}" for i in range(n)).resultado()
+        assert abs(resultado['total_pacientes'] - n) <= 3 * resultado['error_relativo'] * n + 1
+        assert resultado['intervalo_95'][0] <= n <= resultado['intervalo_95'][1] + 1
+
+def test_union_cuenta_una_vez_los_repetidos():
+    # Pacientes que vuelven en varios días: la unión no los suma dos veces
+    dias = [[f"HC{(d * 100 + i) % 3_000}" for i in range(400)] for d in range(40)]
+    union = HyperLogLog.union_json(_sketch(valores).to_json() for valores in dias)
+
+    distintos = len({v for valores in dias for v in valores})
+    exacto = _sketch(v for valores in dias for v in valores)
+    assert (union.registros == exacto.registros).all()
+    assert abs(union.estimate() - distintos) <= 3 * union.error_relativo * distintos
+
+def test_merge_igual_a_union_json():
+    a, b = _sketch(range(0, 800)), _sketch(range(500, 1_500))
+    combinado = HyperLogLog.from_json(a.to_json()).merge(b)
+    assert (combinado.registros == HyperLogLog.union_json([a.to_json(), b.to_json()]).registros).all()
+
+def test_hash_estable_entre_procesos():
+    # El sketch guardado depende solo del valor, no del PYTHONHASHSEED del worker
+    codigo = "from etl.sketches.hll import HyperLogLog; print(HyperLogLog().add('HC1').to_json())"
+    salidas = {
+        subprocess.run(
+            [sys.executable, '-c', codigo], cwd=RAIZ, env={**os.environ, 'PYTHONHASHSEED': semilla},
+            capture_output=True, text=True, check=True
+        ).stdout
+        for semilla in ('1', '2')
+    }
+    assert salidas == {_sketch(["HC1"]).to_json() + "\n"}
+
+def test_no_combina_precisiones_distintas():
+    with pytest.raises(ValueError):
+        HyperLogLog(10).merge(HyperLogLog(12))
+    with pytest.raises(ValueError):
+        HyperLogLog.union_json([HyperLogLog(10).add("x").to_json()])
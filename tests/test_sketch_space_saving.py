@@ -0,0 +1,58 @@
+import random
+from collections import Counter
+
+from etl.sketches.space_saving import SpaceSaving
+
+def _dias(seed, n_dias=60):
+    random.seed(seed)
+    return [
+        [(min(int(random.paretovariate(1.1)), 300), random.randint(1, 20)) for _ in range(random.randint(20, 200))]
+        for _ in range(n_dias)
+    ]
+
+def _resumen(filas, k):
+    return SpaceSaving.from_values([d for d, _ in filas], [e for _, e in filas], k=k)
+
+def test_combinar_respeta_las_cotas():
+    dias = _dias(1)
+    combinado = SpaceSaving.merge_json(_resumen(filas, 8).to_json() for filas in dias)
+    reales = Counter(d for filas in dias for d, _ in filas)
+
+    for item, (casos, error, _, _) in combinado.contadores.items():
+        assert casos - error <= reales[item] <= casos
+    # Un diagnóstico sin contador no puede superar el mínimo
+    assert all(reales[item] <= combinado.minimo for item in reales if item not in combinado.contadores)
+
+def test_top_garantizado_coincide_con_el_exacto():
+    dias = _dias(2)
+    reales = Counter(d for filas in dias for d, _ in filas)
+    top = SpaceSaving.merge_json((_resumen(filas, 16).to_json() for filas in dias), k=16).top(5)
+
+    garantizados = [fila['item'] for fila in top if fila['garantizado']]
+    exactos = [item for item, _ in reales.most_common(5)]
+    assert garantizados and set(garantizados) <= set(exactos)
+
+def test_sin_recorte_es_exacto():
+    filas = [(1, 2), (1, 4), (2, None), (3, 1), (1, None)]
+    resumen = _resumen(filas, 10)
+    assert resumen.minimo == 0
+    # 2 empata con 3 (un caso cada uno): no es seguro que esté entre los 2 primeros
+    assert resumen.top(2) == [
+        {'item': 1, 'total_casos': 3, 'error_maximo': 0, 'promedio_estancia': 3.0, 'garantizado': True},
+        {'item': 2, 'total_casos': 1, 'error_maximo': 0, 'promedio_estancia': None, 'garantizado': False},
+    ]
+
+def test_promedio_de_estancia_combinado():
+    a = _resumen([(7, 2), (7, 4)], 4)
+    b = _resumen([(7, 6), (9, 1)], 4)
+    top = SpaceSaving.merge_all([a, b]).top(1)[0]
+    assert (top['item'], top['total_casos'], top['promedio_estancia']) == (7, 3, 4.0)
+
+def test_json_ida_y_vuelta():
+    resumen = _resumen([(1, 1), (2, 2), (2, 3), (3, None)], 2)
+    copia = SpaceSaving.from_json(resumen.to_json())
+    assert (copia.k, copia.minimo, copia.contadores) == (resumen.k, resumen.minimo, resumen.contadores)
+
+def test_nulos_se_ignoran_y_vacio():
+    assert SpaceSaving.from_values([None, float('nan')]).top(3) == []
+    assert SpaceSaving.merge_all([]).top(3) == []